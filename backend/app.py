@@ -1,11 +1,17 @@
-from flask import Flask, render_template, send_from_directory, jsonify, make_response
+from flask import Flask, render_template, send_from_directory, jsonify, make_response, redirect, url_for, Response
 from flask_cors import CORS
-from pymongo import MongoClient
 from config import Config
+from utils.db import MongoConnectionManager
+from utils import metrics as app_metrics
+from utils.gemini_client import GeminiClient
+from utils.tracing import init_request_tracing
+from models.user_model import UserModel
+from models.finance_model import FinanceModel
+from models.export_job_model import ExportJobModel
 from routes.auth_routes import init_auth_routes
 from routes.finance_routes import init_finance_routes
 from routes.chat_routes import init_chat_routes
-import numpy as np
+
 def create_app():
     """Flask application factory"""
     app = Flask(__name__, 
@@ -18,50 +24,53 @@ def create_app():
     # Enable CORS
     CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
     
+    # Per-endpoint request counters and latency histograms
+    if Config.METRICS_ENABLED:
+        app_metrics.init_request_metrics(app)
+    
+    # Request root spans (exported traces and ?profile=1 span trees)
+    init_request_tracing(app)
+    
     # Connect to MongoDB
+    # The manager opens one pooled client per process on first use, so workers
+    # forked from a preloaded app never share the parent's sockets
+    # (Mongo command latency is only observed when metrics are exported)
+    command_listeners = [app_metrics.mongo_command_listener] if Config.METRICS_ENABLED else []
+    mongo = MongoConnectionManager(Config.MONGO_URI, event_listeners=command_listeners)
+    db = mongo.db
     try:
-        # Configure MongoDB connection with SSL/TLS options
-        import ssl
-        import certifi
-        
-        # Parse connection string and add SSL options
-        client = MongoClient(
-            Config.MONGO_URI,
-            tls=True,
-            tlsCAFile=certifi.where(),
-            tlsAllowInvalidCertificates=False,
-            serverSelectionTimeoutMS=5000,
-            connectTimeoutMS=10000,
-            socketTimeoutMS=10000,
-            retryWrites=True
-        )
-        db = client.fingenie
         # Test connection
-        client.admin.command('ping')
-        print("✓ Connected to MongoDB successfully")
+        mongo.ping()
     except Exception as e:
-        print(f"✗ MongoDB connection error: {e}")
-        print("\nTrying alternative connection method...")
-        try:
-            # Fallback: try without explicit SSL options
-            client = MongoClient(Config.MONGO_URI, serverSelectionTimeoutMS=5000)
-            db = client.fingenie
-            client.admin.command('ping')
-            print("✓ Connected to MongoDB successfully (fallback method)")
-        except Exception as e2:
-            print(f"✗ MongoDB connection failed: {e2}")
-            print("\nTroubleshooting tips:")
-            print("1. Check your MONGO_URI in .env file")
-            print("2. Ensure your IP is whitelisted in MongoDB Atlas")
-            print("3. Verify your MongoDB credentials are correct")
-            print("4. Try updating certifi: pip install --upgrade certifi")
-            print("5. Check your internet connection")
-            raise
+        print(f"✗ MongoDB connection failed: {e}")
+        print("\nTroubleshooting tips:")
+        print("1. Check your MONGO_URI in .env file")
+        print("2. Ensure your IP is whitelisted in MongoDB Atlas")
+        print("3. Verify your MongoDB credentials are correct")
+        print("4. Try updating certifi: pip install --upgrade certifi")
+        print("5. Check your internet connection")
+        raise
+    app.extensions['mongo'] = mongo
+    
+    # Shared model instances for all blueprints
+    user_model = UserModel(db)
+    finance_model = FinanceModel(db)
+    export_jobs = ExportJobModel(db, ttl_hours=Config.EXPORT_JOB_TTL_HOURS)
+    try:
+        finance_model.transactions.ensure_indexes()
+        finance_model.changes.ensure_indexes()
+        export_jobs.ensure_indexes()
+    except Exception as e:
+        print(f"⚠️ Warning: Could not create transaction/change log/export job indexes: {e}")
+    if Config.WRITE_COALESCE_ENABLED:
+        from utils.write_buffer import WriteCoalescer
+        finance_model.write_buffer = WriteCoalescer(finance_model, window_ms=Config.WRITE_COALESCE_WINDOW_MS)
     
     # Register blueprints
-    auth_bp = init_auth_routes(db)
-    finance_bp = init_finance_routes(db)
-    chat_bp = init_chat_routes(db)
+    auth_bp = init_auth_routes(db, user_model=user_model, finance_model=finance_model,
+                               export_jobs=export_jobs)
+    finance_bp = init_finance_routes(db, finance_model=finance_model)
+    chat_bp = init_chat_routes(db, finance_model=finance_model)
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(finance_bp, url_prefix='/api/finance')
@@ -77,7 +86,7 @@ def create_app():
         """Health check endpoint"""
         try:
             # Test MongoDB connection
-            client.admin.command('ping')
+            mongo.ping()
             mongo_status = 'connected'
         except Exception as e:
             mongo_status = f'error: {str(e)}'
@@ -85,52 +94,30 @@ def create_app():
         return jsonify({
             'status': 'ok',
             'mongodb': mongo_status,
+            'mongodb_pool': mongo.health(),
+            'process': app_metrics.process_info(),
+            'llm_mode': GeminiClient().use_method,
+            'caches': app_metrics.cache_stats(),
+            'write_buffer': finance_model.write_buffer.stats() if finance_model.write_buffer else None,
+            'endpoints': app_metrics.endpoint_summary(),
             'version': '1.0.0'
         })
     
+    @app.route('/metrics')
+    def metrics_endpoint():
+        """Prometheus text exposition of in-process metrics"""
+        if not Config.METRICS_ENABLED:
+            return jsonify({'error': 'Metrics are disabled'}), 404
+        return Response(app_metrics.metrics.render(), content_type=app_metrics.CONTENT_TYPE)
+    
     @app.route('/login', methods=['GET'])
     def login_page():
         return render_template('login.html')
     
     @app.route('/login', methods=['POST'])
     def login_post():
-        """Proxy login request to auth API"""
-        from flask import request as req, jsonify, make_response
-        from routes.auth_routes import init_auth_routes
-        
-        # Get auth blueprint
-        auth_bp_temp = init_auth_routes(db)
-        
-        # Manually call the login handler
-        try:
-            data = req.get_json()
-            from models.user_model import UserModel
-            from utils.jwt_handler import encode_token
-            
-            user_model = UserModel(db)
-            
-            if not data or not data.get('email') or not data.get('password'):
-                return jsonify({'success': False, 'message': 'Email and password are required'}), 400
-            
-            email = data['email'].strip().lower()
-            password = data['password']
-            
-            is_valid, user = user_model.verify_password(email, password)
-            
-            if not is_valid:
-                return jsonify({'success': False, 'message': 'Invalid email or password'}), 401
-            
-            token = encode_token(user['_id'], user['email'])
-            response = make_response(jsonify({
-                'success': True,
-                'message': 'Login successful',
-                'user': user,
-                'token': token
-            }))
-            response.set_cookie('token', token, httponly=True, samesite='Lax', max_age=86400)
-            return response, 200
-        except Exception as e:
-            return jsonify({'success': False, 'message': f'Server error: {str(e)}'}), 500
+        """Legacy login URL - forward to the auth API (307 keeps method and body)"""
+        return redirect(url_for('auth.login'), code=307)
     
     @app.route('/signup', methods=['GET'])
     def signup_page():
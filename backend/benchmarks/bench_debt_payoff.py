@@ -0,0 +1,113 @@
+# Debt payoff benchmark: times utils.debt_payoff over a range of extra monthly
+# budgets (the loan page's slider), next to a plain-Python month loop per
+# strategy: one payoff_plan per budget (baseline + avalanche + snowball as one
+# array per month), and one payoff_sweep covering every budget at once. Reports
+# latency and the largest total-interest difference (should be ~0).
+# Run this from the backend directory: python benchmarks/bench_debt_payoff.py [--loans 4] [--budgets 50]
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from utils.debt_payoff import MAX_MONTHS, PAID_OFF_BALANCE, normalize_loans, payoff_plan, payoff_sweep, strategy_order
+
+
+def build_loans(count, seed=11):
+    """Home, car and personal loans with EMIs for their remaining tenure"""
+    rng = random.Random(seed)
+    kinds = [('home_loan', 2000000, 8.5, 240), ('car_loan', 500000, 9.5, 60), ('personal_loan', 150000, 13.0, 36)]
+    loans = []
+    for index in range(count):
+        kind, amount, rate, tenure = kinds[index % len(kinds)]
+        loans.append({
+            'id': index + 1,
+            'name': f'{kind} {index + 1}',
+            'remaining_principal': round(amount * rng.uniform(0.3, 1.0)),
+            'interest_rate': round(rate + rng.uniform(-1.5, 1.5), 2),
+            'tenure_months': rng.randint(tenure // 3, tenure)
+        })
+    return loans
+
+
+def scalar_plan(loans, order, budget):
+    """One strategy, one loan at a time per month (the per-strategy baseline)"""
+    balances = [loan['balance'] for loan in loans]
+    total_interest = 0.0
+    for _ in range(MAX_MONTHS):
+        if all(balance <= 0 for balance in balances):
+            break
+        dues, minimums = [], []
+        for loan, balance in zip(loans, balances):
+            interest = balance * loan['annual_rate'] / 12 / 100
+            total_interest += interest
+            dues.append(balance + interest)
+            minimums.append(min(loan['emi'], balance + interest))
+        pool = max(0.0, budget - sum(minimums))
+        for index in range(len(loans)):
+            balances[index] = dues[index] - minimums[index]
+        for index in order:
+            paid = min(pool, balances[index])
+            balances[index] -= paid
+            pool -= paid
+        balances = [0.0 if balance < PAID_OFF_BALANCE else balance for balance in balances]
+    return total_interest
+
+
+def time_calls(fn, values):
+    samples = []
+    for value in values:
+        started = time.perf_counter()
+        fn(value)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the debt payoff optimizer over changing extra budgets')
+    parser.add_argument('--loans', type=int, default=4, help='Loans being paid off')
+    parser.add_argument('--budgets', type=int, default=50, help='Extra budgets in the slider range (steps of 1000)')
+    args = parser.parse_args()
+
+    loans = build_loans(args.loans)
+    normalized = normalize_loans(loans)
+    extras = [1000 * step for step in range(args.budgets)]
+    emi_total = sum(loan['emi'] for loan in normalized)
+    orders = [strategy_order(normalized, strategy) for strategy in ('avalanche', 'snowball')]
+
+    payoff_plan(loans, 0)  # warm up numpy
+    batched = time_calls(lambda extra: payoff_plan(loans, extra, include_schedule=False), extras)
+    looped = time_calls(lambda extra: [scalar_plan(normalized, order, emi_total + extra) for order in orders],
+                        extras)
+    sweep = time_calls(lambda _: payoff_sweep(loans, extras), range(5))
+    print(f"{len(normalized)} loans, {len(extras)} extra budgets")
+    print(f"per budget  plan mean {statistics.mean(batched):7.2f} ms  p99 {percentile(batched, 99):7.2f} ms   "
+          f"loop mean {statistics.mean(looped):7.2f} ms  p99 {percentile(looped, 99):7.2f} ms")
+    print(f"all budgets sweep     {statistics.mean(sweep):7.2f} ms                  "
+          f"loop      {sum(looped):7.2f} ms")
+
+    differences = []
+    result = payoff_sweep(loans, extras)
+    for entry in result['sweep'][::max(1, len(extras) // 10)]:
+        for strategy, order in zip(('avalanche', 'snowball'), orders):
+            expected = scalar_plan(normalized, order, emi_total + entry['extra_payment'])
+            plan = payoff_plan(loans, entry['extra_payment'], include_schedule=False)
+            differences.append(abs(entry[strategy]['total_interest'] - expected))
+            differences.append(abs(plan['strategies'][strategy]['total_interest'] - expected))
+    print(f"max total interest difference ₹{max(differences):.2f} (results are rounded to 0.01)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# get_data benchmark: seeds a synthetic financial_data document, then calls
+# GET /api/finance/get_data through the Flask test client and reports p50/p99
+# latency and Mongo commands per call, for a cold view (cache dropped before
+# every call) and a warm view (unchanged document, version probe only).
+# Needs a reachable MONGO_URI; the synthetic user's document is removed afterwards.
+# Run this from the backend directory: python benchmarks/bench_get_data.py [--calls 500]
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from bson import ObjectId
+
+from app import create_app
+from utils.financial_view import get_mock_financial_data, invalidate_view
+from utils.jwt_handler import encode_token
+from utils.metrics import mongo_command_duration
+
+
+def mongo_command_count():
+    """Total Mongo commands observed by the app's command listener"""
+    return sum(state[2] for state in list(mongo_command_duration._values.values()))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run(client, headers, user_id, calls, cold):
+    latencies = []
+    commands = []
+    for _ in range(calls):
+        if cold:
+            invalidate_view(user_id)
+        before = mongo_command_count()
+        started = time.perf_counter()
+        response = client.get('/api/finance/get_data', headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        commands.append(mongo_command_count() - before)
+        if response.status_code != 200:
+            raise RuntimeError(f"get_data returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return latencies, commands
+
+
+def report(label, latencies, commands):
+    print(f"{label:<6} p50 {percentile(latencies, 50):7.2f} ms   p99 {percentile(latencies, 99):7.2f} ms   "
+          f"mean {statistics.mean(latencies):7.2f} ms   mongo ops/call {statistics.mean(commands):.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure get_data latency and Mongo ops per call')
+    parser.add_argument('--calls', type=int, default=500, help='Requests per mode')
+    args = parser.parse_args()
+    
+    app = create_app()
+    mongo = app.extensions['mongo']
+    collection = mongo.db.financial_data
+    
+    user_id = str(ObjectId())
+    mock = get_mock_financial_data()
+    collection.insert_one({
+        "user_id": ObjectId(user_id),
+        "assets": mock.get('assets', {}),
+        "liabilities": mock.get('liabilities', {}),
+        "goals": mock.get('goals', []),
+        "transactions": mock.get('transactions', []),
+        "data_version": 1,
+        "last_updated": "2024-01-01T00:00:00"
+    })
+    headers = {'Authorization': f'Bearer {encode_token(user_id, "bench@fingenie.local")}'}
+    
+    try:
+        with app.test_client() as client:
+            run(client, headers, user_id, 10, cold=True)  # warm up connections
+            for label, cold in (('cold', True), ('warm', False)):
+                latencies, commands = run(client, headers, user_id, args.calls, cold)
+                report(label, latencies, commands)
+    finally:
+        collection.delete_many({"user_id": ObjectId(user_id)})
+        invalidate_view(user_id)
+        mongo.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Startup-time benchmark: measures how long importing the app takes in a fresh
+# interpreter (python -X importtime) and fails if it exceeds the budget or if a
+# heavy optional dependency is loaded at import time.
+# Run this from the backend directory: python benchmarks/bench_import_time.py
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported on first use, never at worker boot
+LAZY_MODULES = [
+    'reportlab',
+    'qrcode',
+    'PIL',
+    'numpy',
+    'vertexai',
+    'google.generativeai',
+    'google.cloud.aiplatform',
+]
+
+DEFAULT_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', '500'))
+
+
+def run_importtime(module):
+    """Import module in a fresh interpreter and return {name: (self_us, cumulative_us)}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            timings[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure app import time against a budget')
+    parser.add_argument('--module', default='app', help='Module to import (default: app)')
+    parser.add_argument('--runs', type=int, default=5, help='Number of fresh-interpreter runs')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help='Median import time budget in ms (env: IMPORT_TIME_BUDGET_MS)')
+    parser.add_argument('--top', type=int, default=10, help='Show the N slowest imported packages')
+    args = parser.parse_args()
+    
+    totals_ms = []
+    last = {}
+    for _ in range(args.runs):
+        last = run_importtime(args.module)
+        totals_ms.append(last[args.module][1] / 1000)
+    
+    median_ms = statistics.median(totals_ms)
+    print(f"Import time for '{args.module}' over {args.runs} runs:")
+    print(f"  median: {median_ms:.1f} ms   min: {min(totals_ms):.1f} ms   max: {max(totals_ms):.1f} ms")
+    print(f"  budget: {args.budget_ms:.1f} ms")
+    
+    # Slowest top-level packages (cumulative) from the last run
+    top_level = {name: cum for name, (_, cum) in last.items() if '.' not in name and name != args.module}
+    print("\nSlowest top-level imports (last run):")
+    for name, cum in sorted(top_level.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {cum / 1000:8.1f} ms  {name}")
+    
+    failures = []
+    eager = [m for m in LAZY_MODULES if m in last]
+    if eager:
+        failures.append(f"Heavy modules imported at startup: {', '.join(eager)}")
+    if median_ms > args.budget_ms:
+        failures.append(f"Median import time {median_ms:.1f} ms exceeds budget {args.budget_ms:.1f} ms")
+    
+    print()
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        return 1
+    print("✓ Import time within budget and no heavy modules loaded eagerly")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
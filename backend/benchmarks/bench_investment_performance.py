@@ -0,0 +1,131 @@
+# Investment performance benchmark: builds a synthetic portfolio of SIP-style
+# holdings (monthly cashflows with occasional withdrawals) and times the batched
+# XIRR/CAGR engine in utils.investment_performance against a per-holding scalar
+# Newton loop, end to end (from the holding documents) and solver only (flows
+# already parsed). Reports mean/p99 latency and the largest XIRR difference
+# between the two (should be ~0).
+# Run this from the backend directory: python benchmarks/bench_investment_performance.py [--holdings 200] [--months 60]
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+
+from utils.investment_performance import DAYS_PER_YEAR, holding_cashflows, investment_performance, xirr_batch
+
+VALUATION_DATE = date(2025, 1, 1)
+
+
+def build_portfolio(holdings, months, seed=7):
+    """Holdings with one SIP instalment per month and a withdrawal every 25 months"""
+    rng = random.Random(seed)
+    portfolio = []
+    for index in range(holdings):
+        instalment = rng.choice([1000, 2500, 5000, 10000])
+        length = rng.randint(max(2, months // 4), months)
+        cashflows = []
+        for month in range(length, 0, -1):
+            when = VALUATION_DATE - timedelta(days=round(month * 30.44))
+            cashflows.append({'date': when.isoformat(), 'amount': -instalment})
+            if month % 25 == 0:
+                cashflows.append({'date': when.isoformat(), 'amount': instalment * 3})
+        growth = rng.uniform(0.85, 1.6)
+        portfolio.append({
+            'id': index,
+            'name': f'Fund {index}',
+            'type': 'mutual_fund',
+            'cashflows': cashflows,
+            'current_value': round(instalment * length * growth, 2)
+        })
+    return portfolio
+
+
+def scalar_xirr(flows, valuation_day, guess=0.1):
+    """Plain-Python Newton iteration for one holding (the per-holding baseline)"""
+    rate = guess
+    for _ in range(100):
+        f = df = 0.0
+        for day, amount in flows:
+            years = (valuation_day - day) / DAYS_PER_YEAR
+            f += amount * (1 + rate) ** years
+            df += amount * years * (1 + rate) ** (years - 1)
+        if df == 0:
+            return None
+        step = f / df
+        rate = max(-0.9999, rate - step)
+        if abs(step) < 1e-10:
+            return rate
+    return None
+
+
+def looped(portfolio, valuation_day):
+    return [scalar_xirr(holding_cashflows(holding, valuation_day), valuation_day) for holding in portfolio]
+
+
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, result
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time batched XIRR/CAGR against a per-holding loop')
+    parser.add_argument('--holdings', type=int, default=200, help='Holdings in the portfolio')
+    parser.add_argument('--months', type=int, default=60, help='Longest SIP history in months')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per engine')
+    args = parser.parse_args()
+
+    portfolio = build_portfolio(args.holdings, args.months)
+    valuation_day = VALUATION_DATE.toordinal()
+    flows = [holding_cashflows(holding, valuation_day) for holding in portfolio]
+    print(f"{len(portfolio)} holdings, {sum(len(f) for f in flows)} cashflows")
+
+    # Flat arrays for the solver-only comparison
+    amounts = np.array([amount for holding in flows for _, amount in holding])
+    years = np.array([(valuation_day - day) / DAYS_PER_YEAR for holding in flows for day, _ in holding])
+    series = np.array([index for index, holding in enumerate(flows) for _ in holding])
+
+    investment_performance(portfolio, VALUATION_DATE)  # warm up numpy and the date cache
+    rows = [
+        ('end-to-end', lambda: investment_performance(portfolio, VALUATION_DATE),
+         lambda: looped(portfolio, valuation_day)),
+        ('solver', lambda: xirr_batch(amounts, years, series, len(flows)),
+         lambda: [scalar_xirr(holding, valuation_day) for holding in flows]),
+    ]
+    for label, batched_fn, looped_fn in rows:
+        batched, _ = time_calls(batched_fn, args.repeat)
+        loop, _ = time_calls(looped_fn, max(1, args.repeat // 4))
+        print(f"{label:<11} batched mean {statistics.mean(batched):8.2f} ms  p99 {percentile(batched, 99):8.2f} ms   "
+              f"loop mean {statistics.mean(loop):8.2f} ms   speedup {statistics.mean(loop) / statistics.mean(batched):5.1f}x")
+
+    result = investment_performance(portfolio, VALUATION_DATE)
+    baseline = looped(portfolio, valuation_day)
+    differences = [
+        abs(holding['xirr'] - rate * 100)
+        for holding, rate in zip(result['holdings'], baseline)
+        if holding['xirr'] is not None and rate is not None
+    ]
+    print(f"max XIRR difference {max(differences, default=0):.4f} pct points (results are rounded to 0.01)")
+    print(f"portfolio XIRR {result['portfolio']['xirr']}%   CAGR {result['portfolio']['cagr']}%")
+
+
+if __name__ == '__main__':
+    main()
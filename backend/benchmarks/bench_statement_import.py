@@ -0,0 +1,96 @@
+# Statement import benchmark: generates a synthetic CSV statement (100k rows by
+# default, without bank reference numbers unless --ref-no) on disk and streams
+# it through utils.statement_import, reporting rows per second and peak Python
+# memory (tracemalloc). By default only parsing and normalization are measured
+# (dry run); --mongo also inserts the rows for a synthetic user in the
+# configured MONGO_URI and removes them afterwards.
+# Run this from the backend directory: python benchmarks/bench_statement_import.py [--rows 100000] [--ref-no] [--mongo]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from bson import ObjectId
+
+from utils.statement_import import DEFAULT_BATCH_SIZE, import_statement, open_statement_stream
+
+MERCHANTS = ['SWIGGY ORDER', 'UBER TRIP', 'AMAZON PAY', 'BIGBASKET', 'NETFLIX', 'ELECTRICITY BILL',
+             'APOLLO PHARMACY', 'IRCTC', 'UPI TRANSFER', 'ATM WITHDRAWAL']
+
+
+def write_statement(path, rows, seed=7, reference=False):
+    """
+    Write a bank-style CSV with separate debit/credit columns
+
+    Without a reference column (the default) every row goes through the
+    in-file duplicate numbering, the import's worst case for memory.
+    """
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('Date,Narration,Ref No,Debit,Credit\n' if reference else 'Date,Narration,Debit,Credit\n')
+        for i in range(rows):
+            day = (start + timedelta(days=i // 60)).strftime('%d/%m/%Y')
+            ref = f'REF{i},' if reference else ''
+            if i % 30 == 0:
+                f.write(f'{day},SALARY CREDIT,{ref},"85,000.00"\n')
+            else:
+                f.write(f'{day},{rng.choice(MERCHANTS)} {i % 97},{ref}{rng.uniform(20, 5000):.2f},\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure statement import throughput and memory')
+    parser.add_argument('--rows', type=int, default=100000, help='Rows in the synthetic statement')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per insert_many')
+    parser.add_argument('--ref-no', action='store_true', help='Include a bank reference column')
+    parser.add_argument('--mongo', action='store_true', help='Insert into MongoDB (needs MONGO_URI)')
+    args = parser.parse_args()
+    
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    mongo = None
+    user_id = str(ObjectId())
+    try:
+        started = time.perf_counter()
+        write_statement(path, args.rows, reference=args.ref_no)
+        print(f"Generated {args.rows} rows ({os.path.getsize(path) / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - started:.2f}s")
+        
+        transaction_model = None
+        if args.mongo:
+            from config import Config
+            from models.transaction_model import TransactionModel
+            from utils.db import MongoConnectionManager
+            mongo = MongoConnectionManager(Config.MONGO_URI)
+            transaction_model = TransactionModel(mongo.db)
+            transaction_model.ensure_indexes()
+        
+        tracemalloc.start()
+        with open(path, 'rb') as f:
+            report = import_statement(transaction_model, user_id, open_statement_stream(f),
+                                      batch_size=args.batch_size, dry_run=not args.mongo)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        mode = 'insert' if args.mongo else 'dry run'
+        print(f"{mode}: {report['rows']} rows in {report['elapsed_seconds']}s "
+              f"({report['rows_per_second']} rows/sec), peak memory {peak / 1e6:.1f} MB")
+        print(f"inserted {report['inserted']}, duplicates {report['duplicates']}, invalid {report['invalid']}")
+    finally:
+        os.remove(path)
+        if mongo is not None:
+            mongo.db.transactions.delete_many({"user_id": ObjectId(user_id)})
+            mongo.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,11 +10,32 @@ class Config:
     # MongoDB Configuration
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/fingenie')
     
+    # MongoDB connection pool (per worker process)
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '50'))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '2'))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', '60000'))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+    
+    # Write-behind buffer for /api/finance/patch, update_budget and update_investments
+    # (per worker process; pending writes are flushed on the user's next read in the same
+    # process and at exit, so enable only with one worker or sticky per-user routing)
+    WRITE_COALESCE_ENABLED = os.getenv('WRITE_COALESCE_ENABLED', 'False').lower() == 'true'
+    WRITE_COALESCE_WINDOW_MS = int(os.getenv('WRITE_COALESCE_WINDOW_MS', '250'))
+    
+    # Data exports (/api/auth/export-data): background job files and pool size per worker process
+    EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'fingenie-exports'))
+    EXPORT_JOB_TTL_HOURS = int(os.getenv('EXPORT_JOB_TTL_HOURS', '24'))
+    EXPORT_JOB_WORKERS = int(os.getenv('EXPORT_JOB_WORKERS', '2'))
+    
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
     JWT_ALGORITHM = 'HS256'
     JWT_EXPIRATION_HOURS = 24
     
+    # Two-Factor Authentication Configuration
+    # How long a generated-but-unverified TOTP secret (and its QR) is reused
+    TOTP_SETUP_TTL_SECONDS = int(os.getenv('TOTP_SETUP_TTL_SECONDS', '600'))
+    
     # Gemini API Configuration
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
     GEMINI_PROJECT_ID = os.getenv('GEMINI_PROJECT_ID', '')
@@ -23,6 +45,16 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-flask-secret-key-change-in-production')
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     
+    # Metrics Configuration (/metrics endpoint and request instrumentation)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    
+    # Tracing Configuration
+    # TRACING_EXPORTER: none (default), json (append spans to TRACING_FILE) or otel
+    TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'none')
+    TRACING_FILE = os.getenv('TRACING_FILE', 'traces.jsonl')
+    # Allow ?profile=1 to return the span tree with JSON responses (defaults to DEBUG)
+    TRACING_PROFILE_ENABLED = os.getenv('TRACING_PROFILE_ENABLED', str(DEBUG)).lower() == 'true'
+    
     # CORS Configuration
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
 
@@ -0,0 +1,203 @@
+import re
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from utils.tracing import trace_methods
+
+# Budget category names (lowercased) -> transaction category, for budgets created
+# before categories carried an explicit "category" key (see mock_data.json)
+BUDGET_CATEGORY_ALIASES = {
+    'food & dining': 'food',
+    'food': 'food',
+    'groceries': 'food',
+    'transport': 'transport',
+    'transportation': 'transport',
+    'shopping': 'shopping',
+    'bills & utilities': 'bills',
+    'bills': 'bills',
+    'utilities': 'bills',
+    'entertainment': 'entertainment',
+    'healthcare': 'healthcare',
+    'health': 'healthcare',
+    'education': 'education',
+    'emi': 'emi',
+    'loan emi': 'emi',
+}
+
+_KEY_CLEAN = re.compile(r'[.$]')
+_NAME_CLEAN = re.compile(r'[^a-z0-9]+')
+
+
+def current_month():
+    """Month bucket (YYYY-MM) budgets are evaluated against by default"""
+    return datetime.now().strftime('%Y-%m')
+
+
+def rollup_key(category):
+    """Field-safe rollup key for a transaction category ('.' and '$' can't appear in field names)"""
+    return _KEY_CLEAN.sub('_', str(category or 'other')) or 'other'
+
+
+def budget_category_key(category):
+    """Transaction category a budget category tracks"""
+    explicit = category.get('category')
+    if explicit:
+        return rollup_key(str(explicit).strip().lower())
+    name = str(category.get('name') or '').strip().lower()
+    return BUDGET_CATEGORY_ALIASES.get(name) or _NAME_CLEAN.sub('_', name).strip('_') or 'other'
+
+
+def rollup_deltas(docs, sign=1, deltas=None):
+    """
+    Accumulate signed expense amounts per (month, category key)
+
+    Args:
+        docs: Transactions (stored or validated shape)
+        sign: 1 when the transactions are added, -1 when removed
+        deltas: Existing dict to add into
+
+    Returns:
+        {(month, key): amount}
+    """
+    deltas = {} if deltas is None else deltas
+    for doc in docs:
+        if doc.get('type') != 'expense' or not doc.get('date'):
+            continue
+        bucket = (str(doc['date'])[:7], rollup_key(doc.get('category')))
+        deltas[bucket] = deltas.get(bucket, 0) + sign * (doc.get('amount') or 0)
+    return deltas
+
+
+def apply_budget_totals(budget, totals, month, keep_manual=True):
+    """
+    Return a copy of a budget with spent taken from a month's rollup for the
+    categories that have transactions that month
+
+    Overlaid categories are marked spent_source "transactions" (their spent
+    can't be edited by hand); the others keep their manually entered spent.
+
+    Args:
+        budget: budget section of financial_data (categories with name/budget/spent)
+        totals: {category key: spent} from BudgetRollupModel.month_totals
+        month: The rollup's month (YYYY-MM)
+        keep_manual: False to report 0 for categories without transactions
+            (manual spent values describe the current month only)
+    """
+    categories = []
+    for category in budget.get('categories') or []:
+        manual = {key: value for key, value in category.items() if key != 'spent_source'}
+        key = budget_category_key(category)
+        if key in totals:
+            categories.append({**manual, 'spent': totals[key], 'spent_source': 'transactions'})
+        elif keep_manual:
+            categories.append(manual)
+        else:
+            categories.append({**manual, 'spent': 0})
+    return {**budget, 'categories': categories, 'spent_month': month, 'spent_source': 'transactions'}
+
+
+@trace_methods
+class BudgetRollupModel:
+    """budget_rollups collection: one document per user and month with spent totals by category"""
+
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def collection(self):
+        """budget_rollups collection for the current process's client"""
+        return self.db.budget_rollups
+
+    def ensure_indexes(self):
+        """Create the (user_id, month) lookup index (idempotent)"""
+        self.collection.create_index(
+            [("user_id", ASCENDING), ("month", ASCENDING)],
+            name="user_month",
+            unique=True
+        )
+
+    def apply_deltas(self, user_obj_id, deltas):
+        """$inc the affected (month, category) totals in one unordered bulk write"""
+        by_month = {}
+        for (month, key), amount in deltas.items():
+            if amount:
+                by_month.setdefault(month, {})[f"spent.{key}"] = amount
+        if not by_month:
+            return
+        updated_at = datetime.now().isoformat()
+        self.collection.bulk_write([
+            UpdateOne(
+                {"user_id": user_obj_id, "month": month},
+                {"$inc": increments, "$set": {"updated_at": updated_at}},
+                upsert=True
+            )
+            for month, increments in by_month.items()
+        ], ordered=False)
+
+    def month_totals(self, user_id, month=None):
+        """
+        Spent totals by category for one month
+
+        Returns:
+            ({category key: spent}, None), or (None, None) if the month has no rollup
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        doc = self.collection.find_one({"user_id": user_obj_id, "month": month or current_month()}, {"spent": 1})
+        if not doc:
+            return None, None
+        # Repeated float $inc can leave residue like 0.30000000000000004
+        return {key: round(value, 2) for key, value in (doc.get('spent') or {}).items()}, None
+
+    def recompute_user(self, user_id):
+        """
+        Rebuild a user's rollups from the transactions collection (repair job)
+
+        Returns:
+            (number of month documents written, error)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return 0, "Invalid user ID"
+
+        pipeline = [
+            {"$match": {"user_id": user_obj_id, "type": "expense"}},
+            {"$group": {
+                "_id": {"month": {"$substr": ["$date", 0, 7]}, "category": "$category"},
+                "spent": {"$sum": "$amount"}
+            }}
+        ]
+        months = {}
+        for row in self.db.transactions.aggregate(pipeline):
+            month = row["_id"]["month"]
+            key = rollup_key(row["_id"]["category"])
+            spent = months.setdefault(month, {})
+            spent[key] = spent.get(key, 0) + row["spent"]
+
+        # Overwrite (rather than delete and re-insert) so readers never see a missing month
+        updated_at = datetime.now().isoformat()
+        if months:
+            self.collection.bulk_write([
+                UpdateOne(
+                    {"user_id": user_obj_id, "month": month},
+                    {"$set": {"spent": spent, "updated_at": updated_at}},
+                    upsert=True
+                )
+                for month, spent in months.items()
+            ], ordered=False)
+        self.collection.delete_many({"user_id": user_obj_id, "month": {"$nin": list(months)}})
+        return len(months), None
+
+    def delete_user(self, user_id):
+        """Delete every rollup of a user"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        result = self.collection.delete_many({"user_id": user_obj_id})
+        return {"success": True, "deleted": result.deleted_count}, None
@@ -0,0 +1,192 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+from utils.tracing import trace_methods
+from utils.change_log import EXCLUDED_FIELDS, apply_update, snapshot_state
+from models.trend_model import numeric_total
+
+# A full snapshot is stored every this many logged writes, bounding replay to as many deltas
+SNAPSHOT_INTERVAL = 50
+
+# Deltas replayed for a net-worth history request at most
+MAX_HISTORY_REPLAY = 5000
+
+
+@trace_methods
+class ChangeLogModel:
+    """
+    financial_changes collection: append-only log of financial_data writes
+
+    Each FinanceModel write atomically increments financial_data.change_seq and
+    appends a delta with that seq. Snapshots store the replayable document
+    state together with the change_seq it reflects.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def collection(self):
+        """financial_changes collection for the current process's client"""
+        return self.db.financial_changes
+
+    def ensure_indexes(self):
+        """Create the replay and count indexes (idempotent)"""
+        self.collection.create_index(
+            [("user_id", ASCENDING), ("kind", ASCENDING), ("seq", ASCENDING)],
+            name="user_kind_seq",
+            unique=True
+        )
+        # Serves time lookups (latest snapshot at or before a date) and update counts
+        self.collection.create_index(
+            [("user_id", ASCENDING), ("kind", ASCENDING), ("ts", DESCENDING)],
+            name="user_kind_ts"
+        )
+
+    def record(self, user_obj_id, seq, delta, array_filters=None, source=None):
+        """Append one delta (and a snapshot when one is due)"""
+        entry = {
+            "user_id": user_obj_id,
+            "kind": "delta",
+            "seq": seq,
+            "ts": datetime.now().isoformat(),
+            "update": delta
+        }
+        if array_filters:
+            entry["array_filters"] = array_filters
+        if source:
+            entry["source"] = source
+        self.collection.insert_one(entry)
+        if seq == 1 or seq % SNAPSHOT_INTERVAL == 0:
+            self.snapshot(user_obj_id)
+
+    def snapshot(self, user_obj_id):
+        """Store the current document state with the change_seq it reflects"""
+        projection = {field: 0 for field in EXCLUDED_FIELDS if field != 'change_seq'}
+        doc = self.db.financial_data.find_one({"user_id": user_obj_id}, projection)
+        if not doc or not doc.get("change_seq"):
+            return
+        try:
+            self.collection.insert_one({
+                "user_id": user_obj_id,
+                "kind": "snapshot",
+                "seq": doc["change_seq"],
+                "ts": datetime.now().isoformat(),
+                "state": snapshot_state(doc)
+            })
+        except DuplicateKeyError:
+            pass  # a concurrent writer already captured this seq
+
+    def list_changes(self, user_id, limit=50, before_seq=None):
+        """
+        Most recent deltas first
+
+        Returns:
+            ({"changes": [...], "next_before_seq": int or None}, None)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        query = {"user_id": user_obj_id, "kind": "delta"}
+        if before_seq is not None:
+            query["seq"] = {"$lt": before_seq}
+        docs = list(
+            self.collection.find(query, {"_id": 0, "user_id": 0, "kind": 0})
+            .sort("seq", DESCENDING)
+            .limit(limit + 1)
+        )
+        next_before_seq = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_before_seq = docs[-1]["seq"]
+        return {"changes": docs, "next_before_seq": next_before_seq}, None
+
+    def _base_snapshot(self, user_obj_id, at=None):
+        query = {"user_id": user_obj_id, "kind": "snapshot"}
+        if at is not None:
+            query["ts"] = {"$lte": at}
+        return self.collection.find_one(query, sort=[("ts", DESCENDING)])
+
+    def rebuild_at(self, user_id, at):
+        """
+        Rebuild the document as of an ISO timestamp: latest snapshot at or
+        before it, plus the deltas after that snapshot up to the timestamp
+
+        Returns:
+            ({"as_of", "seq", "replayed", "data"}, None) or (None, error)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        snapshot = self._base_snapshot(user_obj_id, at)
+        if not snapshot:
+            first = self.collection.find_one({"user_id": user_obj_id, "kind": "snapshot"}, {"ts": 1},
+                                             sort=[("ts", ASCENDING)])
+            if first:
+                return None, f"History starts at {first['ts']}"
+            return None, "No history recorded yet"
+
+        state = snapshot["state"]
+        seq = snapshot["seq"]
+        replayed = 0
+        cursor = self.collection.find({
+            "user_id": user_obj_id, "kind": "delta", "seq": {"$gt": seq}, "ts": {"$lte": at}
+        }).sort("seq", ASCENDING)
+        for delta in cursor:
+            apply_update(state, delta["update"], delta.get("array_filters"))
+            seq = delta["seq"]
+            replayed += 1
+        return {"as_of": at, "seq": seq, "replayed": replayed, "data": state}, None
+
+    def net_worth_history(self, user_id, since=None, until=None):
+        """
+        Assets, liabilities and net worth after every logged change that touched them
+
+        Returns:
+            ([{"ts", "seq", "assets", "liabilities", "net_worth"}], None)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return [], "Invalid user ID"
+
+        snapshot = (self._base_snapshot(user_obj_id, since) if since else None) or \
+            self.collection.find_one({"user_id": user_obj_id, "kind": "snapshot"}, sort=[("seq", ASCENDING)])
+        if not snapshot:
+            return [], None
+
+        state = snapshot["state"]
+
+        def point(ts, seq):
+            assets = numeric_total(state.get("assets"))
+            liabilities = numeric_total(state.get("liabilities"))
+            return {"ts": ts, "seq": seq, "assets": assets, "liabilities": liabilities,
+                    "net_worth": assets - liabilities}
+
+        points = [point(snapshot["ts"], snapshot["seq"])]
+        query = {"user_id": user_obj_id, "kind": "delta", "seq": {"$gt": snapshot["seq"]}}
+        if until:
+            query["ts"] = {"$lte": until}
+        for delta in self.collection.find(query).sort("seq", ASCENDING).limit(MAX_HISTORY_REPLAY):
+            apply_update(state, delta["update"], delta.get("array_filters"))
+            touched = {path.split('.', 1)[0] for fields in delta["update"].values() for path in fields}
+            if touched & {"assets", "liabilities"}:
+                points.append(point(delta["ts"], delta["seq"]))
+        if since:
+            points = [p for p in points if p["ts"] >= since] or points[-1:]
+        return points, None
+
+    def delete_user(self, user_id):
+        """Delete a user's whole change log"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        result = self.collection.delete_many({"user_id": user_obj_id})
+        return {"success": True, "deleted": result.deleted_count}, None
@@ -0,0 +1,118 @@
+import os
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from utils.tracing import trace_methods
+
+
+def serialize_job(doc):
+    """Convert a stored job into the API shape (without the server file path)"""
+    return {
+        "id": str(doc["_id"]),
+        "format": doc.get("format"),
+        "status": doc.get("status"),
+        "size": doc.get("size"),
+        "error": doc.get("error"),
+        "created_at": doc.get("created_at"),
+        "finished_at": doc.get("finished_at"),
+        "expires_at": doc["expires_at"].isoformat() if doc.get("expires_at") else None
+    }
+
+
+@trace_methods
+class ExportJobModel:
+    """export_jobs collection: background data exports (status and result file)"""
+
+    def __init__(self, db, ttl_hours=24):
+        self.db = db
+        self.ttl = timedelta(hours=ttl_hours)
+
+    @property
+    def collection(self):
+        """export_jobs collection for the current process's client"""
+        return self.db.export_jobs
+
+    def ensure_indexes(self):
+        """Create the lookup and expiry indexes (idempotent)"""
+        self.collection.create_index(
+            [("user_id", ASCENDING), ("created_at", DESCENDING)],
+            name="user_created"
+        )
+        # MongoDB removes job documents once expires_at passes; files are swept separately
+        self.collection.create_index("expires_at", name="expires_at_ttl", expireAfterSeconds=0)
+
+    def create(self, user_id, export_format):
+        """
+        Record a queued export job
+
+        Returns:
+            ({"id", "user_id", "format", ...}, None) or (None, error)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        doc = {
+            "user_id": user_obj_id,
+            "format": export_format,
+            "status": "queued",
+            "created_at": datetime.now().isoformat(),
+            "expires_at": datetime.utcnow() + self.ttl
+        }
+        result = self.collection.insert_one(doc)
+        doc["_id"] = result.inserted_id
+        job = serialize_job(doc)
+        job["user_id"] = str(user_obj_id)
+        return job, None
+
+    def mark_running(self, job_id):
+        """Flag a job as picked up by a worker"""
+        self.collection.update_one({"_id": ObjectId(job_id)}, {"$set": {"status": "running"}})
+
+    def mark_done(self, job_id, path, size):
+        """Record a finished job's file"""
+        self.collection.update_one(
+            {"_id": ObjectId(job_id)},
+            {"$set": {"status": "done", "path": path, "size": size, "finished_at": datetime.now().isoformat()}}
+        )
+
+    def mark_failed(self, job_id, error):
+        """Record why a job failed"""
+        self.collection.update_one(
+            {"_id": ObjectId(job_id)},
+            {"$set": {"status": "failed", "error": error, "finished_at": datetime.now().isoformat()}}
+        )
+
+    def get(self, user_id, job_id):
+        """
+        A user's job, including its file path (None if missing, expired or not theirs)
+
+        Returns:
+            (job document or None, error)
+        """
+        try:
+            query = {"_id": ObjectId(job_id), "user_id": ObjectId(user_id)}
+        except Exception:
+            return None, "Invalid job ID"
+
+        doc = self.collection.find_one(query)
+        # The TTL monitor runs about once a minute, so check expiry here as well
+        if not doc or (doc.get("expires_at") and doc["expires_at"] <= datetime.utcnow()):
+            return None, None
+        return doc, None
+
+    def delete_user(self, user_id):
+        """Delete a user's jobs and their export files"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        for doc in self.collection.find({"user_id": user_obj_id, "path": {"$exists": True}}, {"path": 1}):
+            try:
+                os.remove(doc["path"])
+            except OSError:
+                pass
+        result = self.collection.delete_many({"user_id": user_obj_id})
+        return {"success": True, "deleted": result.deleted_count}, None
@@ -1,12 +1,105 @@
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import OperationFailure
 from bson import ObjectId
+from utils.tracing import trace_methods
+from models.transaction_model import TransactionModel
+from models.change_log_model import ChangeLogModel
+from utils.change_log import compact_update
 
+# Documents holding a partial goal list (1-4 goals), which never override mock goals
+PARTIAL_GOALS_FILTER = {"goals.0": {"$exists": True}, "goals.4": {"$exists": False}}
+
+# Array fields exports stream element by element instead of loading with the document
+EXPORT_STREAMED_FIELDS = ('reports', 'custom_graphs', 'transactions')
+
+@trace_methods
 class FinanceModel:
     """Financial data model for MongoDB operations"""
     
-    def __init__(self, db):
-        self.collection = db.financial_data
+    def __init__(self, db, write_buffer=None):
+        self.db = db
+        # Optional utils.write_buffer.WriteCoalescer; see flush_pending
+        self.write_buffer = write_buffer
+        self.transactions = TransactionModel(db)
+        self.changes = ChangeLogModel(db)
+    
+    @property
+    def collection(self):
+        """financial_data collection for the current process's client"""
+        return self.db.financial_data
+    
+    def flush_pending(self, user_id):
+        """
+        Write any buffered patches for a user before reading or writing directly
+        
+        Only this process's buffer is flushed; patches pending in another
+        worker stay invisible until its window elapses (see utils/write_buffer.py)
+        """
+        if self.write_buffer is not None:
+            self.write_buffer.flush_user(str(user_id))
+    
+    def discard_pending(self, user_id):
+        """Drop buffered patches for a user (their data is being deleted)"""
+        if self.write_buffer is not None:
+            self.write_buffer.discard_user(str(user_id))
+    
+    def pop_write_failure(self, user_id):
+        """Buffered patches of a user that failed to write since the last call (None if none)"""
+        if self.write_buffer is None:
+            return None
+        return self.write_buffer.pop_failure(str(user_id))
+    
+    def _logged_update(self, user_obj_id, operation, upsert=False, array_filters=None, query=None, source=None):
+        """
+        Apply one update and append its delta to the change log
+        
+        change_seq is incremented in the same atomic write, so the pre-image's
+        value numbers the delta exactly. Costs the same round trip as
+        update_one plus one insert into financial_changes.
+        
+        Returns:
+            None if nothing matched (and upsert is off), else
+            {"inserted", "seq", "data_version"} where data_version is the
+            version after the write
+        """
+        operation = {key: dict(value) for key, value in operation.items()}
+        operation.setdefault("$inc", {})["change_seq"] = 1
+        before = self.collection.find_one_and_update(
+            query or {"user_id": user_obj_id},
+            operation,
+            projection={"_id": 0, "change_seq": 1, "data_version": 1},
+            array_filters=array_filters or None,
+            upsert=upsert,
+            return_document=ReturnDocument.BEFORE
+        )
+        if before is None and not upsert:
+            return None
+        inserted = before is None
+        before = before or {}
+        seq = before.get("change_seq", 0) + 1
+        version = before.get("data_version", 0) + operation["$inc"].get("data_version", 0)
+        if inserted and "data_version" in operation.get("$setOnInsert", {}):
+            version = operation["$setOnInsert"]["data_version"]
+        delta = compact_update(operation, inserted=inserted)
+        if delta:
+            self.changes.record(user_obj_id, seq, delta, array_filters, source)
+        return {"inserted": inserted, "seq": seq, "data_version": version}
+    
+    def seed_data(self, user_id, fields):
+        """Store initial financial data for a new user (signup), creating the document"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+        
+        result = self._logged_update(
+            user_obj_id,
+            {"$set": fields, "$inc": {"data_version": 1}},
+            upsert=True,
+            source='seed_data'
+        )
+        return {"success": True, "inserted": result["inserted"]}, None
     
     def add_or_update_data(self, user_id, assets=None, liabilities=None, goals=None):
         """Add or update user financial data"""
@@ -14,6 +107,7 @@ class FinanceModel:
             user_obj_id = ObjectId(user_id)
         except Exception:
             return None, "Invalid user ID"
+        self.flush_pending(user_id)
         
         # Prepare update document
         update_doc = {
@@ -45,7 +139,7 @@ class FinanceModel:
             # If goals is empty list [], treat as None (remove)
         
         # Prepare MongoDB update operation
-        update_operation = {"$set": update_doc}
+        update_operation = {"$set": update_doc, "$inc": {"data_version": 1}}
         
         # If goals should be removed (None, empty list, or partial set), use $unset
         if goals_to_save is None or (isinstance(goals, list) and len(goals) == 0):
@@ -55,13 +149,9 @@ class FinanceModel:
             print(f"🧹 Removing goals field from MongoDB for user {user_id}")
         
         # Use upsert to insert or update
-        result = self.collection.update_one(
-            {"user_id": user_obj_id},
-            update_operation,
-            upsert=True
-        )
+        result = self._logged_update(user_obj_id, update_operation, upsert=True, source='add_or_update_data')
         
-        return {"success": True, "updated": result.modified_count > 0, "inserted": result.upserted_id is not None}, None
+        return {"success": True, "updated": not result["inserted"], "inserted": result["inserted"]}, None
     
     def get_data(self, user_id):
         """Get financial data for a user"""
@@ -69,40 +159,200 @@ class FinanceModel:
             user_obj_id = ObjectId(user_id)
         except Exception:
             return None, "Invalid user ID"
+        self.flush_pending(user_id)
         
         data = self.collection.find_one({"user_id": user_obj_id})
         if data:
             data['_id'] = str(data['_id'])
             data['user_id'] = str(data['user_id'])
+            # Transactions live in their own collection unless an unmigrated embedded array exists
+            if data.get('transactions_migrated') or not data.get('transactions'):
+                data['transactions'], _ = self.transactions.recent_transactions(user_id)
+        return data, None
+    
+    def get_export_document(self, user_id):
+        """
+        The stored document without its streamed arrays (reports, custom
+        graphs and transactions), for exports that emit those one by one
+        
+        Returns:
+            (document or None, has_embedded_transactions, error)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, False, "Invalid user ID"
+        self.flush_pending(user_id)
+        
+        data = self.collection.find_one(
+            {"user_id": user_obj_id},
+            {field: 0 for field in EXPORT_STREAMED_FIELDS}
+        )
+        if not data:
+            return None, False, None
+        data['_id'] = str(data['_id'])
+        data['user_id'] = str(data['user_id'])
+        embedded = not data.get('transactions_migrated') and self.collection.count_documents(
+            {"user_id": user_obj_id, "transactions.0": {"$exists": True}}, limit=1) > 0
+        return data, embedded, None
+    
+    def iter_array(self, user_id, field):
+        """
+        Yield the elements of one array field of a user's document
+        
+        $unwind runs server-side, so elements arrive in cursor batches instead
+        of one document holding the whole array. A legacy non-array value is
+        yielded as a single element.
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return
+        
+        pipeline = [
+            {"$match": {"user_id": user_obj_id}},
+            {"$project": {"_id": 0, "item": f"${field}"}},
+            {"$unwind": "$item"}
+        ]
+        for row in self.collection.aggregate(pipeline):
+            yield row["item"]
+    
+    def get_data_version(self, user_id):
+        """Get only data_version and last_updated (cheap change probe for cached views)"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+        self.flush_pending(user_id)
+        
+        data = self.collection.find_one(
+            {"user_id": user_obj_id},
+            {"_id": 0, "data_version": 1, "last_updated": 1}
+        )
         return data, None
     
+    def cleanup_partial_goals(self):
+        """
+        Remove partial goal lists (1-4 goals) from every user in one update_many.
+        One-time migration for documents written before partial saves were blocked
+        (not recorded in the change log); returns the number of documents modified.
+        """
+        result = self.collection.update_many(
+            PARTIAL_GOALS_FILTER,
+            {"$unset": {"goals": ""}, "$inc": {"data_version": 1}}
+        )
+        return result.modified_count
+    
+    def apply_patch(self, user_id, update, array_filters=None, nested_roots=None,
+                    expected_version=None, defaults=None):
+        """
+        Apply a compiled patch (see utils.financial_patch) in one round trip
+        
+        Args:
+            user_id: User ID
+            update: MongoDB update operators
+            array_filters: arrayFilters for [key=value] path segments
+            nested_roots: Top-level fields edited below their root
+            expected_version: Optional data_version the client last read; the
+                write only happens if it still matches (optimistic concurrency)
+            defaults: Values shown for fields not stored yet (mock data). A
+                nested edit under such a field first copies the default in,
+                so the patch applies to what the user actually sees.
+        
+        Returns:
+            ({"success", "version"}, None) on success, or
+            ({"success": False, "conflict": True, "version": current}, error)
+            when expected_version is stale
+        """
+        self.flush_pending(user_id)
+        return self._apply_patch(user_id, update, array_filters, nested_roots, expected_version, defaults)
+    
+    def _apply_patch(self, user_id, update, array_filters=None, nested_roots=None,
+                     expected_version=None, defaults=None):
+        """apply_patch without flushing buffered writes (used by the write buffer itself)"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+        
+        operation = {key: dict(value) for key, value in update.items()}
+        operation.setdefault("$set", {})["last_updated"] = datetime.now().isoformat()
+        operation.setdefault("$inc", {})["data_version"] = 1
+        
+        query = {"user_id": user_obj_id}
+        if expected_version is not None:
+            # Documents written before data_version existed count as version 0
+            query["data_version"] = {"$in": [0, None]} if expected_version == 0 else expected_version
+        seeded_roots = [root for root in (nested_roots or []) if defaults and root in defaults]
+        for root in seeded_roots:
+            query[root] = {"$exists": True}
+        
+        # Only unconditional patches may create the document (no unique index on user_id)
+        can_upsert = expected_version is None and not seeded_roots
+        
+        for attempt in range(2):
+            try:
+                result = self._logged_update(
+                    user_obj_id, operation, upsert=can_upsert, array_filters=array_filters,
+                    query=query, source='patch'
+                )
+            except OperationFailure as e:
+                # e.g. a nested path through a non-object value
+                return None, f"Patch rejected: {(e.details or {}).get('errmsg', str(e))}"
+            if result is not None:
+                return {"success": True, "version": result["data_version"]}, None
+            
+            # No match: either the version is stale or a default must be materialized
+            projection = {"_id": 0, "data_version": 1}
+            projection.update({root: 1 for root in seeded_roots})
+            current = self.collection.find_one({"user_id": user_obj_id}, projection)
+            # A missing document (or one written before data_version existed) is version 0
+            current_version = (current or {}).get("data_version", 0)
+            if expected_version is not None and current_version != expected_version:
+                return {"success": False, "conflict": True, "version": current_version}, "Version conflict"
+            if attempt:
+                break
+            
+            missing = {root: defaults[root] for root in seeded_roots if not current or root not in current}
+            if current is None:
+                self._logged_update(
+                    user_obj_id,
+                    {"$setOnInsert": {"data_version": 0, **missing}},
+                    upsert=True,
+                    source='patch_defaults'
+                )
+            else:
+                for root, value in missing.items():
+                    self._logged_update(
+                        user_obj_id,
+                        {"$set": {root: value}},
+                        query={"user_id": user_obj_id, root: {"$exists": False}},
+                        source='patch_defaults'
+                    )
+        
+        return None, "Patch could not be applied"
+    
     def remove_goals(self, user_id):
         """Remove goals field from user financial data"""
         try:
             user_obj_id = ObjectId(user_id)
         except Exception:
             return None, "Invalid user ID"
+        self.flush_pending(user_id)
         
-        # Remove goals field and ensure it's completely deleted
-        result = self.collection.update_one(
-            {"user_id": user_obj_id},
-            {"$unset": {"goals": ""}}
+        # Only documents that still hold goals are written, so a no-op call
+        # neither bumps data_version nor logs a delta
+        result = self._logged_update(
+            user_obj_id,
+            {"$unset": {"goals": ""}, "$inc": {"data_version": 1}},
+            query={"user_id": user_obj_id, "goals": {"$exists": True}},
+            source='remove_goals'
         )
         
-        if result.modified_count > 0:
+        if result is not None:
             print(f"✅ Successfully removed goals from MongoDB for user {user_id}")
-        else:
-            # Check if goals field existed
-            existing = self.collection.find_one({"user_id": user_obj_id}, {"goals": 1})
-            if existing and "goals" in existing:
-                print(f"⚠️ Goals field still exists for user {user_id} - retrying removal...")
-                # Force removal again
-                self.collection.update_one(
-                    {"user_id": user_obj_id},
-                    {"$unset": {"goals": ""}}
-                )
         
-        return {"success": True, "updated": result.modified_count > 0}, None
+        return {"success": True, "updated": result is not None}, None
     
     def set_assets(self, user_id, assets):
         """Set assets for a user"""
@@ -122,19 +372,22 @@ class FinanceModel:
             user_obj_id = ObjectId(user_id)
         except Exception:
             return None, "Invalid user ID"
+        self.flush_pending(user_id)
         
-        result = self.collection.update_one(
-            {"user_id": user_obj_id},
+        result = self._logged_update(
+            user_obj_id,
             {
                 "$set": {
                     "budget": budget,
                     "last_updated": datetime.now().isoformat()
-                }
+                },
+                "$inc": {"data_version": 1}
             },
-            upsert=True
+            upsert=True,
+            source='update_budget'
         )
         
-        return {"success": True, "updated": result.modified_count > 0, "inserted": result.upserted_id is not None}, None
+        return {"success": True, "updated": not result["inserted"], "inserted": result["inserted"]}, None
     
     def update_investments(self, user_id, investments):
         """Update investments data for a user"""
@@ -142,19 +395,22 @@ class FinanceModel:
             user_obj_id = ObjectId(user_id)
         except Exception:
             return None, "Invalid user ID"
+        self.flush_pending(user_id)
         
-        result = self.collection.update_one(
-            {"user_id": user_obj_id},
+        result = self._logged_update(
+            user_obj_id,
             {
                 "$set": {
                     "investments": investments,
                     "last_updated": datetime.now().isoformat()
-                }
+                },
+                "$inc": {"data_version": 1}
             },
-            upsert=True
+            upsert=True,
+            source='update_investments'
         )
         
-        return {"success": True, "updated": result.modified_count > 0, "inserted": result.upserted_id is not None}, None
+        return {"success": True, "updated": not result["inserted"], "inserted": result["inserted"]}, None
     
     def save_custom_graph(self, user_id, graph_data):
         """Save a custom graph configuration for a user"""
@@ -164,16 +420,18 @@ class FinanceModel:
             return None, "Invalid user ID"
         
         # Initialize custom_graphs array if it doesn't exist
-        result = self.collection.update_one(
-            {"user_id": user_obj_id},
+        result = self._logged_update(
+            user_obj_id,
             {
                 "$set": {"last_updated": datetime.now().isoformat()},
+                "$inc": {"data_version": 1},
                 "$push": {"custom_graphs": graph_data}
             },
-            upsert=True
+            upsert=True,
+            source='save_custom_graph'
         )
         
-        return {"success": True, "updated": result.modified_count > 0, "inserted": result.upserted_id is not None}, None
+        return {"success": True, "updated": not result["inserted"], "inserted": result["inserted"]}, None
     
     def get_custom_graphs(self, user_id):
         """Get all custom graphs for a user"""
@@ -194,12 +452,14 @@ class FinanceModel:
         except Exception:
             return None, "Invalid user ID"
         
-        result = self.collection.update_one(
-            {"user_id": user_obj_id},
-            {"$pull": {"custom_graphs": {"id": graph_id}}}
+        result = self._logged_update(
+            user_obj_id,
+            {"$pull": {"custom_graphs": {"id": graph_id}}, "$inc": {"data_version": 1}},
+            query={"user_id": user_obj_id, "custom_graphs.id": graph_id},
+            source='delete_custom_graph'
         )
         
-        return {"success": True, "updated": result.modified_count > 0}, None
+        return {"success": True, "updated": result is not None}, None
     
     def save_report(self, user_id, report_data):
         """Save a generated report for a user"""
@@ -215,16 +475,18 @@ class FinanceModel:
             report_data["created_at"] = datetime.now().isoformat()
         
         # Initialize reports array if it doesn't exist
-        result = self.collection.update_one(
-            {"user_id": user_obj_id},
+        result = self._logged_update(
+            user_obj_id,
             {
                 "$set": {"last_updated": datetime.now().isoformat()},
+                "$inc": {"data_version": 1},
                 "$push": {"reports": report_data}
             },
-            upsert=True
+            upsert=True,
+            source='save_report'
         )
         
-        return {"success": True, "updated": result.modified_count > 0, "inserted": result.upserted_id is not None, "report_id": report_data["id"]}, None
+        return {"success": True, "updated": not result["inserted"], "inserted": result["inserted"], "report_id": report_data["id"]}, None
     
     def get_reports(self, user_id):
         """Get all saved reports for a user"""
@@ -249,10 +511,12 @@ class FinanceModel:
         except Exception:
             return None, "Invalid user ID"
         
-        result = self.collection.update_one(
-            {"user_id": user_obj_id},
-            {"$pull": {"reports": {"id": report_id}}}
+        result = self._logged_update(
+            user_obj_id,
+            {"$pull": {"reports": {"id": report_id}}, "$inc": {"data_version": 1}},
+            query={"user_id": user_obj_id, "reports.id": report_id},
+            source='delete_report'
         )
         
-        return {"success": True, "updated": result.modified_count > 0}, None
+        return {"success": True, "updated": result is not None}, None
 
@@ -0,0 +1,60 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING
+from utils.tracing import trace_methods
+
+
+@trace_methods
+class ForecastModel:
+    """cashflow_forecasts collection: fitted cash-flow forecast parameters per user"""
+
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def collection(self):
+        """cashflow_forecasts collection for the current process's client"""
+        return self.db.cashflow_forecasts
+
+    def ensure_indexes(self):
+        """Create the per-user lookup index (idempotent)"""
+        self.collection.create_index([("user_id", ASCENDING)], name="user", unique=True)
+
+    def get_state(self, user_id):
+        """
+        Fitted parameters stored for a user
+
+        Returns:
+            (state dict or None, error)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        doc = self.collection.find_one({"user_id": user_obj_id}, {"_id": 0, "state": 1})
+        return (doc or {}).get("state"), None
+
+    def save_state(self, user_id, state):
+        """Store (replace) a user's fitted parameters"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        self.collection.update_one(
+            {"user_id": user_obj_id},
+            {"$set": {"state": state, "updated_at": datetime.now().isoformat()}},
+            upsert=True
+        )
+        return {"success": True}, None
+
+    def delete_user(self, user_id):
+        """Delete a user's fitted parameters"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        result = self.collection.delete_many({"user_id": user_obj_id})
+        return {"success": True, "deleted": result.deleted_count}, None
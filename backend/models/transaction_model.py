@@ -0,0 +1,473 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+from utils.tracing import trace_methods
+from models.budget_rollup_model import BudgetRollupModel, rollup_deltas
+from models.trend_model import TrendModel
+from models.forecast_model import ForecastModel
+
+TRANSACTION_TYPES = ('income', 'expense')
+
+# Sort keys accepted by list_transactions ("-" prefix = descending)
+SORT_FIELDS = ('date', 'amount')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# How many recent transactions FinanceModel.get_data embeds for dashboards and chat context
+RECENT_TRANSACTIONS_LIMIT = 200
+
+# Transactions per batch when streaming a user's full history (exports)
+EXPORT_BATCH_SIZE = 500
+
+# financial_data documents still holding an embedded transactions array
+UNMIGRATED_FILTER = {"transactions": {"$type": "array"}, "transactions_migrated": {"$ne": True}}
+
+# Optional fields carried over from the embedded transaction shape
+OPTIONAL_FIELDS = ('payment_method', 'tags')
+
+
+def normalize_date(value):
+    """Return a YYYY-MM-DD string for a date/ISO datetime value, or None if invalid"""
+    if value is None or value == '':
+        return datetime.now().strftime('%Y-%m-%d')
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def validate_transaction(txn, partial=False):
+    """
+    Validate and normalize a transaction payload
+
+    Returns:
+        (fields, error) - fields holds only the keys present (all required
+        keys unless partial=True)
+    """
+    if not isinstance(txn, dict):
+        return None, "Transaction must be an object"
+
+    fields = {}
+    if 'type' in txn or not partial:
+        txn_type = str(txn.get('type', '')).lower().strip()
+        if txn_type not in TRANSACTION_TYPES:
+            return None, "Transaction type must be 'income' or 'expense'"
+        fields['type'] = txn_type
+    if 'amount' in txn or not partial:
+        amount = txn.get('amount')
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            return None, "Transaction amount must be a number"
+        if amount < 0:
+            return None, "Transaction amount must not be negative"
+        fields['amount'] = int(amount) if amount.is_integer() else round(amount, 2)
+    if 'category' in txn or not partial:
+        fields['category'] = str(txn.get('category') or 'other').strip().lower() or 'other'
+    if 'description' in txn or not partial:
+        fields['description'] = str(txn.get('description') or '').strip()
+    if 'date' in txn or not partial:
+        date = normalize_date(txn.get('date'))
+        if date is None:
+            return None, "Transaction date must be YYYY-MM-DD"
+        fields['date'] = date
+    for key in OPTIONAL_FIELDS:
+        if key in txn:
+            fields[key] = txn[key]
+    if partial and not fields:
+        return None, "No transaction fields provided"
+    return fields, None
+
+
+def serialize_transaction(doc):
+    """Convert a stored transaction into the API/embedded shape"""
+    txn = {key: value for key, value in doc.items() if key not in ('_id', 'user_id', 'source', 'created_at', 'import_hash')}
+    txn['id'] = str(doc['_id'])
+    return txn
+
+
+def encode_cursor(sort_value, doc_id):
+    payload = json.dumps([sort_value, str(doc_id)]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return sort_value, ObjectId(doc_id)
+    except Exception:
+        return None
+
+
+@trace_methods
+class TransactionModel:
+    """Transactions collection: one document per transaction"""
+
+    def __init__(self, db):
+        self.db = db
+        # Per-month aggregates kept current by every write below (see _record_changes)
+        self.rollups = BudgetRollupModel(db)
+        self.trends = TrendModel(db)
+        # Fitted cash-flow forecast parameters, derived from the trend buckets
+        self.forecasts = ForecastModel(db)
+
+    @property
+    def collection(self):
+        """transactions collection for the current process's client"""
+        return self.db.transactions
+
+    def ensure_indexes(self):
+        """Create the query indexes (idempotent; called at startup and by migrations)"""
+        # _id is the keyset tie-breaker, so it completes each index for sorted pagination;
+        # every list_transactions sort (date or amount, with or without a category) has one
+        for sort_field in SORT_FIELDS:
+            self.collection.create_index(
+                [("user_id", ASCENDING), (sort_field, DESCENDING), ("_id", DESCENDING)],
+                name=f"user_{sort_field}"
+            )
+            self.collection.create_index(
+                [("user_id", ASCENDING), ("category", ASCENDING), (sort_field, DESCENDING), ("_id", DESCENDING)],
+                name=f"user_category_{sort_field}"
+            )
+        # Statement imports are deduplicated by content hash (only imported rows carry one)
+        self.collection.create_index(
+            [("user_id", ASCENDING), ("import_hash", ASCENDING)],
+            name="user_import_hash",
+            unique=True,
+            partialFilterExpression={"import_hash": {"$exists": True}}
+        )
+        self.rollups.ensure_indexes()
+        self.trends.ensure_indexes()
+        self.forecasts.ensure_indexes()
+
+    def touch_financial_data(self, user_id):
+        """
+        Finish a bulk write (insert_many with touch=False): recompute the trend
+        buckets it left dirty and bump data_version once
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return
+        self.trends.refresh(user_obj_id)
+        self._touch_financial_data(user_obj_id)
+
+    def _touch_financial_data(self, user_obj_id):
+        """Bump financial_data.data_version so cached views pick up transaction changes"""
+        self.db.financial_data.update_one(
+            {"user_id": user_obj_id},
+            {"$inc": {"data_version": 1}, "$set": {"last_updated": datetime.now().isoformat()}}
+        )
+
+    def _record_changes(self, user_obj_id, added=(), removed=(), refresh=True):
+        """
+        Propagate written transactions to the derived per-month aggregates:
+        budget spent rollups by $inc, trend buckets by marking their months
+        dirty and re-aggregating them, so reads never write
+
+        Args:
+            refresh: False to leave the dirty buckets for touch_financial_data
+                (bulk writers, which refresh once at the end)
+        """
+        added, removed = list(added), list(removed)
+        self.rollups.apply_deltas(user_obj_id, rollup_deltas(added, deltas=rollup_deltas(removed, sign=-1)))
+        self.trends.mark_dirty(user_obj_id, {str(doc.get('date') or '')[:7] for doc in added + removed})
+        if refresh:
+            self.trends.refresh(user_obj_id)
+
+    def add_transaction(self, user_id, txn):
+        """Add a single transaction"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        fields, error = validate_transaction(txn)
+        if error:
+            return None, error
+
+        doc = {"user_id": user_obj_id, **fields, "created_at": datetime.now().isoformat()}
+        result = self.collection.insert_one(doc)
+        self._record_changes(user_obj_id, added=[doc])
+        self._touch_financial_data(user_obj_id)
+        return serialize_transaction({**doc, "_id": result.inserted_id}), None
+
+    def insert_many(self, user_id, transactions, source=None, touch=True):
+        """
+        Insert already-validated transactions in one unordered batch
+
+        Args:
+            touch: Refresh trend buckets and bump financial_data.data_version
+                afterwards (bulk importers pass False and call
+                touch_financial_data once at the end)
+
+        Returns:
+            (inserted_count, None)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return 0, "Invalid user ID"
+
+        if not transactions:
+            return 0, None
+        created_at = datetime.now().isoformat()
+        docs = []
+        for txn in transactions:
+            doc = {"user_id": user_obj_id, **txn, "created_at": created_at}
+            if source:
+                doc["source"] = source
+            docs.append(doc)
+        try:
+            result = self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: everything but the failed documents was written, so roll those up
+            failed = {error['index'] for error in e.details.get('writeErrors', [])}
+            self._record_changes(user_obj_id, added=(doc for index, doc in enumerate(docs) if index not in failed),
+                                 refresh=touch)
+            if touch:
+                self._touch_financial_data(user_obj_id)
+            raise
+        self._record_changes(user_obj_id, added=docs, refresh=touch)
+        if touch:
+            self._touch_financial_data(user_obj_id)
+        return len(result.inserted_ids), None
+
+    def update_transaction(self, user_id, transaction_id, changes):
+        """Update fields of one transaction; returns the updated transaction"""
+        try:
+            user_obj_id = ObjectId(user_id)
+            txn_obj_id = ObjectId(transaction_id)
+        except Exception:
+            return None, "Invalid transaction ID"
+
+        fields, error = validate_transaction(changes, partial=True)
+        if error:
+            return None, error
+
+        # The previous version is needed to move its amount out of the old month/category
+        before = self.collection.find_one_and_update(
+            {"_id": txn_obj_id, "user_id": user_obj_id},
+            {"$set": fields},
+            return_document=ReturnDocument.BEFORE
+        )
+        if not before:
+            return None, "Transaction not found"
+        doc = {**before, **fields}
+        self._record_changes(user_obj_id, added=[doc], removed=[before])
+        self._touch_financial_data(user_obj_id)
+        return serialize_transaction(doc), None
+
+    def delete_transaction(self, user_id, transaction_id):
+        """Delete one transaction"""
+        try:
+            user_obj_id = ObjectId(user_id)
+            txn_obj_id = ObjectId(transaction_id)
+        except Exception:
+            return None, "Invalid transaction ID"
+
+        doc = self.collection.find_one_and_delete({"_id": txn_obj_id, "user_id": user_obj_id})
+        if not doc:
+            return None, "Transaction not found"
+        self._record_changes(user_obj_id, removed=[doc])
+        self._touch_financial_data(user_obj_id)
+        return {"success": True, "deleted": serialize_transaction(doc)}, None
+
+    def list_transactions(self, user_id, start_date=None, end_date=None, category=None,
+                          txn_type=None, sort='-date', limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """
+        List transactions with filters and keyset (cursor) pagination
+
+        Args:
+            user_id: User ID
+            start_date / end_date: Inclusive YYYY-MM-DD bounds
+            category: Category filter (uses the user/category/date index)
+            txn_type: 'income' or 'expense'
+            sort: 'date', '-date', 'amount' or '-amount' (ties broken by _id)
+            limit: Page size (1..MAX_PAGE_SIZE)
+            cursor: next_cursor from the previous page
+
+        Returns:
+            ({"transactions": [...], "next_cursor": str or None}, None)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        descending = sort.startswith('-')
+        sort_field = sort.lstrip('-')
+        if sort_field not in SORT_FIELDS:
+            return None, f"Sort must be one of: {', '.join(SORT_FIELDS)} (prefix '-' for descending)"
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        query = {"user_id": user_obj_id}
+        if start_date or end_date:
+            date_range = {}
+            for bound, op in ((start_date, "$gte"), (end_date, "$lte")):
+                if bound:
+                    normalized = normalize_date(bound)
+                    if normalized is None:
+                        return None, "Dates must be YYYY-MM-DD"
+                    date_range[op] = normalized
+            query["date"] = date_range
+        if category:
+            query["category"] = category.strip().lower()
+        if txn_type:
+            query["type"] = txn_type
+
+        if cursor:
+            decoded = decode_cursor(cursor)
+            if decoded is None:
+                return None, "Invalid cursor"
+            last_value, last_id = decoded
+            op = "$lt" if descending else "$gt"
+            query = {"$and": [query, {"$or": [
+                {sort_field: {op: last_value}},
+                {sort_field: last_value, "_id": {op: last_id}}
+            ]}]}
+
+        direction = DESCENDING if descending else ASCENDING
+        docs = list(
+            self.collection.find(query)
+            .sort([(sort_field, direction), ("_id", direction)])
+            .limit(limit + 1)
+        )
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            last = docs[-1]
+            next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+
+        return {
+            "transactions": [serialize_transaction(doc) for doc in docs],
+            "next_cursor": next_cursor
+        }, None
+
+    def recent_transactions(self, user_id, limit=RECENT_TRANSACTIONS_LIMIT):
+        """Most recent transactions in chronological order (oldest first, like the embedded array)"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return [], "Invalid user ID"
+
+        docs = list(
+            self.collection.find({"user_id": user_obj_id})
+            .sort([("date", DESCENDING), ("_id", DESCENDING)])
+            .limit(limit)
+        )
+        docs.reverse()
+        return [serialize_transaction(doc) for doc in docs], None
+
+    def all_transactions(self, user_id):
+        """Every transaction of a user in chronological order (exports)"""
+        try:
+            ObjectId(user_id)
+        except Exception:
+            return [], "Invalid user ID"
+        return [txn for batch in self.iter_transaction_batches(user_id) for txn in batch], None
+
+    def iter_transaction_batches(self, user_id, batch_size=EXPORT_BATCH_SIZE):
+        """
+        Yield a user's transactions in chronological order as lists of at most
+        batch_size serialized transactions (one cursor batch held at a time)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return
+
+        cursor = (
+            self.collection.find({"user_id": user_obj_id})
+            .sort([("date", ASCENDING), ("_id", ASCENDING)])
+            .batch_size(batch_size)
+        )
+        batch = []
+        for doc in cursor:
+            batch.append(serialize_transaction(doc))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def delete_user_transactions(self, user_id):
+        """Delete every transaction of a user"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        result = self.collection.delete_many({"user_id": user_obj_id})
+        self.rollups.delete_user(user_id)
+        self.trends.delete_user(user_id)
+        self.forecasts.delete_user(user_id)
+        return {"success": True, "deleted": result.deleted_count}, None
+
+    def import_embedded(self, user_id, embedded, source='embedded'):
+        """
+        Copy an embedded (financial_data.transactions style) array into the
+        collection. Copies previously imported from the same source are
+        replaced, so an interrupted migration can simply be repeated.
+
+        Returns:
+            (number of transactions imported, error)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return 0, "Invalid user ID"
+
+        docs = []
+        for position, txn in enumerate(embedded or []):
+            fields, error = validate_transaction(txn)
+            if error:
+                print(f"⚠️ Skipping transaction {position} for user {user_id}: {error}")
+                continue
+            if txn.get('id') is not None:
+                fields['legacy_id'] = txn['id']
+            docs.append(fields)
+
+        previous_query = {"user_id": user_obj_id, "source": source}
+        previous = list(self.collection.find(previous_query, {"type": 1, "amount": 1, "category": 1, "date": 1}))
+        if previous:
+            self.collection.delete_many({"_id": {"$in": [doc["_id"] for doc in previous]}})
+            self._record_changes(user_obj_id, removed=previous)
+        return self.insert_many(user_id, docs, source=source)
+
+    def migrate_user(self, user_id):
+        """
+        Move one user's embedded financial_data.transactions array (if any is
+        left) into the collection and mark the document as migrated
+
+        Returns:
+            (number of transactions migrated, error)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return 0, "Invalid user ID"
+
+        doc = self.db.financial_data.find_one({"user_id": user_obj_id, **UNMIGRATED_FILTER}, {"transactions": 1})
+        if not doc:
+            return 0, None
+        count, error = self.import_embedded(user_id, doc.get("transactions"))
+        if error:
+            return 0, error
+        self.db.financial_data.update_one(
+            {"_id": doc["_id"]},
+            {
+                "$unset": {"transactions": ""},
+                "$set": {"transactions_migrated": True, "last_updated": datetime.now().isoformat()},
+                "$inc": {"data_version": 1}
+            }
+        )
+        return count, None
@@ -0,0 +1,279 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from utils.tracing import trace_methods
+from models.budget_rollup_model import rollup_key
+
+# Months shown in analytics.monthly_trends
+DEFAULT_TREND_MONTHS = 12
+
+# Fewer months than this keep the stored (signup) trend series; one point is not a trend
+MIN_TREND_MONTHS = 2
+
+# Relative change between the last two months below which a category trend is "stable"
+STABLE_TREND_RATIO = 0.05
+
+# Transaction category -> label used by expense_categories (matches mock_data.json)
+CATEGORY_LABELS = {
+    'food': 'Food & Dining',
+    'bills': 'Bills & Utilities',
+    'emi': 'Loan EMI',
+}
+
+
+def category_label(category):
+    """Display label for a transaction category"""
+    return CATEGORY_LABELS.get(category) or str(category or 'other').replace('_', ' ').title()
+
+
+def month_label(month):
+    """'2024-01' -> 'Jan 2024' (the monthly_trends label format)"""
+    try:
+        return datetime.strptime(month, '%Y-%m').strftime('%b %Y')
+    except ValueError:
+        return month
+
+
+def _previous_month(month):
+    year, number = int(month[:4]), int(month[5:7])
+    return f"{year - 1}-12" if number == 1 else f"{year}-{number - 1:02d}"
+
+
+def _months_between(first, last):
+    """Inclusive list of YYYY-MM months from first to last"""
+    months = [last]
+    while months[-1] > first:
+        months.append(_previous_month(months[-1]))
+    months.reverse()
+    return months
+
+
+def numeric_total(section):
+    """Sum of the numeric values of an assets/liabilities section"""
+    return sum(value for value in (section or {}).values()
+               if isinstance(value, (int, float)) and not isinstance(value, bool))
+
+
+def build_trend_series(buckets, assets=None, liabilities=None, months=DEFAULT_TREND_MONTHS):
+    """
+    Turn materialized month buckets into monthly_trends and expense_categories
+
+    The window ends at the latest month with transactions; gaps are filled
+    with zero months. Assets and net worth are anchored to today's totals in
+    the latest month and walked back by each month's savings (liabilities are
+    held at today's value, as transactions don't record principal changes).
+
+    Args:
+        buckets: Month documents from TrendModel.get_buckets (ascending)
+        assets / liabilities: Current assets and liabilities sections
+        months: Window length
+
+    Returns:
+        (monthly_trends, expense_categories)
+    """
+    by_month = {bucket['month']: bucket for bucket in buckets if bucket.get('count')}
+    if not by_month:
+        return [], []
+    window = _months_between(min(by_month), max(by_month))[-months:]
+
+    assets_total = numeric_total(assets)
+    liabilities_total = numeric_total(liabilities)
+    trends = []
+    for month in reversed(window):
+        bucket = by_month.get(month, {})
+        income = round(bucket.get('income', 0), 2)
+        expenses = round(bucket.get('expenses', 0), 2)
+        trends.append({
+            'month': month_label(month),
+            'period': month,
+            'assets': round(assets_total, 2),
+            'liabilities': round(liabilities_total, 2),
+            'net_worth': round(assets_total - liabilities_total, 2),
+            'income': income,
+            'expenses': expenses,
+            'savings': round(income - expenses, 2)
+        })
+        assets_total -= income - expenses
+    trends.reverse()
+
+    totals = {}
+    for month in window:
+        for category, amount in (by_month.get(month, {}).get('by_category') or {}).items():
+            totals[category] = totals.get(category, 0) + amount
+    grand_total = sum(totals.values())
+    last = (by_month.get(window[-1], {}).get('by_category') or {}) if window else {}
+    previous = (by_month.get(window[-2], {}).get('by_category') or {}) if len(window) > 1 else {}
+
+    categories = []
+    for category, amount in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        if amount <= 0:
+            continue
+        now, before = last.get(category, 0), previous.get(category, 0)
+        if len(window) < 2 or now == before or (before and abs(now - before) / before <= STABLE_TREND_RATIO):
+            trend = 'stable'
+        else:
+            trend = 'up' if now > before else 'down'
+        categories.append({
+            'category': category_label(category),
+            'amount': round(amount, 2),
+            'percentage': round(amount / grand_total * 100, 1) if grand_total else 0,
+            'trend': trend
+        })
+    return trends, categories
+
+
+def _month_query(months):
+    """Date-range clauses selecting the given months (served by the user_date index)"""
+    return [{"date": {"$gte": f"{month}-01", "$lte": f"{month}-31"}} for month in months]
+
+
+@trace_methods
+class TrendModel:
+    """monthly_trends collection: income/expense totals per user and month, refreshed by transaction writes"""
+
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def collection(self):
+        """monthly_trends collection for the current process's client"""
+        return self.db.monthly_trends
+
+    def ensure_indexes(self):
+        """Create the (user_id, month) lookup index (idempotent)"""
+        self.collection.create_index(
+            [("user_id", ASCENDING), ("month", ASCENDING)],
+            name="user_month",
+            unique=True
+        )
+
+    def mark_dirty(self, user_obj_id, months):
+        """
+        Flag month buckets touched by a transaction write for recomputation
+
+        seq changes on every write, so a refresh that raced with a newer write
+        leaves the bucket dirty instead of storing stale totals.
+        """
+        months = {month for month in months if month}
+        if not months:
+            return
+        self.collection.bulk_write([
+            UpdateOne(
+                {"user_id": user_obj_id, "month": month},
+                {"$set": {"dirty": True}, "$inc": {"seq": 1}},
+                upsert=True
+            )
+            for month in months
+        ], ordered=False)
+
+    def _aggregate(self, user_obj_id, months=None):
+        """Income, expense and per-category expense totals by month (one pipeline)"""
+        match = {"user_id": user_obj_id}
+        if months is not None:
+            match["$or"] = _month_query(months)
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {"month": {"$substr": ["$date", 0, 7]}, "type": "$type", "category": "$category"},
+                "amount": {"$sum": "$amount"},
+                "count": {"$sum": 1}
+            }}
+        ]
+        totals = {}
+        for row in self.db.transactions.aggregate(pipeline):
+            key = row["_id"]
+            bucket = totals.setdefault(key["month"], {"income": 0, "expenses": 0, "by_category": {}, "count": 0})
+            bucket["count"] += row["count"]
+            if key["type"] == "income":
+                bucket["income"] += row["amount"]
+            elif key["type"] == "expense":
+                bucket["expenses"] += row["amount"]
+                category = rollup_key(key.get("category"))
+                bucket["by_category"][category] = bucket["by_category"].get(category, 0) + row["amount"]
+        return totals
+
+    def refresh(self, user_id):
+        """
+        Recompute only the user's dirty month buckets (called after transaction
+        writes; a bucket left dirty by a failed refresh is recomputed by the
+        next one, or by scripts/recompute_transaction_aggregates.py)
+
+        Returns:
+            (number of buckets recomputed, error)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return 0, "Invalid user ID"
+
+        dirty = {doc["month"]: doc.get("seq") for doc in
+                 self.collection.find({"user_id": user_obj_id, "dirty": True}, {"month": 1, "seq": 1})}
+        if not dirty:
+            return 0, None
+
+        totals = self._aggregate(user_obj_id, list(dirty))
+        empty = {"income": 0, "expenses": 0, "by_category": {}, "count": 0}
+        updated_at = datetime.now().isoformat()
+        self.collection.bulk_write([
+            UpdateOne(
+                {"user_id": user_obj_id, "month": month, "seq": seq},
+                {"$set": {**totals.get(month, empty), "dirty": False, "updated_at": updated_at}}
+            )
+            for month, seq in dirty.items()
+        ], ordered=False)
+        return len(dirty), None
+
+    def get_buckets(self, user_id):
+        """
+        The user's month buckets in order (read-only: transaction writes keep
+        them current, see TransactionModel._record_changes)
+
+        Returns:
+            (list of month documents, error)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return [], "Invalid user ID"
+
+        cursor = self.collection.find(
+            {"user_id": user_obj_id},
+            {"_id": 0, "month": 1, "income": 1, "expenses": 1, "by_category": 1, "count": 1}
+        ).sort("month", ASCENDING)
+        return list(cursor), None
+
+    def recompute_user(self, user_id):
+        """
+        Rebuild every bucket of a user from the transactions collection (repair job)
+
+        Returns:
+            (number of month buckets written, error)
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return 0, "Invalid user ID"
+
+        totals = self._aggregate(user_obj_id)
+        updated_at = datetime.now().isoformat()
+        if totals:
+            self.collection.bulk_write([
+                UpdateOne(
+                    {"user_id": user_obj_id, "month": month},
+                    {"$set": {**bucket, "dirty": False, "updated_at": updated_at}, "$inc": {"seq": 1}},
+                    upsert=True
+                )
+                for month, bucket in totals.items()
+            ], ordered=False)
+        self.collection.delete_many({"user_id": user_obj_id, "month": {"$nin": list(totals)}})
+        return len(totals), None
+
+    def delete_user(self, user_id):
+        """Delete every bucket of a user"""
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None, "Invalid user ID"
+
+        result = self.collection.delete_many({"user_id": user_obj_id})
+        return {"success": True, "deleted": result.deleted_count}, None
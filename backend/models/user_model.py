@@ -1,13 +1,21 @@
 from datetime import datetime
 from pymongo import MongoClient
 from bson import ObjectId
+from utils.tracing import trace_methods
 import bcrypt
+from utils.metrics import bcrypt_duration
 
+@trace_methods
 class UserModel:
     """User model for MongoDB operations"""
     
     def __init__(self, db):
-        self.collection = db.users
+        self.db = db
+    
+    @property
+    def collection(self):
+        """Users collection (resolved lazily so each worker uses its own client)"""
+        return self.db.users
     
     def create_user(self, name, email, password):
         """Create a new user with hashed password"""
@@ -22,7 +30,8 @@ class UserModel:
             return None, "User with this email already exists"
         
         # Hash password
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        with bcrypt_duration.time('hash'):
+            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
         
         # Create user document
         user_doc = {
@@ -69,7 +78,9 @@ class UserModel:
                 password_hash = password_hash.encode('utf-8')
             
             # Verify password
-            if bcrypt.checkpw(password.encode('utf-8'), password_hash):
+            with bcrypt_duration.time('verify'):
+                password_ok = bcrypt.checkpw(password.encode('utf-8'), password_hash)
+            if password_ok:
                 user['_id'] = str(user['_id'])
                 user.pop('password_hash', None)
                 return True, user
@@ -148,11 +159,14 @@ class UserModel:
             if isinstance(password_hash, str):
                 password_hash = password_hash.encode('utf-8')
             
-            if not bcrypt.checkpw(current_password.encode('utf-8'), password_hash):
+            with bcrypt_duration.time('verify'):
+                password_ok = bcrypt.checkpw(current_password.encode('utf-8'), password_hash)
+            if not password_ok:
                 return False, "Current password is incorrect"
             
             # Hash new password
-            new_password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            with bcrypt_duration.time('hash'):
+                new_password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
             
             # Update password
             result = self.collection.update_one(
@@ -226,6 +240,19 @@ class UserModel:
             print(f"Error verifying TOTP: {e}")
             return False
     
+    @staticmethod
+    def _days_active(created_at):
+        """Whole days since account creation (at least 1)"""
+        days_active = 0
+        if created_at:
+            try:
+                created = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                now = datetime.now(created.tzinfo if created.tzinfo else None)
+                days_active = (now - created).days
+            except:
+                days_active = 0
+        return max(1, days_active)
+    
     def get_user_stats(self, user_id):
         """Get user account statistics"""
         try:
@@ -233,23 +260,9 @@ class UserModel:
             if not user:
                 return None
             
-            # Calculate days active
             created_at = user.get('created_at')
-            days_active = 0
-            if created_at:
-                try:
-                    from datetime import datetime
-                    created = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    now = datetime.now(created.tzinfo if created.tzinfo else None)
-                    days_active = (now - created).days
-                except:
-                    days_active = 0
-            
-            # Get financial data updates (from finance collection)
-            # This will be calculated in the route handler
-            
             return {
-                'days_active': max(1, days_active),
+                'days_active': self._days_active(created_at),
                 'created_at': created_at,
                 'last_updated': user.get('updated_at', created_at)
             }
@@ -257,6 +270,71 @@ class UserModel:
             print(f"Error getting user stats: {e}")
             return None
     
+    def get_profile_stats(self, user_id):
+        """
+        Profile statistics in one aggregation round trip
+        
+        Joins the user's financial_data document (projected to $size counts, so
+        goal and report arrays never leave the server) and counts the logged
+        financial_changes deltas on the (user_id, kind) index prefix.
+        
+        Returns:
+            {'days_active', 'data_updates', 'goals_set', 'reports_generated'} or None
+        """
+        try:
+            user_obj_id = ObjectId(user_id)
+        except Exception:
+            return None
+        
+        pipeline = [
+            {"$match": {"_id": user_obj_id}},
+            {"$project": {"created_at": 1}},
+            {"$lookup": {
+                "from": "financial_data",
+                "localField": "_id",
+                "foreignField": "user_id",
+                "pipeline": [
+                    {"$project": {
+                        "_id": 0,
+                        "goals": {"$cond": [{"$isArray": "$goals"}, {"$size": "$goals"}, 0]},
+                        # A non-list reports value (legacy shape) counts as one report
+                        "reports": {"$cond": [
+                            {"$isArray": "$reports"},
+                            {"$size": "$reports"},
+                            {"$cond": [{"$ifNull": ["$reports", False]}, 1, 0]}
+                        ]}
+                    }}
+                ],
+                "as": "finance"
+            }},
+            {"$lookup": {
+                "from": "financial_changes",
+                "localField": "_id",
+                "foreignField": "user_id",
+                "pipeline": [
+                    {"$match": {"kind": "delta"}},
+                    {"$count": "count"}
+                ],
+                "as": "updates"
+            }}
+        ]
+        try:
+            result = next(self.collection.aggregate(pipeline), None)
+        except Exception as e:
+            print(f"Error getting profile stats: {e}")
+            return None
+        if not result:
+            return None
+        
+        finance = result['finance'][0] if result.get('finance') else {}
+        updates = result['updates'][0]['count'] if result.get('updates') else 0
+        return {
+            'days_active': self._days_active(result.get('created_at')),
+            'data_updates': updates,
+            'goals_set': finance.get('goals', 0),
+            'reports_generated': finance.get('reports', 0)
+        }
+    
     def save_settings(self, user_id, settings):
         """Save user settings"""
         try:
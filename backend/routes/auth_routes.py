@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, make_response
+from flask import Blueprint, request, jsonify, make_response, Response, send_file, stream_with_context
 import sys
 import os
 from datetime import datetime
@@ -10,7 +10,13 @@ if parent_dir not in sys.path:
 
 from models.user_model import UserModel
 from models.finance_model import FinanceModel
+from models.export_job_model import ExportJobModel, serialize_job
+from config import Config
+from utils.data_export import (
+    EXPORT_FORMATS, export_filename, export_stream, remove_expired_files, submit_export_job
+)
 from utils.jwt_handler import encode_token
+from utils.two_factor import get_pending_setup, get_pending_secret, clear_pending_setup, QR_FORMATS
 from bson import ObjectId
 import json
 
@@ -27,10 +33,28 @@ def load_mock_data_from_file():
         print(f"Error loading mock data: {e}")
         return None
 
-def init_auth_routes(db):
-    """Initialize auth routes with database connection"""
-    user_model = UserModel(db)
-    finance_model = FinanceModel(db)
+def init_auth_routes(db, user_model=None, finance_model=None, export_jobs=None):
+    """Initialize auth routes with database connection (and optionally shared models)"""
+    user_model = user_model or UserModel(db)
+    finance_model = finance_model or FinanceModel(db)
+    export_jobs = export_jobs or ExportJobModel(db, ttl_hours=Config.EXPORT_JOB_TTL_HOURS)
+    
+    def token_user_id():
+        """User ID from the cookie or Authorization header token, or (None, error response)"""
+        from utils.jwt_handler import decode_token
+        
+        token = request.cookies.get('token') or (request.headers.get('Authorization') and request.headers.get('Authorization').replace('Bearer ', ''))
+        if not token:
+            return None, (jsonify({'error': 'Authentication required'}), 401)
+        
+        payload, error = decode_token(token)
+        if error or not payload:
+            return None, (jsonify({'error': error or 'Invalid token'}), 401)
+        
+        user_id = payload.get('user_id')
+        if not user_id:
+            return None, (jsonify({'error': 'Invalid token'}), 401)
+        return user_id, None
     
     @auth_bp.route('/signup', methods=['POST'])
     def signup():
@@ -92,12 +116,14 @@ def init_auth_routes(db):
                     if 'last_updated' in mock_data_file:
                         update_doc['last_updated'] = mock_data_file.get('last_updated')
                     
-                    # Save all mock data
-                    finance_model.collection.update_one(
-                        {"user_id": user_obj_id},
-                        {"$set": update_doc},
-                        upsert=True
-                    )
+                    # Transactions go to their own collection
+                    mock_transactions = update_doc.pop('transactions', None) or []
+                    update_doc['transactions_migrated'] = True
+                    
+                    # Save all mock data (recorded as the first change-log entry)
+                    update_doc.pop('user_id')
+                    finance_model.seed_data(user_obj_id, update_doc)
+                    finance_model.transactions.import_embedded(user['_id'], mock_transactions, source='mock')
                     saved_keys = list(mock_data.keys())
                     print(f"✅ Saved mock financial data for new user: {user['email']}")
                     print(f"   Saved keys: {', '.join(saved_keys)}")
@@ -362,10 +388,6 @@ def init_auth_routes(db):
         """Generate TOTP secret and QR code for 2FA setup"""
         try:
             from utils.jwt_handler import decode_token
-            import pyotp
-            import qrcode
-            from io import BytesIO
-            import base64
             
             # Get token from cookie or Authorization header
             token = request.cookies.get('token') or (request.headers.get('Authorization') and request.headers.get('Authorization').replace('Bearer ', ''))
@@ -382,42 +404,35 @@ def init_auth_routes(db):
             if not user_id:
                 return jsonify({'error': 'Invalid token'}), 401
             
+            # QR format: png (default, base64 data URI), svg (compact data URI) or matrix (raw modules)
+            data = request.get_json(silent=True) or {}
+            qr_format = str(data.get('format') or request.args.get('format', 'png')).lower()
+            if qr_format not in QR_FORMATS:
+                return jsonify({'error': f"Invalid format. Use one of: {', '.join(QR_FORMATS)}"}), 400
+            
             # Get user
             user = user_model.find_by_id(user_id)
             if not user:
                 return jsonify({'error': 'User not found'}), 404
             
-            # Generate TOTP secret
-            totp_secret = pyotp.random_base32()
-            
-            # Create TOTP URI for QR code
-            totp = pyotp.TOTP(totp_secret)
-            issuer = "FinGenie"
+            # Reuse the pending secret and rendered QR if setup was started recently
             account_name = user.get('email', user.get('name', 'User'))
-            totp_uri = totp.provisioning_uri(
-                name=account_name,
-                issuer_name=issuer
-            )
-            
-            # Generate QR code
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(totp_uri)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            buffer.seek(0)
+            setup = get_pending_setup(user_id, account_name, qr_format)
             
-            # Convert to base64 for frontend
-            qr_code_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            return jsonify({
+            response_data = {
                 'success': True,
-                'secret': totp_secret,
-                'qr_code': f'data:image/png;base64,{qr_code_base64}',
-                'manual_entry_key': totp_secret  # For manual entry
-            }), 200
+                'secret': setup['secret'],
+                'manual_entry_key': setup['secret'],  # For manual entry
+                'qr_format': qr_format,
+                'expires_in': setup['expires_in']
+            }
+            if qr_format == 'matrix':
+                response_data['qr_matrix'] = setup['qr']
+                response_data['otpauth_uri'] = setup['uri']
+            else:
+                response_data['qr_code'] = setup['qr']
+            
+            return jsonify(response_data), 200
             
         except Exception as e:
             import traceback
@@ -451,7 +466,8 @@ def init_auth_routes(db):
                 return jsonify({'error': 'No data provided'}), 400
             
             totp_code = data.get('code', '').strip()
-            totp_secret = data.get('secret', '').strip()
+            # Fall back to the server-side pending secret from setup_2fa
+            totp_secret = (data.get('secret') or get_pending_secret(user_id) or '').strip()
             
             if not totp_code or not totp_secret:
                 return jsonify({'error': 'TOTP code and secret are required'}), 400
@@ -467,6 +483,8 @@ def init_auth_routes(db):
             if not success:
                 return jsonify({'error': error}), 400
             
+            clear_pending_setup(user_id)
+            
             return jsonify({
                 'success': True,
                 'message': 'Two-factor authentication enabled successfully!',
@@ -606,24 +624,33 @@ def init_auth_routes(db):
     
     @auth_bp.route('/export-data', methods=['GET'])
     def export_user_data():
-        """Export all user data as JSON"""
+        """
+        Export all user data
+        
+        ?format=json (default) returns one JSON document. ?format=ndjson or
+        ?format=zip stream the export section by section with chunked transfer
+        (no Content-Length), holding one record or transaction batch at a time.
+        """
         try:
-            from utils.jwt_handler import decode_token
-            
-            # Get token from cookie or Authorization header
-            token = request.cookies.get('token') or (request.headers.get('Authorization') and request.headers.get('Authorization').replace('Bearer ', ''))
-            
-            if not token:
-                return jsonify({'error': 'Authentication required'}), 401
-            
-            # Decode token
-            payload, error = decode_token(token)
-            if error or not payload:
-                return jsonify({'error': error or 'Invalid token'}), 401
-            
-            user_id = payload.get('user_id')
-            if not user_id:
-                return jsonify({'error': 'Invalid token'}), 401
+            user_id, auth_error = token_user_id()
+            if auth_error:
+                return auth_error
+            
+            export_format = (request.args.get('format') or 'json').lower()
+            if export_format in EXPORT_FORMATS:
+                if not user_model.find_by_id(user_id):
+                    return jsonify({'error': 'User not found'}), 404
+                mimetype = EXPORT_FORMATS[export_format][0]
+                response = Response(
+                    stream_with_context(export_stream(user_model, finance_model, user_id, export_format)),
+                    mimetype=mimetype
+                )
+                response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(export_format)}"'
+                # Keep reverse proxies from buffering the whole stream
+                response.headers['X-Accel-Buffering'] = 'no'
+                return response
+            if export_format != 'json':
+                return jsonify({'error': f"Unsupported format '{export_format}' (use json, ndjson or zip)"}), 400
             
             # Get user profile
             user = user_model.find_by_id(user_id)
@@ -640,8 +667,10 @@ def init_auth_routes(db):
                 'settings': user.get('settings', {})
             }
             
-            # Get financial data
+            # Get financial data (with the full transaction history, not just the recent page)
             financial_data, _ = finance_model.get_data(user_id)
+            if financial_data and (financial_data.get('transactions_migrated') or not financial_data.get('transactions')):
+                financial_data['transactions'], _ = finance_model.transactions.all_transactions(user_id)
             
             # Prepare export data
             export_data = {
@@ -661,6 +690,94 @@ def init_auth_routes(db):
             traceback.print_exc()
             return jsonify({'error': f'Server error: {str(e)}'}), 500
     
+    @auth_bp.route('/export-data/jobs', methods=['POST'])
+    def start_export_job():
+        """
+        Start a background export for very large accounts
+        
+        Body: {"format": "zip" | "ndjson"} (default zip). Returns 202 with the
+        job; poll GET /export-data/jobs/<id> and download when status is done.
+        """
+        try:
+            user_id, auth_error = token_user_id()
+            if auth_error:
+                return auth_error
+            
+            data = request.get_json(silent=True) or {}
+            export_format = (data.get('format') or 'zip').lower()
+            if export_format not in EXPORT_FORMATS:
+                return jsonify({'error': f"Unsupported format '{export_format}' (use zip or ndjson)"}), 400
+            if not user_model.find_by_id(user_id):
+                return jsonify({'error': 'User not found'}), 404
+            
+            # Buffered writes are flushed here so the export includes them
+            finance_model.flush_pending(user_id)
+            remove_expired_files(Config.EXPORT_DIR, Config.EXPORT_JOB_TTL_HOURS * 3600)
+            job, error = export_jobs.create(user_id, export_format)
+            if error:
+                return jsonify({'error': error}), 400
+            submit_export_job(export_jobs, user_model, finance_model, job, Config.EXPORT_DIR,
+                              max_workers=Config.EXPORT_JOB_WORKERS)
+            
+            job.pop('user_id', None)
+            return jsonify({'success': True, 'job': job}), 202
+            
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @auth_bp.route('/export-data/jobs/<job_id>', methods=['GET'])
+    def get_export_job(job_id):
+        """Status of a background export"""
+        try:
+            user_id, auth_error = token_user_id()
+            if auth_error:
+                return auth_error
+            
+            job, error = export_jobs.get(user_id, job_id)
+            if error:
+                return jsonify({'error': error}), 400
+            if not job:
+                return jsonify({'error': 'Export job not found'}), 404
+            
+            return jsonify({'success': True, 'job': serialize_job(job)}), 200
+            
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @auth_bp.route('/export-data/jobs/<job_id>/download', methods=['GET'])
+    def download_export_job(job_id):
+        """Download a finished background export"""
+        try:
+            user_id, auth_error = token_user_id()
+            if auth_error:
+                return auth_error
+            
+            job, error = export_jobs.get(user_id, job_id)
+            if error:
+                return jsonify({'error': error}), 400
+            if not job:
+                return jsonify({'error': 'Export job not found'}), 404
+            if job.get('status') != 'done':
+                return jsonify({'error': f"Export is {job.get('status')}", 'job': serialize_job(job)}), 409
+            if not os.path.exists(job.get('path', '')):
+                return jsonify({'error': 'Export file is no longer available'}), 410
+            
+            return send_file(
+                job['path'],
+                mimetype=EXPORT_FORMATS[job['format']][0],
+                as_attachment=True,
+                download_name=export_filename(job['format'], job['created_at'][:10])
+            )
+            
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
     @auth_bp.route('/delete-account', methods=['POST'])
     def delete_account():
         """Delete user account and all associated data"""
@@ -689,8 +806,12 @@ def init_auth_routes(db):
             if confirm_text.lower() != 'delete my account':
                 return jsonify({'error': 'Please type "delete my account" to confirm'}), 400
             
-            # Delete financial data
+            # Delete financial data (and any writes still buffered for it)
+            finance_model.discard_pending(user_id)
             finance_model.collection.delete_many({"user_id": ObjectId(user_id)})
+            finance_model.transactions.delete_user_transactions(user_id)
+            finance_model.changes.delete_user(user_id)
+            export_jobs.delete_user(user_id)
             
             # Delete user account
             success, error = user_model.delete_account(user_id)
@@ -729,44 +850,16 @@ def init_auth_routes(db):
             if not user_id:
                 return jsonify({'error': 'Invalid token'}), 401
             
-            # Get user stats
-            user_stats = user_model.get_user_stats(user_id)
-            if not user_stats:
+            # Account age, goal/report counts and logged updates in one aggregation
+            # (buffered writes are flushed first so the counts include them)
+            finance_model.flush_pending(user_id)
+            stats = user_model.get_profile_stats(user_id)
+            if not stats:
                 return jsonify({'error': 'Could not retrieve user stats'}), 400
             
-            # Get financial data stats
-            user_obj_id = ObjectId(user_id)
-            financial_data = finance_model.collection.find_one({"user_id": user_obj_id})
-            
-            # Count data updates (times financial data was updated)
-            data_updates = 0
-            if financial_data and financial_data.get('last_updated'):
-                # This is a simple count - could be enhanced
-                data_updates = 1  # Placeholder - could track update history
-            
-            # Get goals count
-            goals_count = 0
-            if financial_data and financial_data.get('goals'):
-                goals_count = len(financial_data.get('goals', []))
-            
-            # Get reports count from financial_data collection
-            reports_count = 0
-            if financial_data:
-                reports = financial_data.get('reports', [])
-                if isinstance(reports, list):
-                    reports_count = len(reports)
-                elif reports:
-                    # Handle case where reports might be stored differently
-                    reports_count = 1
-            
             return jsonify({
                 'success': True,
-                'stats': {
-                    'days_active': user_stats['days_active'],
-                    'data_updates': data_updates,
-                    'goals_set': goals_count,
-                    'reports_generated': reports_count
-                }
+                'stats': stats
             }), 200
             
         except Exception as e:
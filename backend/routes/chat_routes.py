@@ -12,6 +12,7 @@ if parent_dir not in sys.path:
 from utils.jwt_handler import require_auth
 from utils.gemini_client import GeminiClient
 from models.finance_model import FinanceModel
+from utils.financial_view import with_transaction_aggregates
 
 chat_bp = Blueprint('chat', __name__)
 
@@ -26,10 +27,10 @@ def load_mock_data_from_file():
         print(f"Error loading mock data: {e}")
         return None
 
-def init_chat_routes(db):
-    """Initialize chat routes with database connection"""
+def init_chat_routes(db, finance_model=None):
+    """Initialize chat routes with database connection (and optionally a shared model)"""
     gemini_client = GeminiClient()
-    finance_model = FinanceModel(db)
+    finance_model = finance_model or FinanceModel(db)
     
     @chat_bp.route('/chat', methods=['POST'])
     @require_auth
@@ -44,8 +45,9 @@ def init_chat_routes(db):
             
             user_message = data['message']
             
-            # Get user's financial data for context
+            # Get user's financial data for context (budget spent and trends derived from transactions)
             financial_data, _ = finance_model.get_data(user_id)
+            financial_data = with_transaction_aggregates(finance_model, user_id, financial_data)
             
             # If no data exists, use mock data for demo purposes (same as finance routes)
             if not financial_data:
@@ -3,14 +3,7 @@ from io import BytesIO
 import sys
 import os
 import json
-import flask_cors
 from datetime import datetime
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 
 # Add parent directory to path for imports
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -18,16 +11,30 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from models.finance_model import FinanceModel
+from models.transaction_model import DEFAULT_PAGE_SIZE, TRANSACTION_TYPES
+from models.budget_rollup_model import apply_budget_totals, budget_category_key, current_month
+from models.trend_model import DEFAULT_TREND_MONTHS, build_trend_series
 from utils.jwt_handler import require_auth
 from utils.loan_calculator import (
-    calculate_emi, 
-    calculate_prepayment_savings, 
-    compare_loans,
-    calculate_affordability
+    calculate_floating_emi,
+    calculate_affordability,
+    amortization_view
+)
+from utils.loan_cache import (
+    cached_calculate_emi, cached_prepayment_savings, cached_compare_loans, warm_presets
 )
 from utils.gemini_client import GeminiClient
+from utils.financial_view import get_effective_view, get_mock_financial_data, with_transaction_aggregates
+from utils.statement_import import (
+    import_statement, detect_format, open_statement_stream, StatementImportError
+)
+from utils.financial_patch import parse_patch, compile_update, PatchError
+from utils.metrics import pdf_render_duration
+from utils.tracing import tracer
 import uuid
 
+# The NumPy engines (see utils/numeric.py) are imported inside the routes that
+# use them, under "<module>.import_numpy" spans, never at worker boot
 finance_bp = Blueprint('finance', __name__)
 
 # Load mock data from JSON file
@@ -41,9 +48,19 @@ def load_mock_data_from_file():
         print(f"Error loading mock data: {e}")
         return None
 
-def init_finance_routes(db):
-    """Initialize finance routes with database connection"""
-    finance_model = FinanceModel(db)
+def _number_list(value):
+    """A list of floats from a JSON list, a comma-separated string or a single number"""
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        value = [item for item in value.split(',') if item.strip()]
+    elif not isinstance(value, list):
+        value = [value]
+    return [float(item) for item in value]
+
+def init_finance_routes(db, finance_model=None):
+    """Initialize finance routes with database connection (and optionally a shared model)"""
+    finance_model = finance_model or FinanceModel(db)
     
     @finance_bp.route('/add_data', methods=['POST'])
     @require_auth
@@ -115,6 +132,13 @@ def init_finance_routes(db):
             if not isinstance(budget, dict):
                 return jsonify({'error': 'Budget must be an object'}), 400
             
+            if finance_model.write_buffer is not None:
+                finance_model.write_buffer.submit(user_id, [('set', ('budget',), budget)])
+                return jsonify({
+                    'message': 'Budget update accepted',
+                    'data': {'success': True, 'buffered': True}
+                }), 202
+            
             # Update budget
             result, error = finance_model.update_budget(user_id, budget)
             
@@ -146,6 +170,13 @@ def init_finance_routes(db):
             if not isinstance(investments, (list, dict)):
                 return jsonify({'error': 'Investments must be an array or object'}), 400
             
+            if finance_model.write_buffer is not None:
+                finance_model.write_buffer.submit(user_id, [('set', ('investments',), investments)])
+                return jsonify({
+                    'message': 'Investments update accepted',
+                    'data': {'success': True, 'buffered': True}
+                }), 202
+            
             # Update investments
             result, error = finance_model.update_investments(user_id, investments)
             
@@ -160,6 +191,236 @@ def init_finance_routes(db):
         except Exception as e:
             return jsonify({'error': f'Server error: {str(e)}'}), 500
     
+    @finance_bp.route('/patch', methods=['POST', 'PATCH'])
+    @require_auth
+    def patch_data():
+        """
+        Apply field-level edits to financial data
+        
+        Accepts either a JSON Merge Patch body (Content-Type
+        application/merge-patch+json, expected version in If-Match) or JSON
+        {"merge": {...}, "ops": [{"op", "path", "value"}], "version": n}.
+        """
+        try:
+            user_id = request.user_id
+            
+            if request.mimetype == 'application/merge-patch+json':
+                merge_patch = request.get_json(force=True, silent=True)
+                ops = None
+                if_match = (request.headers.get('If-Match') or '').strip()
+                version = if_match.replace('W/', '').strip('"') or None
+            else:
+                data = request.get_json(silent=True)
+                if not isinstance(data, dict):
+                    return jsonify({'error': 'No patch provided'}), 400
+                merge_patch = data.get('merge')
+                ops = data.get('ops')
+                version = data.get('version')
+                if merge_patch is None and ops is None:
+                    return jsonify({'error': 'Provide a merge patch ("merge") or path operations ("ops")'}), 400
+            
+            if version is not None:
+                try:
+                    version = int(version)
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'Version must be an integer'}), 400
+            
+            try:
+                normalized_ops = parse_patch(merge_patch, ops)
+                update, array_filters, nested_roots = compile_update(normalized_ops)
+            except PatchError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            # Unversioned patches may be coalesced with the user's other recent edits
+            if version is None and finance_model.write_buffer is not None:
+                finance_model.write_buffer.submit(user_id, normalized_ops, get_mock_financial_data())
+                return jsonify({
+                    'message': 'Financial data patch accepted',
+                    'data': {'success': True, 'buffered': True}
+                }), 202
+            
+            result, error = finance_model.apply_patch(
+                user_id, update, array_filters, nested_roots,
+                expected_version=version,
+                defaults=get_mock_financial_data()
+            )
+            
+            if result and result.get('conflict'):
+                return jsonify({'error': error, 'version': result['version']}), 409
+            if error:
+                return jsonify({'error': error}), 400
+            
+            response = jsonify({
+                'message': 'Financial data patched successfully',
+                'data': result
+            })
+            response.headers['ETag'] = f'"{result["version"]}"'
+            return response, 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/transactions', methods=['GET'])
+    @require_auth
+    def list_transactions():
+        """
+        List transactions, newest first by default
+        
+        Query parameters: from, to (YYYY-MM-DD, inclusive), category, type,
+        sort (date, -date, amount, -amount), limit (max 500) and cursor
+        (next_cursor of the previous page).
+        """
+        try:
+            user_id = request.user_id
+            args = request.args
+            
+            try:
+                limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+            except ValueError:
+                return jsonify({'error': 'Limit must be an integer'}), 400
+            
+            txn_type = args.get('type')
+            if txn_type and txn_type not in TRANSACTION_TYPES:
+                return jsonify({'error': "Type must be 'income' or 'expense'"}), 400
+            
+            result, error = finance_model.transactions.list_transactions(
+                user_id,
+                start_date=args.get('from'),
+                end_date=args.get('to'),
+                category=args.get('category'),
+                txn_type=txn_type,
+                sort=args.get('sort', '-date'),
+                limit=limit,
+                cursor=args.get('cursor')
+            )
+            
+            if error:
+                return jsonify({'error': error}), 400
+            
+            return jsonify({
+                'message': 'Transactions retrieved successfully',
+                'data': result
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/transactions', methods=['POST'])
+    @require_auth
+    def add_transaction():
+        """Add a transaction"""
+        try:
+            user_id = request.user_id
+            data = request.get_json(silent=True)
+            
+            if not data:
+                return jsonify({'error': 'Transaction data is required'}), 400
+            
+            result, error = finance_model.transactions.add_transaction(user_id, data)
+            
+            if error:
+                return jsonify({'error': error}), 400
+            
+            return jsonify({
+                'message': 'Transaction added successfully',
+                'data': result
+            }), 201
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/import_statement', methods=['POST'])
+    @require_auth
+    def import_statement_route():
+        """
+        Bulk-import a CSV or OFX bank statement into transactions
+        
+        Send the file as multipart field 'file' (or as the raw request body).
+        Optional parameters: format (csv, ofx; detected from the file name or
+        content by default), date_format (strptime format) and dry_run.
+        """
+        try:
+            user_id = request.user_id
+            params = request.form if request.files else request.args
+            
+            upload = request.files.get('file')
+            if upload is not None:
+                stream, filename = upload.stream, upload.filename
+            elif request.content_length:
+                stream, filename = request.stream, None
+            else:
+                return jsonify({'error': 'Statement file is required'}), 400
+            
+            # Peek at the first bytes for format detection without consuming them
+            stream = open_statement_stream(stream)
+            file_format = (params.get('format') or detect_format(filename, stream.peek(2048))).lower()
+            dry_run = str(params.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+            
+            if not dry_run:
+                # Imported rows must not be hidden behind a legacy embedded array
+                finance_model.transactions.migrate_user(user_id)
+            
+            report = import_statement(
+                finance_model.transactions, user_id, stream,
+                file_format=file_format,
+                date_format=params.get('date_format') or None,
+                dry_run=dry_run
+            )
+            
+            return jsonify({
+                'message': f"Imported {report['inserted']} of {report['rows']} rows",
+                'data': report
+            }), 200
+            
+        except StatementImportError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/transactions/<transaction_id>', methods=['PUT', 'PATCH'])
+    @require_auth
+    def update_transaction(transaction_id):
+        """Update fields of a transaction"""
+        try:
+            user_id = request.user_id
+            data = request.get_json(silent=True)
+            
+            if not data:
+                return jsonify({'error': 'Transaction data is required'}), 400
+            
+            result, error = finance_model.transactions.update_transaction(user_id, transaction_id, data)
+            
+            if error:
+                return jsonify({'error': error}), 404 if error == 'Transaction not found' else 400
+            
+            return jsonify({
+                'message': 'Transaction updated successfully',
+                'data': result
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/transactions/<transaction_id>', methods=['DELETE'])
+    @require_auth
+    def delete_transaction(transaction_id):
+        """Delete a transaction"""
+        try:
+            user_id = request.user_id
+            
+            result, error = finance_model.transactions.delete_transaction(user_id, transaction_id)
+            
+            if error:
+                return jsonify({'error': error}), 404 if error == 'Transaction not found' else 400
+            
+            return jsonify({
+                'message': 'Transaction deleted successfully',
+                'data': result
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
     @finance_bp.route('/get_data', methods=['GET'])
     @require_auth
     def get_data():
@@ -167,121 +428,533 @@ def init_finance_routes(db):
         try:
             user_id = request.user_id
             
-            data, error = finance_model.get_data(user_id)
+            # Read-only: merging happens in utils.financial_view and the view is
+            # reused until the stored document's data_version changes. Partial goal
+            # sets are ignored here; scripts/migrate_partial_goals.py removes them.
+            source, view, error = get_effective_view(finance_model, user_id)
             
             if error:
                 return jsonify({'error': error}), 400
             
-            # Always load mock data first
-            mock_data_file = load_mock_data_from_file()
-            mock_data = mock_data_file.get('financial_data', {}) if mock_data_file else {}
-            
-            # If user has NO data in database, return mock data only
-            # Also check if data exists but only has empty/invalid goals - treat as no data
-            has_valid_data = data and (
-                data.get('assets') or 
-                data.get('liabilities') or 
-                (data.get('goals') and isinstance(data.get('goals'), list) and len(data.get('goals', [])) == 5)
+            if source == 'mock':
+                message = 'No financial data found. Showing mock data for demo.'
+            elif source == 'empty':
+                message = 'No financial data found. Please add your financial information.'
+            else:
+                message = 'Financial data retrieved successfully'
+            
+            response = {'message': message, 'data': view}
+            # Buffered edits were acknowledged with 202 before being written
+            write_failure = finance_model.pop_write_failure(user_id)
+            if write_failure:
+                response['message'] = f"{message}. Some recent changes could not be saved; please re-apply them."
+                response['write_failure'] = write_failure
+            
+            return jsonify(response), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/budget', methods=['GET'])
+    @require_auth
+    def get_budget():
+        """
+        Budget with per-category spent for a month (default: current month)
+        
+        Spent totals are read from the budget rollups that transaction writes keep
+        current, so this costs one lookup per month regardless of transaction count.
+        """
+        try:
+            user_id = request.user_id
+            month = request.args.get('month') or current_month()
+            try:
+                datetime.strptime(month, '%Y-%m')
+            except ValueError:
+                return jsonify({'error': 'Month must be YYYY-MM'}), 400
+            
+            source, view, error = get_effective_view(finance_model, user_id)
+            if error:
+                return jsonify({'error': error}), 400
+            
+            budget = (view or {}).get('budget') or {}
+            totals, error = finance_model.transactions.rollups.month_totals(user_id, month)
+            if error:
+                return jsonify({'error': error}), 400
+            if totals is None and month != current_month():
+                totals = {}  # no expenses recorded that month
+            if totals is not None:
+                budget = apply_budget_totals(budget, totals, month, keep_manual=month == current_month())
+            
+            # Spending in categories that have no budget line
+            budgeted = {budget_category_key(category) for category in budget.get('categories') or []}
+            unbudgeted = {key: spent for key, spent in (totals or {}).items() if key not in budgeted and spent}
+            
+            categories = budget.get('categories') or []
+            return jsonify({
+                'message': 'Budget retrieved successfully',
+                'data': {
+                    'month': month,
+                    'budget': budget,
+                    'total_budget': sum(category.get('budget', 0) or 0 for category in categories),
+                    'total_spent': round(sum(category.get('spent', 0) or 0 for category in categories), 2),
+                    'unbudgeted': unbudgeted,
+                    'is_mock': source == 'mock'
+                }
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/trends', methods=['GET'])
+    @require_auth
+    def get_trends():
+        """
+        Monthly income/expense/savings/net-worth series and expense category shares
+        
+        Read-only: served from the materialized month buckets, which each
+        transaction write re-aggregates for the months it touches.
+        """
+        try:
+            user_id = request.user_id
+            try:
+                months = max(1, min(int(request.args.get('months', DEFAULT_TREND_MONTHS)), 120))
+            except ValueError:
+                return jsonify({'error': 'months must be an integer'}), 400
+            
+            buckets, error = finance_model.transactions.trends.get_buckets(user_id)
+            if error:
+                return jsonify({'error': error}), 400
+            
+            _, view, error = get_effective_view(finance_model, user_id)
+            if error:
+                return jsonify({'error': error}), 400
+            view = view or {}
+            
+            monthly_trends, expense_categories = build_trend_series(
+                buckets, view.get('assets'), view.get('liabilities'), months=months)
+            
+            return jsonify({
+                'message': 'Trends retrieved successfully',
+                'data': {
+                    'monthly_trends': monthly_trends,
+                    'expense_categories': expense_categories
+                }
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/cashflow_forecast', methods=['GET'])
+    @require_auth
+    def cashflow_forecast():
+        """
+        Forecast of monthly income, expenses, net cash flow and spend per
+        category, with 80% / 95% intervals
+        
+        Query parameters: horizon (months, 3-12, default 6) and refit=true
+        (ignore the stored fit). Fitted from complete months of the user's
+        transactions (the stored fit is extended as months arrive), else from
+        analytics.monthly_trends.
+        """
+        try:
+            user_id = request.user_id
+            
+            with tracer.start_as_current_span('cashflow_forecast.import_numpy'):
+                from utils.cashflow_forecast import (
+                    DEFAULT_HORIZON, MAX_HORIZON, MIN_HISTORY_MONTHS, MIN_HORIZON,
+                    forecast_cashflow, series_from_trends, user_cashflow_forecast
+                )
+            
+            try:
+                horizon = int(request.args.get('horizon', DEFAULT_HORIZON))
+            except ValueError:
+                return jsonify({'error': 'horizon must be an integer'}), 400
+            if not MIN_HORIZON <= horizon <= MAX_HORIZON:
+                return jsonify({'error': f'horizon must be between {MIN_HORIZON} and {MAX_HORIZON} months'}), 400
+            refit = str(request.args.get('refit', 'false')).lower() in ('true', '1', 'yes')
+            
+            source, view, error = get_effective_view(finance_model, user_id)
+            if error:
+                return jsonify({'error': error}), 400
+            
+            result = None
+            if source == 'user':
+                result, error = user_cashflow_forecast(finance_model.transactions, user_id, horizon, refit)
+                if error:
+                    return jsonify({'error': error}), 400
+            if result is None:
+                months, names, values = series_from_trends(((view or {}).get('analytics') or {}).get('monthly_trends'))
+                result, _ = forecast_cashflow(months, names, values, horizon=horizon)
+                if result is None:
+                    return jsonify({'error': f'At least {MIN_HISTORY_MONTHS} months of history are needed for a forecast'}), 400
+                result['source'] = 'monthly_trends'
+            result['is_mock'] = source == 'mock'
+            
+            return jsonify({
+                'message': 'Cash-flow forecast calculated successfully',
+                'data': result
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/goal_projection', methods=['GET', 'POST'])
+    @require_auth
+    def goal_projection():
+        """
+        Monte Carlo success probability and percentile bands for every goal
+        
+        Optional parameters (JSON body or query string): monthly_contribution
+        (default: average recent monthly savings), paths (default 10000, max
+        50000), seed (reproducible results), inflation_rate (% per year) and
+        assumptions ({asset_class: {"return": pct, "volatility": pct}}).
+        """
+        try:
+            user_id = request.user_id
+            params = request.get_json(silent=True) or request.args.to_dict()
+            
+            with tracer.start_as_current_span('goal_projection.import_numpy'):
+                from utils.goal_projection import (
+                    DEFAULT_PATHS, GOAL_INFLATION_RATE, default_monthly_contribution, project_goals
+                )
+            
+            source, view, error = get_effective_view(finance_model, user_id)
+            if error:
+                return jsonify({'error': error}), 400
+            view = view or {}
+            
+            try:
+                contribution = params.get('monthly_contribution')
+                contribution = float(contribution) if contribution not in (None, '') else \
+                    default_monthly_contribution(view.get('analytics'))
+                paths = int(params.get('paths') or DEFAULT_PATHS)
+                seed = int(params['seed']) if params.get('seed') not in (None, '') else None
+                inflation_rate = float(params.get('inflation_rate') or GOAL_INFLATION_RATE)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'monthly_contribution, paths, seed and inflation_rate must be numbers'}), 400
+            assumptions = params.get('assumptions') if isinstance(params.get('assumptions'), dict) else None
+            
+            result = project_goals(
+                view.get('goals') or [], view.get('assets'), view.get('investments'),
+                monthly_contribution=contribution, paths=paths, seed=seed,
+                inflation_rate=inflation_rate, assumptions=assumptions
             )
+            result['is_mock'] = source == 'mock'
             
-            if not has_valid_data:
-                # Clean up any partial goals if they exist
-                if data and data.get('goals'):
-                    goals_count = len(data.get('goals', [])) if isinstance(data.get('goals'), list) else 0
-                    if goals_count > 0 and goals_count < 5:
-                        print(f"🧹 Cleaning up partial goals ({goals_count} goals) found in new account data for user {user_id}")
-                        finance_model.remove_goals(user_id)
-                
-                if mock_data:
-                    mock_data['is_mock'] = True
-                    return jsonify({
-                        'message': 'No financial data found. Showing mock data for demo.',
-                        'data': mock_data
-                    }), 200
-                else:
-                    return jsonify({
-                        'message': 'No financial data found. Please add your financial information.',
-                        'data': {}
-                    }), 200
-            
-            # STEP 1: Clean up partial goals FIRST, before any processing
-            # This ensures ALL accounts get cleaned up regardless of other data
-            if data and data.get('goals'):
-                user_goals_list = data.get('goals', [])
-                user_goals_count_before = len(user_goals_list) if isinstance(user_goals_list, list) else 0
-                
-                # If partial goals exist (< 5), remove them immediately
-                if user_goals_count_before > 0 and user_goals_count_before < 5:
-                    print(f"🧹 STEP 1: Removing partial goals ({user_goals_count_before} goals) from MongoDB for user {user_id}")
-                    finance_model.remove_goals(user_id)
-                    # Remove goals from data object so they're not used below
-                    data.pop('goals', None)
-                    print(f"✅ Partial goals removed from database for user {user_id}")
-            
-            # If user has data, merge with mock data (user data takes precedence, but fill missing from mock)
-            merged_data = {}
-            
-            # Merge assets (user data overrides mock)
-            if data.get('assets'):
-                merged_data['assets'] = {**mock_data.get('assets', {}), **data.get('assets', {})}
-            else:
-                merged_data['assets'] = mock_data.get('assets', {})
+            return jsonify({
+                'message': 'Goal projection calculated successfully',
+                'data': result
+            }), 200
             
-            # Merge liabilities (user data overrides mock)
-            if data.get('liabilities'):
-                merged_data['liabilities'] = {**mock_data.get('liabilities', {}), **data.get('liabilities', {})}
-            else:
-                merged_data['liabilities'] = mock_data.get('liabilities', {})
-            
-            # STEP 2: Handle goals - ALWAYS use mock_data goals unless user has ALL 5 goals
-            # This ensures users always see the complete 5 goals from mock_data.json
-            mock_goals_count = len(mock_data.get('goals', []))
-            user_goals = data.get('goals', [])  # This should be None or empty after cleanup
-            user_goals_count = len(user_goals) if isinstance(user_goals, list) else 0
-            
-            # Only use user goals if they have ALL 5 goals (complete set)
-            # Otherwise, always use mock_data goals to ensure consistency
-            if user_goals_count == mock_goals_count and user_goals_count == 5:
-                # User has explicitly saved all 5 goals - use those
-                merged_data['goals'] = user_goals
-                print(f"✅ Using user's complete goal set (5 goals) for user {user_id}")
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/sip_plan', methods=['GET', 'POST'])
+    @require_auth
+    def sip_plan():
+        """
+        Monthly SIP (or lumpsum) each goal needs under several return assumptions
+        
+        Optional parameters (JSON body or query string): annual_returns (% per
+        year; a list, or comma-separated), inflation_rate (% per year; goal
+        targets are amounts in the goal year, so by default only the
+        retirement expense is inflated, at 6), step_up_percent (yearly SIP increase) and goals
+        (ad-hoc goals, JSON body only). monthly_sip with years (and lumpsum)
+        adds the corpus after each year; monthly_expense with
+        years_to_retirement (and years_in_retirement, post_retirement_return,
+        current_savings) adds a retirement corpus plan.
+        """
+        try:
+            user_id = request.user_id
+            params = request.get_json(silent=True) or request.args.to_dict()
+            
+            with tracer.start_as_current_span('sip_planner.import_numpy'):
+                from utils.sip_planner import (
+                    DEFAULT_RETURNS, GOAL_INFLATION_RATE, MAX_RETURN_ASSUMPTIONS, MAX_YEARS,
+                    RETIREMENT_INFLATION_RATE, plan_goals, retirement_plan, sip_projection
+                )
+            
+            try:
+                annual_returns = _number_list(params.get('annual_returns')) or list(DEFAULT_RETURNS)
+                inflation_rate = params.get('inflation_rate')
+                inflation_rate = float(inflation_rate) if inflation_rate not in (None, '') else None
+                step_up_percent = float(params.get('step_up_percent') or 0)
+                monthly_sip = float(params.get('monthly_sip') or 0)
+                lumpsum = float(params.get('lumpsum') or 0)
+                years = float(params.get('years') or 0)
+                monthly_expense = float(params.get('monthly_expense') or 0)
+                years_to_retirement = float(params.get('years_to_retirement') or 0)
+                years_in_retirement = float(params.get('years_in_retirement') or 25)
+                post_retirement_return = float(params.get('post_retirement_return') or 7)
+                current_savings = float(params.get('current_savings') or 0)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Plan parameters must be numbers'}), 400
+            if len(annual_returns) > MAX_RETURN_ASSUMPTIONS:
+                return jsonify({'error': f'At most {MAX_RETURN_ASSUMPTIONS} annual_returns per request'}), 400
+            if any(value <= -100 for value in annual_returns + [inflation_rate or 0, step_up_percent]):
+                return jsonify({'error': 'Returns, inflation and step-up must be above -100%'}), 400
+            if max(years, years_to_retirement, years_in_retirement) > MAX_YEARS:
+                return jsonify({'error': f'Plans are limited to {MAX_YEARS} years'}), 400
+            if min(monthly_sip, lumpsum, monthly_expense, current_savings) < 0:
+                return jsonify({'error': 'Amounts cannot be negative'}), 400
+            
+            source = 'request'
+            goals = params.get('goals') if isinstance(params.get('goals'), list) else None
+            if goals is None:
+                source, view, error = get_effective_view(finance_model, user_id)
+                if error:
+                    return jsonify({'error': error}), 400
+                goals = (view or {}).get('goals') or []
+            
+            result = plan_goals(goals, annual_returns,
+                                inflation_rate=GOAL_INFLATION_RATE if inflation_rate is None else inflation_rate,
+                                step_up_percent=step_up_percent)
+            if (monthly_sip > 0 or lumpsum > 0) and years > 0:
+                result['projection'] = sip_projection(monthly_sip, years, annual_returns, lumpsum=lumpsum,
+                                                      step_up_percent=step_up_percent)
+            if monthly_expense > 0:
+                result['retirement'] = retirement_plan(
+                    monthly_expense, years_to_retirement, years_in_retirement, annual_returns,
+                    inflation_rate=RETIREMENT_INFLATION_RATE if inflation_rate is None else inflation_rate,
+                    post_retirement_return=post_retirement_return,
+                    current_savings=current_savings, step_up_percent=step_up_percent
+                )
+            result['is_mock'] = source == 'mock'
+            
+            return jsonify({
+                'message': 'SIP plan calculated successfully',
+                'data': result
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/investment_performance', methods=['GET'])
+    @require_auth
+    def get_investment_performance():
+        """
+        XIRR, CAGR and absolute return per holding and for the whole portfolio
+        
+        Computed from dated cashflows (see utils/investment_performance.py)
+        and reused until the user's data_version or the valuation date changes.
+        """
+        try:
+            user_id = request.user_id
+            
+            with tracer.start_as_current_span('investment_performance.import_numpy'):
+                from utils.investment_performance import cached_investment_performance
+            
+            source, view, error = get_effective_view(finance_model, user_id)
+            if error:
+                return jsonify({'error': error}), 400
+            view = view or {}
+            investments = view.get('investments')
+            
+            result = cached_investment_performance(
+                user_id, (source, view.get('data_version')),
+                investments if isinstance(investments, list) else []
+            )
+            
+            return jsonify({
+                'message': 'Investment performance calculated successfully',
+                'data': {**result, 'is_mock': source == 'mock'}
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/debt_payoff', methods=['GET', 'POST'])
+    @require_auth
+    def debt_payoff():
+        """
+        Avalanche / snowball / custom payoff plans for all of the user's loans
+        
+        Optional parameters (JSON body or query string): extra_payment
+        (monthly amount on top of the EMIs), order (loan ids for the custom
+        strategy; comma-separated in a query string), schedule=false (omit the
+        combined monthly schedules) and loans (ad-hoc loans instead of the
+        user's own, JSON body only). extra_payments (a list, or comma-separated)
+        instead returns months and total interest per strategy for each amount.
+        """
+        try:
+            user_id = request.user_id
+            params = request.get_json(silent=True) or request.args.to_dict()
+            
+            with tracer.start_as_current_span('debt_payoff.import_numpy'):
+                from utils.debt_payoff import MAX_SWEEP_BUDGETS, payoff_plan, payoff_sweep
+            
+            extra_payments = params.get('extra_payments')
+            if isinstance(extra_payments, str):
+                extra_payments = [item for item in extra_payments.split(',') if item.strip()]
+            try:
+                extra_payment = float(params.get('extra_payment') or 0)
+                if extra_payments is not None:
+                    extra_payments = [float(item) for item in extra_payments]
+            except (TypeError, ValueError):
+                return jsonify({'error': 'extra_payment and extra_payments must be numbers'}), 400
+            if extra_payment < 0 or any(item < 0 for item in extra_payments or []):
+                return jsonify({'error': 'Extra payments cannot be negative'}), 400
+            if extra_payments is not None and len(extra_payments) > MAX_SWEEP_BUDGETS:
+                return jsonify({'error': f'At most {MAX_SWEEP_BUDGETS} extra_payments per request'}), 400
+            ranking = params.get('order') or []
+            if isinstance(ranking, str):
+                ranking = [item.strip() for item in ranking.split(',') if item.strip()]
+            include_schedule = str(params.get('schedule', 'true')).lower() not in ('false', '0', 'no')
+            
+            source = 'request'
+            loans = params.get('loans') if isinstance(params.get('loans'), list) else None
+            if loans is None:
+                source, view, error = get_effective_view(finance_model, user_id)
+                if error:
+                    return jsonify({'error': error}), 400
+                loans = (view or {}).get('loans') or []
+            
+            if extra_payments is not None:
+                result = payoff_sweep(loans, extra_payments, ranking)
             else:
-                # Always use mock goals (either no user goals, or incomplete set)
-                # This ensures users always see all 5 goals from mock_data.json
-                merged_data['goals'] = mock_data.get('goals', [])
-                merged_data['is_mock'] = True  # Flag that goals are from mock
-                print(f"📊 Using mock_data goals ({len(mock_data.get('goals', []))} goals) for user {user_id} (user had {user_goals_count} goals after cleanup)")
-            
-            # Merge other fields (budget, transactions, investments, loans, analytics, insights, etc.)
-            # Save ALL fields from mock_data that aren't already handled above
-            fields_to_merge = ['budget', 'transactions', 'investments', 'loans', 'analytics', 'insights']
-            for field in fields_to_merge:
-                merged_data[field] = data.get(field) or mock_data.get(field, [] if field in ['transactions', 'loans', 'insights'] else {})
-            
-            # Handle financial_health_metrics - check if it exists directly, or derive from analytics
-            if data.get('financial_health_metrics'):
-                merged_data['financial_health_metrics'] = data.get('financial_health_metrics')
-            elif mock_data.get('financial_health_metrics'):
-                merged_data['financial_health_metrics'] = mock_data.get('financial_health_metrics')
-            elif merged_data.get('analytics'):
-                # Map analytics to financial_health_metrics format for compatibility
-                analytics = merged_data.get('analytics', {})
-                merged_data['financial_health_metrics'] = {
-                    'monthly_trends': analytics.get('monthly_trends', []),
-                    'expense_categories': analytics.get('expense_categories', [])
-                }
+                result = payoff_plan(loans, extra_payment, ranking, include_schedule=include_schedule)
+            result['is_mock'] = source == 'mock'
+            
+            return jsonify({
+                'message': 'Debt payoff plan calculated successfully',
+                'data': result
+            }), 200
+        
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/loan_sensitivity', methods=['GET', 'POST'])
+    @require_auth
+    def loan_sensitivity_endpoint():
+        """
+        What-if grid for the user's loans: EMI, total interest and tenure
+        changes for every rate_shocks (percentage points) x prepayments
+        (rupees paid now) combination
+        
+        Optional parameters (JSON body or query string): rate_shocks and
+        prepayments (lists, or comma-separated), and loans (ad-hoc loans,
+        JSON body only) or principal, annual_rate, tenure_months (and emi) for
+        a single ad-hoc loan.
+        """
+        try:
+            user_id = request.user_id
+            params = request.get_json(silent=True) or request.args.to_dict()
+            
+            with tracer.start_as_current_span('loan_sensitivity.import_numpy'):
+                from utils.loan_sensitivity import (
+                    DEFAULT_PREPAYMENTS, DEFAULT_RATE_SHOCKS, MAX_GRID_CELLS, loan_sensitivity
+                )
+            
+            try:
+                rate_shocks = _number_list(params.get('rate_shocks')) or list(DEFAULT_RATE_SHOCKS)
+                prepayments = _number_list(params.get('prepayments')) or list(DEFAULT_PREPAYMENTS)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'rate_shocks and prepayments must be numbers'}), 400
+            if any(amount < 0 for amount in prepayments):
+                return jsonify({'error': 'Prepayments cannot be negative'}), 400
+            
+            source = 'request'
+            loans = params.get('loans') if isinstance(params.get('loans'), list) else None
+            if loans is None and params.get('principal') not in (None, ''):
+                loans = [{
+                    'name': 'Loan',
+                    'principal': params.get('principal'),
+                    'interest_rate': params.get('annual_rate'),
+                    'tenure_months': params.get('tenure_months'),
+                    'emi': params.get('emi')
+                }]
+            if loans is None:
+                source, view, error = get_effective_view(finance_model, user_id)
+                if error:
+                    return jsonify({'error': error}), 400
+                loans = (view or {}).get('loans') or []
+            if len(loans) * len(rate_shocks) * len(prepayments) > MAX_GRID_CELLS:
+                return jsonify({'error': f'At most {MAX_GRID_CELLS} loan x rate shock x prepayment cells per request'}), 400
+            
+            result = loan_sensitivity(loans, rate_shocks, prepayments)
+            result['is_mock'] = source == 'mock'
+            
+            return jsonify({
+                'message': 'Loan sensitivity calculated successfully',
+                'data': result
+            }), 200
+        
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/history', methods=['GET'])
+    @require_auth
+    def get_history():
+        """
+        Financial data change history
+        
+        Without parameters, lists logged changes newest first (limit,
+        before_seq for the next page). With ?at=<ISO date or datetime>, returns
+        the financial data as it was at that time, rebuilt from the nearest
+        snapshot plus the changes after it.
+        """
+        try:
+            user_id = request.user_id
+            at = request.args.get('at')
+            
+            if at:
+                try:
+                    parsed = datetime.fromisoformat(at)
+                except ValueError:
+                    return jsonify({'error': 'at must be an ISO date or datetime'}), 400
+                if len(at) == 10:
+                    parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+                result, error = finance_model.changes.rebuild_at(user_id, parsed.isoformat())
+                if error:
+                    return jsonify({'error': error}), 404
+                return jsonify({
+                    'message': 'Financial data rebuilt successfully',
+                    'data': result
+                }), 200
             
-            # Preserve user_id and _id from database
-            if data.get('_id'):
-                merged_data['_id'] = data.get('_id')
-            if data.get('user_id'):
-                merged_data['user_id'] = data.get('user_id')
+            try:
+                limit = max(1, min(int(request.args.get('limit', 50)), 500))
+                before_seq = request.args.get('before_seq')
+                before_seq = int(before_seq) if before_seq else None
+            except ValueError:
+                return jsonify({'error': 'limit and before_seq must be integers'}), 400
+            
+            finance_model.flush_pending(user_id)
+            result, error = finance_model.changes.list_changes(user_id, limit=limit, before_seq=before_seq)
+            if error:
+                return jsonify({'error': error}), 400
             
-            print(f"📊 User {user_id} - Merged data (User goals: {len(data.get('goals', []))}, Mock goals: {len(mock_data.get('goals', []))}, Final: {len(merged_data.get('goals', []))})")
+            return jsonify({
+                'message': 'Change history retrieved successfully',
+                'data': result
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @finance_bp.route('/history/net_worth', methods=['GET'])
+    @require_auth
+    def get_net_worth_history():
+        """Assets, liabilities and net worth after each change to them (optional since/until ISO bounds)"""
+        try:
+            user_id = request.user_id
+            bounds = {}
+            for name in ('since', 'until'):
+                value = request.args.get(name)
+                if value:
+                    try:
+                        bounds[name] = datetime.fromisoformat(value).isoformat()
+                    except ValueError:
+                        return jsonify({'error': f'{name} must be an ISO date or datetime'}), 400
+            
+            finance_model.flush_pending(user_id)
+            points, error = finance_model.changes.net_worth_history(user_id, **bounds)
+            if error:
+                return jsonify({'error': error}), 400
             
             return jsonify({
-                'message': 'Financial data retrieved successfully',
-                'data': merged_data
+                'message': 'Net worth history retrieved successfully',
+                'data': points
             }), 200
             
         except Exception as e:
@@ -330,14 +1003,47 @@ def init_finance_routes(db):
     @finance_bp.route('/calculate_emi', methods=['POST'])
     @require_auth
     def calculate_emi_endpoint():
-        """Calculate EMI for a loan"""
+        """
+        Calculate EMI for a loan
+        
+        Optional floating-rate / step EMI fields: rate_resets ([{"month",
+        "annual_rate"}]), reset_policy ("keep_emi" or "keep_tenure"),
+        emi_step_percent and emi_step_months (default 12).
+        
+        Fixed-rate loans take an optional view: "full" (default, every month),
+        "yearly" (per-year totals), "window" (months from .. from + count - 1,
+        count up to 120) or "milestones".
+        """
         try:
             data = request.get_json()
             principal = float(data.get('principal', 0))
             annual_rate = float(data.get('annual_rate', 0))
             tenure_months = int(data.get('tenure_months', 0))
-            
-            result = calculate_emi(principal, annual_rate, tenure_months)
+            view = data.get('view') or 'full'
+            floating = bool(data.get('rate_resets') or data.get('emi_step_percent'))
+            
+            if floating and view != 'full':
+                return jsonify({'error': 'view is only supported for fixed-rate loans'}), 400
+            
+            if floating:
+                rate_resets = data.get('rate_resets') or []
+                if not isinstance(rate_resets, list):
+                    return jsonify({'error': 'rate_resets must be a list'}), 400
+                result = calculate_floating_emi(
+                    principal, annual_rate, tenure_months,
+                    rate_resets=rate_resets,
+                    reset_policy=data.get('reset_policy') or 'keep_emi',
+                    emi_step_percent=float(data.get('emi_step_percent') or 0),
+                    emi_step_months=int(data.get('emi_step_months') or 12)
+                )
+            elif view == 'full':
+                result = cached_calculate_emi(principal, annual_rate, tenure_months)
+            else:
+                result = amortization_view(
+                    principal, annual_rate, tenure_months, view,
+                    start_month=int(data.get('from') or 1),
+                    count=int(data.get('count') or 12)
+                )
             
             if 'error' in result:
                 return jsonify({'error': result['error']}), 400
@@ -362,7 +1068,7 @@ def init_finance_routes(db):
             prepayment_amount = float(data.get('prepayment_amount', 0))
             prepayment_month = int(data.get('prepayment_month', 0))
             
-            result = calculate_prepayment_savings(
+            result = cached_prepayment_savings(
                 principal, annual_rate, tenure_months, 
                 prepayment_amount, prepayment_month
             )
@@ -389,7 +1095,7 @@ def init_finance_routes(db):
             if not loans:
                 return jsonify({'error': 'No loans provided for comparison'}), 400
             
-            result = compare_loans(loans)
+            result = cached_compare_loans(loans)
             
             return jsonify({
                 'message': 'Loans compared successfully',
@@ -402,7 +1108,13 @@ def init_finance_routes(db):
     @finance_bp.route('/calculate_affordability', methods=['POST'])
     @require_auth
     def calculate_affordability_endpoint():
-        """Calculate loan affordability"""
+        """
+        Calculate loan affordability
+        
+        With table=true (or annual_rates / tenure_months lists) the response
+        also has max_principal_table: the largest loan the affordable EMI
+        repays at every rate x tenure.
+        """
         try:
             data = request.get_json()
             monthly_income = float(data.get('monthly_income', 0))
@@ -414,6 +1126,25 @@ def init_finance_routes(db):
             if 'error' in result:
                 return jsonify({'error': result['error']}), 400
             
+            if data.get('table') or data.get('annual_rates') or data.get('tenure_months'):
+                with tracer.start_as_current_span('loan_solvers.import_numpy'):
+                    from utils.loan_solvers import (
+                        DEFAULT_TABLE_RATES, DEFAULT_TABLE_TENURES, MAX_TABLE_CELLS, affordability_table
+                    )
+                try:
+                    rates = _number_list(data.get('annual_rates')) or list(DEFAULT_TABLE_RATES)
+                    tenures = [int(months) for months in _number_list(data.get('tenure_months'))] or \
+                        list(DEFAULT_TABLE_TENURES)
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'annual_rates and tenure_months must be numbers'}), 400
+                if len(rates) * len(tenures) > MAX_TABLE_CELLS:
+                    return jsonify({'error': f'At most {MAX_TABLE_CELLS} rate x tenure cells per table'}), 400
+                if any(rate < 0 for rate in rates) or any(months <= 0 for months in tenures):
+                    return jsonify({'error': 'Rates must be non-negative and tenures positive'}), 400
+                result['max_principal_table'] = affordability_table(
+                    max(0.0, result['max_affordable_emi']), rates, tenures
+                )
+            
             return jsonify({
                 'message': 'Affordability calculated successfully',
                 'data': result
@@ -422,6 +1153,71 @@ def init_finance_routes(db):
         except Exception as e:
             return jsonify({'error': f'Server error: {str(e)}'}), 500
     
+    @finance_bp.route('/loan_solver', methods=['POST'])
+    @require_auth
+    def loan_solver_endpoint():
+        """
+        Inverse loan calculations, batched
+        
+        solve=principal: largest principal for emi at every annual_rates x
+        tenure_months; solve=tenure: months needed for each of loans
+        [{principal, emi, annual_rate}]; solve=rate: implied APR (with
+        processing_fee / processing_fee_percent) of each of quotes
+        [{principal, emi, tenure_months, ...}].
+        """
+        try:
+            data = request.get_json() or {}
+            solve = data.get('solve')
+            
+            with tracer.start_as_current_span('loan_solvers.import_numpy'):
+                from utils.loan_solvers import (
+                    DEFAULT_TABLE_RATES, DEFAULT_TABLE_TENURES, MAX_TABLE_CELLS,
+                    affordability_table, implied_apr_table, tenure_table
+                )
+            
+            if solve == 'principal':
+                try:
+                    emi = float(data.get('emi', 0))
+                    rates = _number_list(data.get('annual_rates', data.get('annual_rate'))) or \
+                        list(DEFAULT_TABLE_RATES)
+                    tenures = [int(months) for months in
+                               _number_list(data.get('tenure_months'))] or list(DEFAULT_TABLE_TENURES)
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'emi, annual_rates and tenure_months must be numbers'}), 400
+                if emi <= 0 or any(rate < 0 for rate in rates) or any(months <= 0 for months in tenures):
+                    return jsonify({'error': 'EMI and tenures must be positive and rates non-negative'}), 400
+                if len(rates) * len(tenures) > MAX_TABLE_CELLS:
+                    return jsonify({'error': f'At most {MAX_TABLE_CELLS} rate x tenure cells per table'}), 400
+                result = affordability_table(emi, rates, tenures)
+            elif solve in ('tenure', 'rate'):
+                key = 'loans' if solve == 'tenure' else 'quotes'
+                items = data.get(key)
+                if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+                    return jsonify({'error': f'{key} must be a non-empty list of objects'}), 400
+                if len(items) > MAX_TABLE_CELLS:
+                    return jsonify({'error': f'At most {MAX_TABLE_CELLS} {key} per request'}), 400
+                try:
+                    if solve == 'tenure':
+                        result = {'loans': tenure_table(
+                            [float(item.get('principal') or 0) for item in items],
+                            [float(item.get('emi') or 0) for item in items],
+                            [float(item.get('annual_rate') or 0) for item in items]
+                        )}
+                    else:
+                        result = {'quotes': implied_apr_table(items)}
+                except (TypeError, ValueError):
+                    return jsonify({'error': f'{key} values must be numbers'}), 400
+            else:
+                return jsonify({'error': 'solve must be one of: principal, tenure, rate'}), 400
+            
+            return jsonify({
+                'message': 'Loan solved successfully',
+                'data': result
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
     @finance_bp.route('/get_loan_presets', methods=['GET'])
     @require_auth
     def get_loan_presets():
@@ -783,6 +1579,15 @@ Return ONLY the JSON configuration. Do not include any explanation, markdown cod
             if not data:
                 return jsonify({'error': 'No report data provided'}), 400
             
+            # reportlab is heavy - load it on first PDF request rather than at worker boot
+            with tracer.start_as_current_span('pdf.import_reportlab'):
+                from reportlab.lib.pagesizes import A4
+                from reportlab.lib.units import inch
+                from reportlab.lib import colors
+                from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+                from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+                from reportlab.lib.enums import TA_CENTER
+            
             # Create PDF in memory
             buffer = BytesIO()
             doc = SimpleDocTemplate(buffer, pagesize=A4, 
@@ -924,15 +1729,19 @@ Return ONLY the JSON configuration. Do not include any explanation, markdown cod
             # Investments Section
             if 'investments' in data and isinstance(data['investments'], list) and len(data['investments']) > 0:
                 elements.append(Paragraph('Investments', heading_style))
-                investments_data = [['Investment', 'Amount Invested (₹)', 'Current Value (₹)', 'Returns %']]
-                for inv in data['investments']:
+                # Annualized returns from purchase dates / cashflows (XIRR), not just gain over cost
+                from utils.investment_performance import investment_performance
+                performance = investment_performance(data['investments'])['holdings']
+                investments_data = [['Investment', 'Amount Invested (₹)', 'Current Value (₹)', 'Returns %', 'XIRR %']]
+                for inv, perf in zip((item for item in data['investments'] if isinstance(item, dict)), performance):
                     name = inv.get('name', 'Unnamed Investment')
-                    invested = inv.get('amount_invested', 0)
+                    invested = perf['invested'] or inv.get('amount_invested', 0) or 0
                     current = inv.get('current_value', 0)
                     returns = ((current - invested) / invested * 100) if invested > 0 else 0
-                    investments_data.append([name, f"{invested:,.2f}", f"{current:,.2f}", f"{returns:.1f}%"])
+                    xirr = f"{perf['xirr']:.1f}%" if perf['xirr'] is not None else '-'
+                    investments_data.append([name, f"{invested:,.2f}", f"{current:,.2f}", f"{returns:.1f}%", xirr])
                 
-                investments_table = Table(investments_data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1*inch])
+                investments_table = Table(investments_data, colWidths=[1.8*inch, 1.4*inch, 1.4*inch, 0.8*inch, 0.8*inch])
                 investments_table.setStyle(TableStyle([
                     ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f59e0b')),
                     ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -975,7 +1784,8 @@ Return ONLY the JSON configuration. Do not include any explanation, markdown cod
                         elements.append(Spacer(1, 0.3*inch))
             
             # Build PDF
-            doc.build(elements)
+            with tracer.start_as_current_span('pdf.render', {'pdf.elements': len(elements)}), pdf_render_duration.time():
+                doc.build(elements)
             
             # Get PDF data
             pdf_data = buffer.getvalue()
@@ -1003,6 +1813,7 @@ Return ONLY the JSON configuration. Do not include any explanation, markdown cod
             
             if error:
                 return jsonify({'error': error}), 400
+            financial_data = with_transaction_aggregates(finance_model, user_id, financial_data)
             
             # If no data exists, use mock data for demo purposes
             if not financial_data:
@@ -1061,16 +1872,17 @@ Return your response starting immediately with the first insight. NO greetings o
             
             # Clean the response to ensure it's just insights
             # Remove any potential greetings or explanations
-            cleaned_insights = insights_text.strip()
-            if cleaned_insights.lower().startswith('hello') or cleaned_insights.lower().startswith('hi'):
-                # Find first actual insight (usually after first paragraph)
-                lines = cleaned_insights.split('\n')
-                start_idx = 0
-                for i, line in enumerate(lines):
-                    if line.strip() and (line.startswith('##') or line.startswith('*') or line.startswith('-') or line[0].isdigit()):
-                        start_idx = i
-                        break
-                cleaned_insights = '\n'.join(lines[start_idx:])
+            with tracer.start_as_current_span('insights.postprocess'):
+                cleaned_insights = insights_text.strip()
+                if cleaned_insights.lower().startswith('hello') or cleaned_insights.lower().startswith('hi'):
+                    # Find first actual insight (usually after first paragraph)
+                    lines = cleaned_insights.split('\n')
+                    start_idx = 0
+                    for i, line in enumerate(lines):
+                        if line.strip() and (line.startswith('##') or line.startswith('*') or line.startswith('-') or line[0].isdigit()):
+                            start_idx = i
+                            break
+                    cleaned_insights = '\n'.join(lines[start_idx:])
             
             return jsonify({
                 'message': 'Insights generated successfully',
@@ -1086,5 +1898,10 @@ Return your response starting immediately with the first insight. NO greetings o
             traceback.print_exc()
             return jsonify({'error': f'Server error: {str(e)}'}), 500
     
+    # Answer the loan page's preset calculations from the cache from the first request
+    mock_data_file = load_mock_data_from_file()
+    warmed = warm_presets(((mock_data_file or {}).get('loan_calculators') or {}).get('presets', []))
+    print(f"🧮 Precomputed {warmed} loan preset calculations")
+    
     return finance_bp
 
@@ -0,0 +1,69 @@
+# Bulk-imports a CSV or OFX bank statement into a user's transactions.
+# The file is streamed and written in unordered batches; rows already
+# imported (same content hash) are skipped, so re-running is safe.
+# Run this from the backend directory:
+#   python scripts/import_statement.py --email user@example.com statement.csv [--dry-run]
+
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from config import Config
+from models.transaction_model import TransactionModel
+from utils.db import MongoConnectionManager
+from utils.statement_import import (
+    DEFAULT_BATCH_SIZE, StatementImportError, detect_format, import_statement, open_statement_stream
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import a CSV/OFX bank statement into transactions')
+    parser.add_argument('path', help='Statement file (.csv, .ofx or .qfx)')
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument('--email', help='Email of the user to import for')
+    who.add_argument('--user-id', help='User ID to import for')
+    parser.add_argument('--format', choices=['csv', 'ofx'], help='Override format detection')
+    parser.add_argument('--date-format', help="strptime format tried first, e.g. '%%d/%%m/%%Y'")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per insert_many')
+    parser.add_argument('--dry-run', action='store_true', help='Parse and normalize only')
+    args = parser.parse_args()
+    
+    mongo = MongoConnectionManager(Config.MONGO_URI)
+    transaction_model = TransactionModel(mongo.db)
+    try:
+        user_id = args.user_id
+        if args.email:
+            user = mongo.db.users.find_one({"email": args.email.lower().strip()}, {"_id": 1})
+            if not user:
+                sys.exit(f"✗ No user with email {args.email}")
+            user_id = str(user["_id"])
+        
+        if not args.dry_run:
+            transaction_model.ensure_indexes()
+            transaction_model.migrate_user(user_id)
+        
+        with open(args.path, 'rb') as f:
+            stream = open_statement_stream(f)
+            file_format = args.format or detect_format(args.path, stream.peek(2048))
+            try:
+                report = import_statement(transaction_model, user_id, stream, file_format=file_format,
+                                          date_format=args.date_format, batch_size=args.batch_size,
+                                          dry_run=args.dry_run)
+            except StatementImportError as e:
+                sys.exit(f"✗ {e}")
+        
+        print(f"✅ {report['rows']} rows in {report['elapsed_seconds']}s ({report['rows_per_second']} rows/sec)")
+        print(f"   inserted {report['inserted']}, duplicates {report['duplicates']}, invalid {report['invalid']}"
+              + (" (dry run)" if args.dry_run else ""))
+        for error in report['errors']:
+            print(f"   row {error['row']}: {error['error']}")
+    finally:
+        mongo.close()
+
+
+if __name__ == '__main__':
+    main()
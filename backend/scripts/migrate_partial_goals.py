@@ -0,0 +1,38 @@
+# One-time migration: removes partial goal lists (1-4 goals) left behind by
+# older versions, which used to delete them lazily from inside GET /get_data.
+# Safe to re-run; documents with 0 or 5+ goals are not touched.
+# Run this from the backend directory: python scripts/migrate_partial_goals.py [--dry-run]
+
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from config import Config
+from models.finance_model import FinanceModel, PARTIAL_GOALS_FILTER
+from utils.db import MongoConnectionManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remove partial goal lists from financial_data')
+    parser.add_argument('--dry-run', action='store_true', help='Only count affected documents')
+    args = parser.parse_args()
+    
+    mongo = MongoConnectionManager(Config.MONGO_URI)
+    finance_model = FinanceModel(mongo.db)
+    try:
+        affected = finance_model.collection.count_documents(PARTIAL_GOALS_FILTER)
+        print(f"🔍 {affected} document(s) with partial goals")
+        if args.dry_run or not affected:
+            return
+        modified = finance_model.cleanup_partial_goals()
+        print(f"✅ Removed partial goals from {modified} document(s)")
+    finally:
+        mongo.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# One-time migration: moves the transactions array embedded in each
+# financial_data document into the indexed transactions collection.
+# Documents are marked transactions_migrated, so re-running only picks up
+# the ones that are left; an interrupted user is re-imported from scratch.
+# Run this from the backend directory: python scripts/migrate_transactions.py [--dry-run]
+
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from config import Config
+from models.transaction_model import TransactionModel, UNMIGRATED_FILTER
+from utils.db import MongoConnectionManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move embedded transactions into the transactions collection')
+    parser.add_argument('--dry-run', action='store_true', help='Only count affected documents')
+    args = parser.parse_args()
+    
+    mongo = MongoConnectionManager(Config.MONGO_URI)
+    transaction_model = TransactionModel(mongo.db)
+    financial_data = mongo.db.financial_data
+    try:
+        pending = financial_data.count_documents(UNMIGRATED_FILTER)
+        print(f"🔍 {pending} document(s) with embedded transactions")
+        if args.dry_run or not pending:
+            return
+        
+        transaction_model.ensure_indexes()
+        started = time.perf_counter()
+        users = moved = 0
+        user_ids = [doc["user_id"] for doc in financial_data.find(UNMIGRATED_FILTER, {"user_id": 1})]
+        for user_id in user_ids:
+            count, error = transaction_model.migrate_user(str(user_id))
+            if error:
+                print(f"⚠️ Skipping user {user_id}: {error}")
+                continue
+            users += 1
+            moved += count
+        elapsed = time.perf_counter() - started
+        print(f"✅ Migrated {moved} transaction(s) for {users} user(s) in {elapsed:.1f}s")
+    finally:
+        mongo.close()
+
+
+if __name__ == '__main__':
+    main()
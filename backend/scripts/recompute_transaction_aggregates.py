@@ -0,0 +1,66 @@
+# Repair job: rebuilds the per-month aggregates derived from the transactions
+# collection (budget spent rollups and monthly trend buckets). Transaction
+# writes keep them current, so this is only needed once after upgrading and to
+# repair drift (e.g. after transactions were edited directly in the database).
+# Run this from the backend directory:
+#   python scripts/recompute_transaction_aggregates.py [--email user@example.com | --user-id ID]
+
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from config import Config
+from models.budget_rollup_model import BudgetRollupModel
+from models.trend_model import TrendModel
+from utils.db import MongoConnectionManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild budget rollups and trend buckets from transactions')
+    who = parser.add_mutually_exclusive_group()
+    who.add_argument('--email', help='Only this user (by email)')
+    who.add_argument('--user-id', help='Only this user (by ID)')
+    args = parser.parse_args()
+    
+    mongo = MongoConnectionManager(Config.MONGO_URI)
+    rollups = BudgetRollupModel(mongo.db)
+    trends = TrendModel(mongo.db)
+    try:
+        rollups.ensure_indexes()
+        trends.ensure_indexes()
+        if args.email:
+            user = mongo.db.users.find_one({"email": args.email.lower().strip()}, {"_id": 1})
+            if not user:
+                sys.exit(f"✗ No user with email {args.email}")
+            user_ids = [user["_id"]]
+        elif args.user_id:
+            user_ids = [args.user_id]
+        else:
+            # Users whose transactions were all deleted still need their rollups cleared
+            user_ids = (set(mongo.db.transactions.distinct("user_id")) | set(rollups.collection.distinct("user_id"))
+                        | set(trends.collection.distinct("user_id")))
+        
+        started = time.perf_counter()
+        users = months = 0
+        for user_id in user_ids:
+            count, error = rollups.recompute_user(str(user_id))
+            if not error:
+                _, error = trends.recompute_user(str(user_id))
+            if error:
+                print(f"⚠️ Skipping user {user_id}: {error}")
+                continue
+            users += 1
+            months += count
+        elapsed = time.perf_counter() - started
+        print(f"✅ Rebuilt {months} budget month(s) and trend buckets for {users} user(s) in {elapsed:.1f}s")
+    finally:
+        mongo.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# Batch job: refreshes the stored cash-flow forecast fits of every user with
+# transaction trend buckets, spread over a process pool (fitting is numpy-bound,
+# so processes rather than threads). Reads already extend a stale fit, so this
+# keeps fits current ahead of requests (e.g. nightly, after a month closes);
+# --full refits from scratch, e.g. after changing the forecast settings.
+# Run this from the backend directory:
+#   python scripts/refresh_cashflow_forecasts.py [--workers 4] [--full] [--email user@example.com | --user-id ID]
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from config import Config
+from models.transaction_model import TransactionModel
+from utils.cashflow_forecast import user_cashflow_forecast
+from utils.db import MongoConnectionManager
+
+# Users handed to a worker per task
+USERS_PER_TASK = 50
+
+# Set in each worker process by _init_worker
+_worker = {}
+
+
+def _init_worker():
+    """Open one MongoDB client per worker process"""
+    mongo = MongoConnectionManager(Config.MONGO_URI)
+    _worker['transactions'] = TransactionModel(mongo.db)
+
+
+def refresh_users(user_ids, full=False):
+    """
+    Refresh the forecasts of a batch of users (runs in a worker process)
+
+    Returns:
+        Counter of fit modes ("full", "incremental", "cached"), "short" for
+        too little history and "error"
+    """
+    counts = Counter()
+    for user_id in user_ids:
+        try:
+            result, error = user_cashflow_forecast(_worker['transactions'], user_id, refit=full)
+        except Exception as e:
+            error = str(e)
+        if error:
+            print(f"⚠️ Skipping user {user_id}: {error}")
+            counts['error'] += 1
+        else:
+            counts[result['fit'] if result else 'short'] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh stored cash-flow forecast fits')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--full', action='store_true', help='Refit from scratch instead of extending stored fits')
+    who = parser.add_mutually_exclusive_group()
+    who.add_argument('--email', help='Only this user (by email)')
+    who.add_argument('--user-id', help='Only this user (by ID)')
+    args = parser.parse_args()
+
+    mongo = MongoConnectionManager(Config.MONGO_URI)
+    try:
+        TransactionModel(mongo.db).forecasts.ensure_indexes()
+        if args.email:
+            user = mongo.db.users.find_one({"email": args.email.lower().strip()}, {"_id": 1})
+            if not user:
+                sys.exit(f"✗ No user with email {args.email}")
+            user_ids = [str(user["_id"])]
+        elif args.user_id:
+            user_ids = [args.user_id]
+        else:
+            user_ids = [str(user_id) for user_id in mongo.db.monthly_trends.distinct("user_id")]
+    finally:
+        mongo.close()
+
+    started = time.perf_counter()
+    counts = Counter()
+    batches = [user_ids[start:start + USERS_PER_TASK] for start in range(0, len(user_ids), USERS_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(batches) or 1)),
+                             initializer=_init_worker) as pool:
+        for future in as_completed([pool.submit(refresh_users, batch, args.full) for batch in batches]):
+            counts.update(future.result())
+    elapsed = time.perf_counter() - started
+    summary = ', '.join(f"{count} {mode}" for mode, count in sorted(counts.items())) or 'nothing to do'
+    print(f"✅ Refreshed cash-flow forecasts for {len(user_ids)} user(s) in {elapsed:.1f}s ({summary})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Seeded checks for the goal Monte Carlo (utils/goal_projection.py)
+# Run this from the backend directory: python test_goal_projection.py
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import math
+from datetime import date
+
+from utils.goal_projection import ASSET_CLASSES, project_goals
+
+TODAY = date(2025, 1, 15)
+
+# Every asset class at 10% a year with no volatility: all paths are the same
+CERTAIN = {asset_class: {'return': 10, 'volatility': 0} for asset_class in ASSET_CLASSES}
+
+
+def _closed_form(current, contribution, months, annual_return=0.10):
+    """current grown for `months`, plus `contribution` paid at the end of each month"""
+    growth = (1 + annual_return) ** (1 / 12)
+    return current * growth ** months + contribution * (growth ** months - 1) / (growth - 1)
+
+
+def test_zero_volatility_matches_closed_form():
+    goal = {'name': 'House', 'target': 5000000, 'current': 200000, 'year': 2034}
+    result = project_goals([goal], monthly_contribution=20000, paths=1000, seed=1,
+                           assumptions=CERTAIN, today=TODAY)
+    entry = result['goals'][0]
+    expected = _closed_form(200000, 20000, entry['horizon_months'])
+    assert entry['horizon_months'] == 119
+    for value in entry['percentiles'].values():
+        assert math.isclose(value, expected, rel_tol=1e-4), (value, expected)
+    for band in entry['bands']:
+        assert math.isclose(band['p10'], band['p90'], rel_tol=1e-5), band
+        assert math.isclose(band['p50'], _closed_form(200000, 20000, band['month']), rel_tol=1e-4), band
+
+
+def test_zero_volatility_probability_is_certain():
+    expected = _closed_form(100000, 10000, 119)
+    goals = [
+        {'name': 'Reached', 'target': expected * 0.99, 'current': 100000, 'year': 2034},
+        {'name': 'Missed', 'target': expected * 1.01, 'current': 100000, 'year': 2034},
+    ]
+    # One goal at a time, so each gets the whole contribution
+    reached, missed = (project_goals([goal], monthly_contribution=10000, paths=1000, seed=1,
+                                     assumptions=CERTAIN, today=TODAY)['goals'][0] for goal in goals)
+    assert reached['success_probability'] == 1.0 and reached['status'] == 'on_track', reached
+    assert missed['success_probability'] == 0.0 and missed['status'] == 'off_track', missed
+
+
+def test_seed_is_reproducible():
+    goals = [{'name': 'Retirement', 'target': 30000000, 'current': 1000000, 'year': 2050, 'priority': 'high'},
+             {'name': 'Car', 'target': 1500000, 'current': 100000, 'year': 2028, 'priority': 'low'}]
+    assets = {'mutual_funds': 800000, 'fixed_deposits': 300000, 'savings': 100000}
+    first, second = (project_goals(goals, assets=assets, monthly_contribution=40000, paths=4000, seed=42,
+                                   today=TODAY) for _ in range(2))
+    assert first['goals'] == second['goals']
+    retirement = first['goals'][0]
+    assert 0.0 < retirement['success_probability'] < 1.0, retirement
+    p = retirement['percentiles']
+    assert p['p10'] < p['p25'] < p['p50'] < p['p75'] < p['p90'], p
+
+
+def test_contribution_split_by_priority():
+    goals = [{'name': 'High', 'target': 1200000, 'current': 0, 'year': 2034, 'priority': 'high'},
+             {'name': 'Low', 'target': 1200000, 'current': 0, 'year': 2034, 'priority': 'low'}]
+    result = project_goals(goals, monthly_contribution=40000, paths=200, seed=1, today=TODAY)
+    high, low = (entry['monthly_contribution'] for entry in result['goals'])
+    assert high == 30000 and low == 10000, (high, low)
+
+
+if __name__ == '__main__':
+    for name, check in list(globals().items()):
+        if name.startswith('test_') and callable(check):
+            check()
+            print(f"✓ {name}")
@@ -0,0 +1,43 @@
+# Regression checks for the XIRR / CAGR engine (utils/investment_performance.py)
+# Run this from the backend directory: python test_investment_performance.py
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date
+
+from utils.investment_performance import investment_performance
+
+
+def _xirr(cashflows, current_value, valuation_date):
+    holding = {'name': 'Holding', 'cashflows': cashflows, 'current_value': current_value}
+    result = investment_performance([holding], valuation_date)
+    return result['holdings'][0]['xirr'], result['portfolio']['xirr']
+
+
+def test_plain_holding():
+    """1000 grown to 1100 over one (leap) year"""
+    holding, portfolio = _xirr([{'date': '2024-01-01', 'amount': -1000}], 1100, date(2025, 1, 1))
+    assert holding == portfolio == 9.97, holding
+
+
+def test_root_above_range():
+    """Doubling in 31 days annualizes past MAX_RATE: no rate, not +10000%"""
+    holding, portfolio = _xirr([{'date': '2025-01-01', 'amount': -1000}], 2000, date(2025, 2, 1))
+    assert holding is None and portfolio is None, (holding, portfolio)
+
+
+def test_no_root():
+    """Net value stays positive at every rate: no rate, not -99.99%"""
+    cashflows = [{'date': '2020-02-07', 'amount': -297}, {'date': '2020-05-17', 'amount': 1632}]
+    for valuation_date in (date(2020, 6, 1), date(2021, 1, 1), date(2025, 1, 1)):
+        holding, portfolio = _xirr(cashflows, 532, valuation_date)
+        assert holding is None and portfolio is None, (valuation_date, holding, portfolio)
+
+
+if __name__ == '__main__':
+    for name, check in list(globals().items()):
+        if name.startswith('test_') and callable(check):
+            check()
+            print(f"✓ {name}")
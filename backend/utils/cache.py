@@ -0,0 +1,173 @@
+"""
+In-process Cache Utilities
+Small thread-safe caches shared by routes and utilities
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe key/value cache where every entry expires after a fixed TTL.
+
+    Expired entries are dropped lazily on access and swept whenever the cache
+    grows past max_size, so memory stays bounded without a background thread.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._data: Dict[Any, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing/expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store value under key with a fresh TTL"""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._data) >= self.max_size and key not in self._data:
+                self._sweep(now)
+                if len(self._data) >= self.max_size:
+                    # Still full - evict the entry closest to expiry
+                    oldest = min(self._data, key=lambda k: self._data[k][0])
+                    del self._data[oldest]
+            self._data[key] = (now + self.ttl_seconds, value)
+
+    def pop(self, key, default=None):
+        """Remove key and return its value (if not expired)"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def _sweep(self, now: float):
+        expired = [k for k, (expires_at, _) in self._data.items() if expires_at <= now]
+        for k in expired:
+            del self._data[k]
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Return hit/miss statistics"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class LRUCache:
+    """
+    Thread-safe key/value cache bounded by entry count; the least recently
+    used entry is evicted when a new key would exceed max_size.
+
+    With max_bytes and a sizeof(value) function it is also bounded by the
+    (estimated) size of its values: least recently used entries are evicted
+    until the total fits, and a single value larger than max_bytes is not
+    stored at all.
+
+    Entries never expire, so it suits pure functions of their key (e.g. loan
+    calculations keyed by their inputs).
+    """
+
+    def __init__(self, max_size: int = 4096, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes if sizeof else None
+        self._sizeof = sizeof
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._sizes: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key (marking it recently used), or default"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store value under key, evicting least recently used entries if full"""
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._data:
+                del self._data[key]
+                self.bytes -= self._sizes.pop(key, 0)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            while self._data and (len(self._data) >= self.max_size or
+                                  (self.max_bytes is not None and self.bytes + size > self.max_bytes)):
+                evicted, _ = self._data.popitem(last=False)
+                self.bytes -= self._sizes.pop(evicted, 0)
+                self.evictions += 1
+            self._data[key] = value
+            if self.max_bytes is not None:
+                self._sizes[key] = size
+                self.bytes += size
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Return hit/miss/eviction statistics"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
@@ -0,0 +1,315 @@
+"""
+Cash-flow Forecast
+Projects monthly income, expenses, net cash flow and spend per category for
+the next 3-12 months, with 80% and 95% intervals, from the user's monthly
+trend buckets (see models/trend_model.py), or from analytics.monthly_trends
+when the user has no transaction history.
+
+Every series is fitted with simple exponential smoothing, its smoothing
+factor picked from ALPHA_GRID by one-step-ahead squared error; all series and
+all grid values go through the recursion together as one (series x alphas)
+array, one month per step. With two years of history a seasonal naive model
+(same month last year) competes and is used where its one-step error is
+lower.
+
+The fitted state (smoothing factors, levels, error sums and the last year of
+values) is small and stored per user (models/forecast_model.py). When new
+months arrive only those months are run through the recursion; smoothing
+factors are re-picked every REFIT_MONTHS months, or when earlier months
+changed (e.g. a back-dated transaction).
+"""
+
+import hashlib
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.budget_rollup_model import current_month
+from models.trend_model import _months_between, category_label, month_label
+from utils.numeric import rounded
+
+DEFAULT_HORIZON = 6
+MIN_HORIZON = 3
+MAX_HORIZON = 12
+
+# Complete months needed before anything is forecast
+MIN_HISTORY_MONTHS = 3
+
+SEASON_MONTHS = 12
+
+# Smoothing factors tried for every series
+ALPHA_GRID = tuple(round(0.05 * step, 2) for step in range(1, 21))
+
+# Months added incrementally before the smoothing factors are re-picked
+REFIT_MONTHS = 6
+
+# Normal quantiles of the reported intervals
+INTERVAL_Z = (('80', 1.2816), ('95', 1.96))
+
+# Stored states of another version are refitted
+STATE_VERSION = 1
+
+# Series names of per-category spend start with this
+CATEGORY_PREFIX = 'category:'
+
+
+def series_from_buckets(buckets: Sequence[Dict], before_month: Optional[str] = None
+                        ) -> Tuple[List[str], List[str], np.ndarray]:
+    """
+    Monthly series from trend buckets (TrendModel.get_buckets)
+
+    Months without transactions inside the range count as zero; before_month
+    and later months (still in progress) are left out.
+
+    Returns:
+        (months YYYY-MM, series names, (series x months) values); the names
+        are income, expenses, then CATEGORY_PREFIX + category
+    """
+    by_month = {bucket['month']: bucket for bucket in buckets
+                if bucket.get('count') and (before_month is None or bucket['month'] < before_month)}
+    if not by_month:
+        return [], [], np.zeros((0, 0))
+    months = _months_between(min(by_month), max(by_month))
+    categories = sorted({category for bucket in by_month.values() for category in bucket.get('by_category') or {}})
+    rows = {category: 2 + index for index, category in enumerate(categories)}
+    values = np.zeros((2 + len(categories), len(months)))
+    for column, month in enumerate(months):
+        bucket = by_month.get(month)
+        if not bucket:
+            continue
+        values[0, column] = bucket.get('income', 0)
+        values[1, column] = bucket.get('expenses', 0)
+        for category, amount in (bucket.get('by_category') or {}).items():
+            values[rows[category], column] = amount
+    return months, ['income', 'expenses'] + [CATEGORY_PREFIX + category for category in categories], values
+
+
+def series_from_trends(monthly_trends: Sequence[Dict]) -> Tuple[List[str], List[str], np.ndarray]:
+    """Income and expense series from analytics.monthly_trends entries (period, or a 'Jan 2024' month label)"""
+    points = {}
+    for entry in monthly_trends or []:
+        if not isinstance(entry, dict):
+            continue
+        month = entry.get('period')
+        if not month:
+            try:
+                month = datetime.strptime(str(entry.get('month')), '%b %Y').strftime('%Y-%m')
+            except ValueError:
+                continue
+        points[month] = (float(entry.get('income') or 0), float(entry.get('expenses') or 0))
+    if not points:
+        return [], [], np.zeros((0, 0))
+    months = _months_between(min(points), max(points))
+    values = np.array([points.get(month, (0.0, 0.0)) for month in months]).T
+    return months, ['income', 'expenses'], values
+
+
+def _history_hash(names: Sequence[str], values: np.ndarray) -> str:
+    digest = hashlib.sha1('|'.join(names).encode('utf-8'))
+    digest.update(np.ascontiguousarray(np.round(values, 2)).tobytes())
+    return digest.hexdigest()
+
+
+def _smooth(values: np.ndarray, alphas: np.ndarray, level: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exponential smoothing of (series x months) values from the given levels
+
+    alphas and level broadcast to (series, candidates); returns the final
+    levels and each candidate's sum of squared one-step errors.
+    """
+    sse = np.zeros(np.broadcast(alphas, level).shape)
+    for month in range(values.shape[1]):
+        error = values[:, month:month + 1] - level
+        sse += error * error
+        level = level + alphas * error
+    return level, sse
+
+
+def _seasonal_errors(history: np.ndarray, start: int) -> Tuple[np.ndarray, int]:
+    """Squared error sums of the same-month-last-year forecast for history columns start onwards"""
+    start = max(start, SEASON_MONTHS)
+    if history.shape[1] <= start:
+        return np.zeros(history.shape[0]), 0
+    errors = history[:, start:] - history[:, start - SEASON_MONTHS:-SEASON_MONTHS]
+    return (errors * errors).sum(axis=1), history.shape[1] - start
+
+
+def fit(months: Sequence[str], names: Sequence[str], values: np.ndarray) -> Dict:
+    """Fit every series from scratch (picks each series' smoothing factor)"""
+    grid = np.array(ALPHA_GRID)
+    level, sse = _smooth(values[:, 1:], grid[None, :], np.repeat(values[:, :1], len(grid), axis=1))
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(values.shape[0])
+    season_sse, season_count = _seasonal_errors(values, 0)
+    return {
+        'version': STATE_VERSION,
+        'names': list(names),
+        'first_month': months[0],
+        'last_month': months[-1],
+        'months': len(months),
+        'alpha': grid[best].tolist(),
+        'level': level[rows, best].tolist(),
+        'sse': sse[rows, best].tolist(),
+        'count': len(months) - 1,
+        'season_sse': season_sse.tolist(),
+        'season_count': season_count,
+        'recent': values[:, -SEASON_MONTHS:].tolist(),
+        'history_hash': _history_hash(names, values),
+        'updates': 0,
+        'fitted_at': datetime.now().isoformat()
+    }
+
+
+def update(state: Dict, months: Sequence[str], values: np.ndarray) -> Dict:
+    """
+    Extend a fitted state with the months after state['last_month'] (keeps
+    the smoothing factors); values holds the whole history
+    """
+    fitted = state['months']
+    new = values[:, fitted:]
+    alphas = np.array(state['alpha'])[:, None]
+    level, sse = _smooth(new, alphas, np.array(state['level'])[:, None])
+    # The stored last year of values covers the month a year before each new one
+    kept = np.array(state['recent'])
+    recent = np.concatenate([kept, new], axis=1)
+    season_sse, season_count = _seasonal_errors(recent, kept.shape[1])
+    return {
+        **state,
+        'last_month': months[-1],
+        'months': len(months),
+        'level': level[:, 0].tolist(),
+        'sse': (np.array(state['sse']) + sse[:, 0]).tolist(),
+        'count': state['count'] + new.shape[1],
+        'season_sse': (np.array(state['season_sse']) + season_sse).tolist(),
+        'season_count': state['season_count'] + season_count,
+        'recent': recent[:, -SEASON_MONTHS:].tolist(),
+        'history_hash': _history_hash(state['names'], values),
+        'updates': state['updates'] + new.shape[1]
+    }
+
+
+def _can_update(state: Optional[Dict], months: Sequence[str], names: Sequence[str], values: np.ndarray) -> bool:
+    """True if state was fitted on an unchanged prefix of this history"""
+    if not state or state.get('version') != STATE_VERSION or state.get('names') != list(names):
+        return False
+    if state.get('first_month') != months[0] or state.get('updates', 0) >= REFIT_MONTHS:
+        return False
+    fitted = state.get('months', 0)
+    if not 0 < fitted <= len(months) or months[fitted - 1] != state.get('last_month'):
+        return False
+    return _history_hash(names, values[:, :fitted]) == state.get('history_hash')
+
+
+def _entry(model: str, alpha: Optional[float], mean: np.ndarray, sd: np.ndarray, floor: bool = True) -> Dict:
+    entry = {'model': model, 'alpha': alpha, 'forecast': rounded(mean), 'total': round(float(mean.sum()), 2)}
+    for label, z in INTERVAL_Z:
+        lower = mean - z * sd
+        entry[f'lower_{label}'] = rounded(np.maximum(lower, 0.0) if floor else lower)
+        entry[f'upper_{label}'] = rounded(mean + z * sd)
+    return entry
+
+
+def forecast_from_state(state: Dict, horizon: int = DEFAULT_HORIZON) -> Dict:
+    """Forecasts and intervals for the months after state['last_month']"""
+    steps = np.arange(1, horizon + 1)
+    alpha = np.array(state['alpha'])
+    level = np.array(state['level'])
+    ses_sigma = np.sqrt(np.array(state['sse']) / max(state['count'], 1))
+    recent = np.array(state['recent'])
+    season_sigma = np.sqrt(np.array(state['season_sse']) / max(state['season_count'], 1))
+    seasonal = (state['season_count'] >= SEASON_MONTHS) & (season_sigma < ses_sigma)
+
+    # h-step spread: SES grows with alpha per step, seasonal naive per year ahead
+    mean = np.repeat(level[:, None], horizon, axis=1)
+    sd = ses_sigma[:, None] * np.sqrt(1 + (steps[None, :] - 1) * alpha[:, None] ** 2)
+    if seasonal.any() and recent.shape[1] == SEASON_MONTHS:
+        columns = (steps - 1) % SEASON_MONTHS
+        mean[seasonal] = recent[seasonal][:, columns]
+        sd[seasonal] = season_sigma[seasonal][:, None] * np.sqrt((steps - 1) // SEASON_MONTHS + 1)
+
+    def series(index):
+        if seasonal[index]:
+            return _entry('seasonal_naive', None, mean[index], sd[index])
+        return _entry('exponential_smoothing', float(alpha[index]), mean[index], sd[index])
+
+    last = state['last_month']
+    year, month = int(last[:4]), int(last[5:7])
+    months = [f"{year + (month - 1 + step) // 12:04d}-{(month - 1 + step) % 12 + 1:02d}" for step in steps]
+    names = state['names']
+    categories = [
+        {'category': name[len(CATEGORY_PREFIX):], 'label': category_label(name[len(CATEGORY_PREFIX):]),
+         **series(index)}
+        for index, name in enumerate(names) if name.startswith(CATEGORY_PREFIX)
+    ]
+    categories.sort(key=lambda entry: entry['total'], reverse=True)
+    income, expenses = names.index('income'), names.index('expenses')
+    return {
+        'history': {'from': state['first_month'], 'to': last, 'months': state['months']},
+        'horizon': horizon,
+        'months': months,
+        'labels': [month_label(item) for item in months],
+        'income': series(income),
+        'expenses': series(expenses),
+        # Income and expense errors are taken as independent
+        'net': _entry('derived', None, mean[income] - mean[expenses],
+                      np.sqrt(sd[income] ** 2 + sd[expenses] ** 2), floor=False),
+        'categories': categories,
+        'fitted_at': state['fitted_at']
+    }
+
+
+def forecast_cashflow(months: Sequence[str], names: Sequence[str], values: np.ndarray,
+                      state: Optional[Dict] = None, horizon: int = DEFAULT_HORIZON,
+                      refit: bool = False) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """
+    Forecast the series, reusing a stored state where possible
+
+    Returns:
+        (result with fit = "cached", "incremental" or "full", state to store),
+        or (None, state) with fewer than MIN_HISTORY_MONTHS months
+    """
+    started = time.perf_counter()
+    horizon = max(MIN_HORIZON, min(MAX_HORIZON, int(horizon)))
+    if len(months) < MIN_HISTORY_MONTHS:
+        return None, state
+    if not refit and _can_update(state, months, names, values):
+        mode = 'cached' if state['months'] == len(months) else 'incremental'
+        if mode == 'incremental':
+            state = update(state, months, values)
+    else:
+        mode = 'full'
+        state = fit(months, names, values)
+    result = forecast_from_state(state, horizon)
+    result['fit'] = mode
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    return result, state
+
+
+def user_cashflow_forecast(transactions, user_id: str, horizon: int = DEFAULT_HORIZON, refit: bool = False,
+                           month: Optional[str] = None) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Forecast from a user's trend buckets, updating the stored fit
+
+    Args:
+        transactions: TransactionModel (its trends and forecasts models are used)
+        month: Month in progress, left out of the history (defaults to the current month)
+
+    Returns:
+        (result, None), (None, None) with too little history, or (None, error)
+    """
+    buckets, error = transactions.trends.get_buckets(user_id)
+    if error:
+        return None, error
+    months, names, values = series_from_buckets(buckets, before_month=month or current_month())
+    if len(months) < MIN_HISTORY_MONTHS:
+        return None, None
+    state, error = transactions.forecasts.get_state(user_id)
+    if error:
+        return None, error
+    result, state = forecast_cashflow(months, names, values, state, horizon, refit)
+    if result['fit'] != 'cached':
+        transactions.forecasts.save_state(user_id, state)
+    result['source'] = 'transactions'
+    return result, None
@@ -0,0 +1,157 @@
+"""
+Financial Data Change Log
+Compacts the MongoDB update operators FinanceModel writes into field-level
+deltas, and replays deltas onto a snapshot to rebuild a financial_data
+document as it was at an earlier time (see models/change_log_model.py).
+
+Only the operators FinanceModel issues are replayed: $set, $unset, $inc,
+$push (with $each), $pull (equality or field-match conditions) and
+$setOnInsert, on dotted paths that may contain filtered positional
+segments ($[identifier] with arrayFilters).
+"""
+
+import copy
+from typing import Dict, List, Optional
+
+# Bookkeeping fields that change on every write and are not part of the history
+METADATA_FIELDS = ('last_updated', 'data_version', 'change_seq')
+
+# Fields never stored in snapshots or replayed (transactions live in their own collection)
+EXCLUDED_FIELDS = ('_id', 'user_id', 'transactions', 'transactions_migrated') + METADATA_FIELDS
+
+REPLAYED_OPERATORS = ('$set', '$unset', '$inc', '$push', '$pull')
+
+
+def _is_excluded(path: str) -> bool:
+    return path.split('.', 1)[0] in EXCLUDED_FIELDS
+
+
+def compact_update(update: Dict, inserted: bool = False) -> Dict:
+    """
+    Reduce a MongoDB update to the delta worth logging
+
+    Bookkeeping fields are dropped, $setOnInsert becomes $set when the write
+    created the document (and is dropped otherwise) and $unset keeps only the
+    paths. Returns {} when nothing but bookkeeping changed.
+    """
+    delta = {}
+    for operator, fields in update.items():
+        if operator == '$setOnInsert':
+            if not inserted:
+                continue
+            operator = '$set'
+        if operator not in REPLAYED_OPERATORS:
+            continue
+        kept = {path: value for path, value in fields.items() if not _is_excluded(path)}
+        if not kept:
+            continue
+        if operator == '$unset':
+            delta.setdefault('$unset', []).extend(kept)
+        else:
+            delta.setdefault(operator, {}).update(kept)
+    return delta
+
+
+def snapshot_state(doc: Optional[Dict]) -> Dict:
+    """The replayable part of a stored financial_data document"""
+    return {key: copy.deepcopy(value) for key, value in (doc or {}).items() if key not in EXCLUDED_FIELDS}
+
+
+def _matches(element, condition) -> bool:
+    """Minimal query match for arrayFilters / $pull conditions (field equality)"""
+    if isinstance(condition, dict) and isinstance(element, dict):
+        return all(element.get(key) == value for key, value in condition.items())
+    return element == condition
+
+
+def _filters_by_identifier(array_filters: Optional[List[Dict]]) -> Dict[str, Dict]:
+    filters: Dict[str, Dict] = {}
+    for entry in array_filters or []:
+        for key, value in entry.items():
+            identifier, _, field = key.partition('.')
+            condition = filters.setdefault(identifier, {})
+            if field:
+                condition[field] = value
+            else:
+                filters[identifier] = value
+    return filters
+
+
+def _targets(node, parts: List[str], filters: Dict, create: bool):
+    """Yield (container, key) pairs a dotted path resolves to"""
+    if not parts:
+        return
+    head, rest = parts[0], parts[1:]
+    if head.startswith('$[') and head.endswith(']'):
+        if not isinstance(node, list):
+            return
+        condition = filters.get(head[2:-1])
+        for index, element in enumerate(node):
+            if condition is None or _matches(element, condition):
+                if rest:
+                    yield from _targets(element, rest, filters, create)
+                else:
+                    yield node, index
+        return
+    if isinstance(node, list):
+        if not head.isdigit():
+            return
+        index = int(head)
+        if index >= len(node):
+            return
+        if rest:
+            yield from _targets(node[index], rest, filters, create)
+        else:
+            yield node, index
+        return
+    if not isinstance(node, dict):
+        return
+    if not rest:
+        yield node, head
+        return
+    if head not in node or node[head] is None:
+        if not create:
+            return
+        node[head] = {}
+    yield from _targets(node[head], rest, filters, create)
+
+
+def _get(container, key, default=None):
+    if isinstance(container, list):
+        return container[key] if key < len(container) else default
+    return container.get(key, default)
+
+
+def apply_update(doc: Dict, delta: Dict, array_filters: Optional[List[Dict]] = None) -> Dict:
+    """
+    Apply a logged delta to a document in place and return it
+
+    Args:
+        doc: Document state (as produced by snapshot_state)
+        delta: Delta from compact_update
+        array_filters: arrayFilters the original write used
+    """
+    filters = _filters_by_identifier(array_filters)
+    for path, value in (delta.get('$set') or {}).items():
+        for container, key in list(_targets(doc, path.split('.'), filters, create=True)):
+            container[key] = copy.deepcopy(value)
+    for path in delta.get('$unset') or []:
+        for container, key in list(_targets(doc, path.split('.'), filters, create=False)):
+            if isinstance(container, dict):
+                container.pop(key, None)
+            else:
+                container[key] = None  # MongoDB leaves null in unset array slots
+    for path, amount in (delta.get('$inc') or {}).items():
+        for container, key in list(_targets(doc, path.split('.'), filters, create=True)):
+            container[key] = (_get(container, key) or 0) + amount
+    for path, value in (delta.get('$push') or {}).items():
+        items = value['$each'] if isinstance(value, dict) and '$each' in value else [value]
+        for container, key in list(_targets(doc, path.split('.'), filters, create=True)):
+            current = _get(container, key)
+            container[key] = (current if isinstance(current, list) else []) + copy.deepcopy(items)
+    for path, condition in (delta.get('$pull') or {}).items():
+        for container, key in list(_targets(doc, path.split('.'), filters, create=False)):
+            current = _get(container, key)
+            if isinstance(current, list):
+                container[key] = [element for element in current if not _matches(element, condition)]
+    return doc
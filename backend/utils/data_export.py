@@ -0,0 +1,255 @@
+"""
+Streaming Data Export
+Streams a user's complete data (profile, settings, financial data, each
+report and custom graph, and the transaction history in batches) as NDJSON
+or a ZIP archive, section by section from MongoDB cursors.
+
+Only one record (or one transaction batch) is held in memory at a time and
+each chunk is yielded as soon as it is encoded, so the response goes out
+with chunked transfer encoding and no Content-Length. Very large accounts
+can instead be exported by a background job that writes the same stream to
+a file under Config.EXPORT_DIR (see models/export_job_model.py).
+"""
+
+import io
+import json
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from models.transaction_model import EXPORT_BATCH_SIZE
+
+EXPORT_VERSION = '2.0.0'
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'zip': ('application/zip', 'zip'),
+}
+
+# Profile fields included in exports (never password hashes or TOTP secrets)
+PROFILE_FIELDS = ('name', 'email', 'phone', 'date_of_birth', 'created_at')
+
+# Compressed bytes buffered before the ZIP stream yields a chunk
+ZIP_CHUNK_BYTES = 64 * 1024
+
+
+def _dumps(value, **kwargs) -> str:
+    # ObjectIds and datetimes stored in older documents are exported as strings
+    return json.dumps(value, ensure_ascii=False, default=str, **kwargs)
+
+
+def iter_export_records(user_model, finance_model, user_id: str,
+                        batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Tuple[str, object]]:
+    """
+    Yield (section, data) records for a user's export, in order:
+    meta, user_profile, settings, financial_data, one report / custom_graph
+    per record, transactions batches, and finally end (with the counts, so
+    readers can tell a complete export from a truncated one)
+    """
+    user = user_model.find_by_id(user_id)
+    if not user:
+        raise LookupError("User not found")
+
+    yield 'meta', {'export_date': datetime.now().isoformat(), 'version': EXPORT_VERSION}
+    yield 'user_profile', {field: user.get(field) for field in PROFILE_FIELDS}
+    yield 'settings', user.get('settings', {})
+
+    financial_data, embedded_transactions, _ = finance_model.get_export_document(user_id)
+    yield 'financial_data', financial_data
+
+    counts = {'reports': 0, 'custom_graphs': 0, 'transactions': 0}
+    for section, field in (('report', 'reports'), ('custom_graph', 'custom_graphs')):
+        for item in finance_model.iter_array(user_id, field):
+            counts[field] += 1
+            yield section, item
+
+    if embedded_transactions:
+        batches = _batched(finance_model.iter_array(user_id, 'transactions'), batch_size)
+    else:
+        batches = finance_model.transactions.iter_transaction_batches(user_id, batch_size)
+    for batch in batches:
+        counts['transactions'] += len(batch)
+        yield 'transactions', batch
+
+    yield 'end', counts
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ndjson_stream(records: Iterable[Tuple[str, object]]) -> Iterator[bytes]:
+    """One {"section": ..., "data": ...} JSON line per record"""
+    for section, data in records:
+        yield (_dumps({'section': section, 'data': data}) + '\n').encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self, minimum: int = 0) -> Optional[bytes]:
+        if not self.chunks or self.size < minimum:
+            return None
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def zip_stream(records: Iterable[Tuple[str, object]]) -> Iterator[bytes]:
+    """
+    ZIP archive written to an unseekable sink (entries use data descriptors):
+    manifest.json, user_profile.json, settings.json, financial_data.json,
+    reports/0001.json..., custom_graphs/0001.json... and transactions.ndjson
+    """
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED)
+    transactions = None
+    numbers = {'report': 0, 'custom_graph': 0}
+    try:
+        for section, data in records:
+            if section == 'transactions':
+                if transactions is None:
+                    # Size unknown up front, so allow ZIP64 for very long histories
+                    transactions = archive.open('transactions.ndjson', 'w', force_zip64=True)
+                for txn in data:
+                    transactions.write((_dumps(txn) + '\n').encode('utf-8'))
+            else:
+                if transactions is not None:
+                    transactions.close()
+                    transactions = None
+                if section == 'meta':
+                    name = 'manifest.json'
+                elif section == 'end':
+                    name = 'counts.json'
+                elif section in numbers:
+                    numbers[section] += 1
+                    name = f"{section}s/{numbers[section]:04d}.json"
+                else:
+                    name = f"{section}.json"
+                archive.writestr(name, _dumps(data, indent=2))
+            chunk = sink.drain(ZIP_CHUNK_BYTES)
+            if chunk:
+                yield chunk
+        if transactions is not None:
+            transactions.close()
+            transactions = None
+        archive.close()
+    finally:
+        if transactions is not None:
+            transactions.close()
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def export_stream(user_model, finance_model, user_id: str, export_format: str) -> Iterator[bytes]:
+    """Encoded export stream for a format in EXPORT_FORMATS"""
+    records = iter_export_records(user_model, finance_model, user_id)
+    if export_format == 'zip':
+        return zip_stream(records)
+    return ndjson_stream(records)
+
+
+def export_filename(export_format: str, day: Optional[str] = None) -> str:
+    day = day or datetime.now().strftime('%Y-%m-%d')
+    return f"fingenie-data-export-{day}.{EXPORT_FORMATS[export_format][1]}"
+
+
+# ---------------------------------------------------------------------------
+# Background export jobs
+# ---------------------------------------------------------------------------
+
+_executor_lock = threading.Lock()
+_executor_state = {"pid": None, "executor": None}
+
+
+def _executor(max_workers: int) -> ThreadPoolExecutor:
+    # One pool per process: a pool inherited across fork has no live threads
+    with _executor_lock:
+        if _executor_state["pid"] != os.getpid():
+            _executor_state["executor"] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='fingenie-export')
+            _executor_state["pid"] = os.getpid()
+        return _executor_state["executor"]
+
+
+def write_export_file(user_model, finance_model, user_id: str, export_format: str, path: str) -> Dict:
+    """
+    Write an export stream to path (via a .part file renamed when complete)
+
+    Returns:
+        {"size": bytes written}
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + '.part'
+    size = 0
+    try:
+        with open(partial, 'wb') as f:
+            for chunk in export_stream(user_model, finance_model, user_id, export_format):
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return {"size": size}
+
+
+def run_export_job(job_model, user_model, finance_model, job: Dict, export_dir: str):
+    """Produce a queued job's file and record the outcome on the job"""
+    job_id = job["id"]
+    path = os.path.join(export_dir, f"{job_id}.{EXPORT_FORMATS[job['format']][1]}")
+    job_model.mark_running(job_id)
+    try:
+        result = write_export_file(user_model, finance_model, job["user_id"], job["format"], path)
+        job_model.mark_done(job_id, path, result["size"])
+        print(f"📦 Export job {job_id} finished ({result['size']} bytes)")
+    except Exception as e:
+        job_model.mark_failed(job_id, str(e))
+        print(f"⚠️ Export job {job_id} failed: {e}")
+
+
+def submit_export_job(job_model, user_model, finance_model, job: Dict, export_dir: str, max_workers: int = 2):
+    """Queue a job created by ExportJobModel.create on this process's export pool"""
+    _executor(max_workers).submit(run_export_job, job_model, user_model, finance_model, job, export_dir)
+
+
+def remove_expired_files(export_dir: str, max_age_seconds: float) -> int:
+    """Delete export files older than max_age_seconds; returns how many were removed"""
+    if not os.path.isdir(export_dir):
+        return 0
+    cutoff = datetime.now().timestamp() - max_age_seconds
+    removed = 0
+    for entry in os.scandir(export_dir):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
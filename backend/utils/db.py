@@ -0,0 +1,245 @@
+"""
+MongoDB Connection Management
+Process-local MongoClient lifecycle, pool tuning and pool checkout statistics
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from pymongo import MongoClient, monitoring
+
+from config import Config
+
+
+class PoolCheckoutStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener that records how long threads wait to check out
+    a connection. Checkout start and completion fire on the same thread, so a
+    thread-local start timestamp is enough to pair them up.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.failed_checkouts = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.connections_created = 0
+            self.connections_closed = 0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, 'started', None)
+        if started is None:
+            return
+        wait_ms = (time.perf_counter() - started) * 1000
+        self._local.started = None
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            if wait_ms > self.max_wait_ms:
+                self.max_wait_ms = wait_ms
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        with self._lock:
+            self.failed_checkouts += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    # Remaining pool events are not needed for checkout statistics
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+    def snapshot(self) -> Dict:
+        """Return checkout wait statistics"""
+        with self._lock:
+            avg = self.total_wait_ms / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "failed_checkouts": self.failed_checkouts,
+                "avg_wait_ms": round(avg, 3),
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed
+            }
+
+
+class ProcessLocalDatabase:
+    """
+    Database handle that always resolves to the current process's client.
+
+    Models keep a reference to this object instead of a pymongo Database, so
+    an app created before a gunicorn fork (--preload) never reuses the
+    parent's sockets: the first access in each worker opens a fresh client.
+    Resolved collections are cached until the underlying client changes.
+    """
+
+    def __init__(self, manager: "MongoConnectionManager"):
+        self._manager = manager
+        self._attrs = {}
+        self._generation = None
+
+    def _resolve(self, name):
+        database = self._manager.database
+        if self._generation != self._manager.generation:
+            self._attrs = {}
+            self._generation = self._manager.generation
+        attr = self._attrs.get(name)
+        if attr is None:
+            attr = self._attrs[name] = getattr(database, name)
+        return attr
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self._resolve(name)
+
+    def __getitem__(self, name):
+        return self._resolve(name)
+
+
+class MongoConnectionManager:
+    """Creates one MongoClient per process (lazily, after fork) with tuned pool settings"""
+
+    def __init__(self, uri: str = None, db_name: str = 'fingenie', event_listeners=None, **client_options):
+        self.uri = uri or Config.MONGO_URI
+        self.db_name = db_name
+        self.event_listeners = list(event_listeners or [])
+        self.client_options = client_options
+        self.pool_stats = PoolCheckoutStats()
+        self.fallback_used = False
+        self._client: Optional[MongoClient] = None
+        self._database = None
+        self._pid: Optional[int] = None
+        self.generation = 0
+        self._lock = threading.Lock()
+        self.db = ProcessLocalDatabase(self)
+
+        # Drop the inherited client in forked children; it is rebuilt on first use
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._client = None
+        self._database = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pool_stats = PoolCheckoutStats()
+
+    def pool_options(self) -> Dict:
+        """Pool sizing options taken from Config"""
+        return {
+            "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": Config.MONGO_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": Config.MONGO_WAIT_QUEUE_TIMEOUT_MS
+        }
+
+    def _create_client(self) -> MongoClient:
+        import certifi
+
+        options = {
+            **self.pool_options(),
+            "serverSelectionTimeoutMS": 5000,
+            "connectTimeoutMS": 10000,
+            "socketTimeoutMS": 10000,
+            "retryWrites": True,
+            "event_listeners": [self.pool_stats, *self.event_listeners],
+            **self.client_options
+        }
+        client = None
+        try:
+            # Configure MongoDB connection with SSL/TLS options
+            client = MongoClient(
+                self.uri,
+                tls=True,
+                tlsCAFile=certifi.where(),
+                tlsAllowInvalidCertificates=False,
+                **options
+            )
+            client.admin.command('ping')
+            print(f"✓ Connected to MongoDB successfully (pid {os.getpid()})")
+        except Exception as e:
+            print(f"✗ MongoDB connection error: {e}")
+            print("\nTrying alternative connection method...")
+            if client is not None:
+                client.close()
+            # Fallback: try without explicit SSL options
+            client = MongoClient(self.uri, **options)
+            client.admin.command('ping')
+            self.fallback_used = True
+            print(f"✓ Connected to MongoDB successfully (fallback method, pid {os.getpid()})")
+        return client
+
+    @property
+    def client(self) -> MongoClient:
+        """Return this process's MongoClient, creating it on first use"""
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    self._client = self._create_client()
+                    self._database = self._client[self.db_name]
+                    self._pid = pid
+                    self.generation += 1
+        return self._client
+
+    @property
+    def database(self):
+        """Return this process's Database, creating the client on first use"""
+        if self._pid != os.getpid():
+            self.client
+        return self._database
+
+    def ping(self):
+        """Ping the server, raising on failure"""
+        self.client.admin.command('ping')
+
+    def health(self) -> Dict:
+        """Pool configuration and checkout wait statistics for /health"""
+        return {
+            "pid": os.getpid(),
+            "connected": self._client is not None and self._pid == os.getpid(),
+            "pool_options": self.pool_options(),
+            "checkout": self.pool_stats.snapshot()
+        }
+
+    def close(self):
+        """Close this process's client (if any)"""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._database = None
+            self._pid = None
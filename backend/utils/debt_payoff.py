@@ -0,0 +1,346 @@
+"""
+Debt Payoff Optimizer
+Simulates paying down all of a user's loans together under the avalanche
+(highest rate first), snowball (smallest balance first) and a user-ranked
+strategy, with an extra monthly budget on top of the EMIs.
+
+Each strategy pays every loan's EMI, and the extra budget plus the EMIs of
+loans already cleared go to the loans in priority order (any overflow in a
+payoff month moves on to the next loan). All strategies and loans advance
+together one month per step as a (strategies x loans) array. payoff_sweep
+adds a row per (extra budget, strategy), so the loan page can fetch a whole
+range of extra budgets in one pass instead of re-running per slider step.
+"""
+
+import time
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.numeric import number
+
+STRATEGIES = ('avalanche', 'snowball', 'custom')
+
+# Loans still open after this many months are reported as not paid off
+MAX_MONTHS = 600
+
+# Extra budgets accepted by one payoff_sweep call
+MAX_SWEEP_BUDGETS = 200
+
+# Balances below this (in rupees) count as repaid
+PAID_OFF_BALANCE = 0.005
+
+# Loan statuses that are left out of the simulation
+CLOSED_STATUSES = ('closed', 'paid', 'paid_off', 'completed')
+
+
+def _month_label(start: date, offset: int) -> str:
+    """YYYY-MM of the offset-th payment (offset 1 is the start month)"""
+    index = start.year * 12 + start.month - 1 + offset - 1
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _first_payment_month(today: Optional[date] = None) -> date:
+    today = today or date.today()
+    return date(today.year + today.month // 12, today.month % 12 + 1, 1)
+
+
+def normalize_loans(loans: Sequence[Dict]) -> List[Dict]:
+    """
+    Open loans as {id, name, balance, annual_rate, emi}
+
+    The balance is outstanding (or remaining_principal, else principal). A
+    loan without an EMI gets the standard EMI over its tenure_months (or
+    tenure_years); loans with neither, or with nothing outstanding, are
+    left out.
+    """
+    normalized = []
+    for index, loan in enumerate(loans or []):
+        if not isinstance(loan, dict) or str(loan.get('status', '')).lower() in CLOSED_STATUSES:
+            continue
+        balance = number(loan.get('outstanding')) or number(loan.get('remaining_principal')) or \
+            number(loan.get('principal'))
+        annual_rate = max(0.0, number(loan.get('interest_rate', loan.get('annual_rate'))))
+        emi = number(loan.get('emi'))
+        if emi <= 0:
+            tenure = number(loan.get('tenure_months')) or number(loan.get('tenure_years')) * 12
+            if tenure > 0 and balance > 0:
+                rate = annual_rate / 12 / 100
+                emi = balance / tenure if rate == 0 else balance * rate / (1 - (1 + rate) ** -tenure)
+        if balance <= 0 or emi <= 0:
+            continue
+        normalized.append({
+            'id': loan.get('id', index + 1),
+            'name': loan.get('name') or loan.get('type') or f"Loan {index + 1}",
+            'balance': balance,
+            'annual_rate': annual_rate,
+            'emi': emi
+        })
+    return normalized
+
+
+def strategy_order(loans: List[Dict], strategy: str, ranking: Optional[Sequence] = None) -> List[int]:
+    """
+    Loan indices in payoff priority order
+
+    avalanche: highest rate first (smaller balance breaks ties); snowball:
+    smallest balance first (higher rate breaks ties); custom: loans in
+    ranking (a list of loan ids) first, then the rest in avalanche order.
+    """
+    indices = range(len(loans))
+    avalanche = sorted(indices, key=lambda i: (-loans[i]['annual_rate'], loans[i]['balance']))
+    if strategy == 'snowball':
+        return sorted(indices, key=lambda i: (loans[i]['balance'], -loans[i]['annual_rate']))
+    if strategy == 'custom':
+        ids = [str(loan['id']) for loan in loans]
+        ranked = []
+        for loan_id in ranking or []:
+            if str(loan_id) in ids and ids.index(str(loan_id)) not in ranked:
+                ranked.append(ids.index(str(loan_id)))
+        return ranked + [i for i in avalanche if i not in ranked]
+    return avalanche
+
+
+def simulate_payoff(balances: np.ndarray, annual_rates: np.ndarray, emis: np.ndarray,
+                    orders: np.ndarray, budgets: np.ndarray, keep_rows: bool = True,
+                    max_months: int = MAX_MONTHS) -> Dict:
+    """
+    Month-by-month payoff of L loans under S strategies at once
+
+    Args:
+        balances, annual_rates, emis: (L,) loan balances, rates (%) and EMIs
+        orders: (S, L) loan indices in priority order per strategy
+        budgets: (S,) total paid each month; what is left after the EMIs
+            due goes to loans in priority order (0 pays EMIs only; sum of
+            EMIs + extra rolls cleared EMIs over)
+        keep_rows: Also return every month's interest, payment and balance
+
+    Returns:
+        {"months": simulated months, "payoff_month": (S, L) month each loan
+        was cleared (0 if never), "total_interest", "total_paid": (S, L)} plus
+        "interest", "payment", "balance" as (months, S, L) arrays with keep_rows
+    """
+    strategies, count = orders.shape
+    # Columns are kept in each strategy's priority order and restored at the end
+    monthly_rates = annual_rates[orders] / 12 / 100
+    emis = emis[orders]
+    balance = balances[orders].astype(float)
+    budgets = budgets[:, None]
+    payoff_month = np.zeros((strategies, count), dtype=np.int64)
+    total_interest = np.zeros((strategies, count))
+    total_paid = np.zeros((strategies, count))
+    if keep_rows:
+        interest_rows = np.zeros((max_months, strategies, count))
+        payment_rows = np.zeros((max_months, strategies, count))
+        balance_rows = np.zeros((max_months, strategies, count))
+
+    # Small (S, L) arrays: ufunc calls (np.add.accumulate rather than np.cumsum,
+    # minimum/maximum rather than np.clip) keep the per-month overhead down
+    months = max_months
+    for month in range(1, max_months + 1):
+        interest = balance * monthly_rates
+        due = balance + interest
+        minimum = np.minimum(emis, due)
+        # Whatever the budget leaves after the EMIs goes down the priority order
+        remaining = due - minimum
+        pool = budgets - np.add.reduce(minimum, axis=1, keepdims=True)
+        before = np.add.accumulate(remaining, axis=1) - remaining
+        payment = minimum + np.minimum(np.maximum(pool - before, 0.0), remaining)
+
+        open_before = balance > PAID_OFF_BALANCE
+        balance = due - payment
+        balance[balance < PAID_OFF_BALANCE] = 0.0
+        payoff_month[open_before & (balance == 0)] = month
+        total_interest += interest
+        total_paid += payment
+        if keep_rows:
+            interest_rows[month - 1] = interest
+            payment_rows[month - 1] = payment
+            balance_rows[month - 1] = balance
+        if not balance.any():
+            months = month
+            break
+
+    rows = np.arange(strategies)[:, None]
+    restore = np.argsort(orders, axis=1)
+    result = {
+        'months': months,
+        'payoff_month': payoff_month[rows, restore],
+        'total_interest': total_interest[rows, restore],
+        'total_paid': total_paid[rows, restore]
+    }
+    if keep_rows:
+        result['interest'] = interest_rows[:months][:, rows, restore]
+        result['payment'] = payment_rows[:months][:, rows, restore]
+        result['balance'] = balance_rows[:months][:, rows, restore]
+    return result
+
+
+def _strategy_summary(loans: List[Dict], order: List[int], simulation: Dict, index: int,
+                      start: date, include_schedule: bool) -> Dict:
+    """Totals, per-loan payoff and (optionally) the combined schedule of one simulated strategy"""
+    payoff_month = simulation['payoff_month'][index]
+    loan_interest = simulation['total_interest'][index]
+    paid_off = bool(payoff_month.all())
+    # Months until every loan is cleared (the simulation may have run on for other strategies)
+    months = int(payoff_month.max()) if paid_off else simulation['months']
+
+    summary = {
+        'order': [loans[i]['id'] for i in order],
+        'paid_off': paid_off,
+        'months': months,
+        'debt_free_date': _month_label(start, months) if paid_off else None,
+        'total_interest': round(float(loan_interest.sum()), 2),
+        'total_paid': round(float(simulation['total_paid'][index].sum()), 2),
+        'loans': [
+            {
+                'id': loan['id'],
+                'name': loan['name'],
+                'payoff_month': int(payoff_month[i]) or None,
+                'payoff_date': _month_label(start, int(payoff_month[i])) if payoff_month[i] else None,
+                'interest': round(float(loan_interest[i]), 2)
+            }
+            for i, loan in enumerate(loans)
+        ]
+    }
+    if include_schedule:
+        totals = np.round(np.stack([
+            simulation[key][:months, index].sum(axis=1) for key in ('payment', 'interest', 'balance')
+        ], axis=1), 2).tolist()
+        summary['schedule'] = [
+            {
+                'month': month,
+                'date': _month_label(start, month),
+                'payment': paid,
+                'interest': charged,
+                'principal': round(paid - charged, 2),
+                'balance': remaining
+            }
+            for month, (paid, charged, remaining) in enumerate(totals, start=1)
+        ]
+    return summary
+
+
+def _loan_arrays(loans: List[Dict]):
+    return (np.array([loan['balance'] for loan in loans]),
+            np.array([loan['annual_rate'] for loan in loans]),
+            np.array([loan['emi'] for loan in loans]))
+
+
+def payoff_plan(loans: Sequence[Dict], extra_payment: float = 0.0, ranking: Optional[Sequence] = None,
+                include_schedule: bool = True, today: Optional[date] = None) -> Dict:
+    """
+    Compare payoff strategies for a set of loans
+
+    Args:
+        loans: financial_data.loans entries (see normalize_loans)
+        extra_payment: Monthly amount paid on top of the EMIs
+        ranking: Loan ids in the order the custom strategy pays them off
+        include_schedule: Add each strategy's combined monthly schedule
+
+    Returns:
+        {"loans", "extra_payment", "start_date", "baseline" (EMIs only),
+        "strategies": {avalanche, snowball, custom}, "recommended", "elapsed_ms"};
+        every strategy reports interest_saved / months_saved against the baseline
+    """
+    started = time.perf_counter()
+    extra_payment = max(0.0, number(extra_payment))
+    start = _first_payment_month(today)
+    normalized = normalize_loans(loans)
+    result = {
+        'loans': [{**loan, 'balance': round(loan['balance'], 2), 'emi': round(loan['emi'], 2)}
+                  for loan in normalized],
+        'extra_payment': round(extra_payment, 2),
+        'start_date': _month_label(start, 1),
+        'baseline': None,
+        'strategies': {},
+        'recommended': None
+    }
+    if not normalized:
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    balances, annual_rates, emis = _loan_arrays(normalized)
+
+    # The baseline pays each EMI only; strategies pay EMIs + extra, rolling cleared EMIs over
+    orders = [strategy_order(normalized, 'avalanche')] + \
+        [strategy_order(normalized, strategy, ranking) for strategy in STRATEGIES]
+    budgets = np.array([0.0] + [float(emis.sum()) + extra_payment] * len(STRATEGIES))
+    simulation = simulate_payoff(balances, annual_rates, emis, np.array(orders), budgets,
+                                 keep_rows=include_schedule)
+
+    summaries = [
+        _strategy_summary(normalized, order, simulation, index, start, include_schedule)
+        for index, order in enumerate(orders)
+    ]
+    baseline = summaries[0]
+    baseline.pop('order')
+    result['baseline'] = baseline
+    for strategy, summary in zip(STRATEGIES, summaries[1:]):
+        summary['interest_saved'] = round(baseline['total_interest'] - summary['total_interest'], 2)
+        summary['months_saved'] = baseline['months'] - summary['months'] if baseline['paid_off'] else None
+        result['strategies'][strategy] = summary
+    if not ranking:
+        # Without a ranking the custom strategy is just avalanche
+        result['strategies'].pop('custom')
+    result['recommended'] = min(
+        result['strategies'], key=lambda name: (not result['strategies'][name]['paid_off'],
+                                                result['strategies'][name]['total_interest'])
+    )
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def payoff_sweep(loans: Sequence[Dict], extra_payments: Sequence[float], ranking: Optional[Sequence] = None,
+                 today: Optional[date] = None) -> Dict:
+    """
+    Months and total interest of every strategy for several extra budgets
+
+    All (extra budget, strategy) pairs are simulated as rows of one array,
+    so a whole slider range costs about as much as a single payoff_plan.
+
+    Returns:
+        {"start_date", "baseline": {months, total_interest, ...},
+        "sweep": [{"extra_payment", "avalanche": {...}, "snowball": {...}, ...}]}
+    """
+    started = time.perf_counter()
+    start = _first_payment_month(today)
+    normalized = normalize_loans(loans)
+    extras = [max(0.0, number(extra)) for extra in extra_payments]
+    strategies = STRATEGIES if ranking else STRATEGIES[:2]
+    result = {'start_date': _month_label(start, 1), 'baseline': None, 'sweep': []}
+    if not normalized or not extras:
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    balances, annual_rates, emis = _loan_arrays(normalized)
+    strategy_orders = [strategy_order(normalized, strategy, ranking) for strategy in strategies]
+    # Row 0 is the EMI-only baseline; then one row per (extra budget, strategy)
+    orders = [strategy_orders[0]] + strategy_orders * len(extras)
+    budgets = [0.0] + [float(emis.sum()) + extra for extra in extras for _ in strategies]
+    simulation = simulate_payoff(balances, annual_rates, emis, np.array(orders), np.array(budgets),
+                                 keep_rows=False)
+
+    paid_off = simulation['payoff_month'].all(axis=1)
+    months = np.where(paid_off, simulation['payoff_month'].max(axis=1), simulation['months'])
+    interest = simulation['total_interest'].sum(axis=1)
+
+    def outcome(row):
+        return {
+            'paid_off': bool(paid_off[row]),
+            'months': int(months[row]),
+            'debt_free_date': _month_label(start, int(months[row])) if paid_off[row] else None,
+            'total_interest': round(float(interest[row]), 2),
+            'interest_saved': round(float(interest[0] - interest[row]), 2)
+        }
+
+    result['baseline'] = outcome(0)
+    result['baseline'].pop('interest_saved')
+    for position, extra in enumerate(extras):
+        entry = {'extra_payment': round(extra, 2)}
+        for offset, strategy in enumerate(strategies):
+            entry[strategy] = outcome(1 + position * len(strategies) + offset)
+        result['sweep'].append(entry)
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
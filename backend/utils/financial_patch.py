@@ -0,0 +1,251 @@
+"""
+Financial Data Patches
+Translates JSON Merge Patch (RFC 7396) documents and path operation lists into
+targeted MongoDB update operators ($set, $unset, $inc, $push, $pull), so a
+single field edit no longer rewrites a whole subdocument.
+
+Paths are dot-separated. A segment of the form name[key=value] selects the
+array elements of `name` whose `key` equals `value` (compiled to a filtered
+positional operator with arrayFilters), e.g. budget.categories[id=3].spent
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from utils.financial_view import REQUIRED_GOALS
+
+# Top-level fields a patch may touch (transactions, custom_graphs and reports have their own endpoints)
+PATCHABLE_FIELDS = (
+    'assets', 'liabilities', 'goals', 'budget', 'investments',
+    'loans', 'analytics', 'insights', 'financial_health_metrics'
+)
+
+PATCH_OPS = ('set', 'unset', 'inc', 'push', 'pull')
+
+MAX_PATCH_OPS = 200
+
+_FILTER_SEGMENT = re.compile(r'^([A-Za-z0-9_]+)\[([A-Za-z0-9_]+)=([^\]]*)\]$')
+_PLAIN_SEGMENT = re.compile(r'^[A-Za-z0-9_]+$')
+
+
+class PatchError(ValueError):
+    """Raised for malformed or disallowed patches"""
+
+
+def _parse_filter_value(raw: str):
+    """Interpret the value of a [key=value] filter as int, float, bool or string"""
+    if raw in ('true', 'false'):
+        return raw == 'true'
+    for cast in (int, float):
+        try:
+            return cast(raw)
+        except ValueError:
+            pass
+    if len(raw) >= 2 and raw[0] == raw[-1] and raw[0] in ('"', "'"):
+        return raw[1:-1]
+    return raw
+
+
+def parse_path(path: str) -> Tuple:
+    """
+    Split a patch path into segments. Plain segments are strings; filter
+    segments are (field, key, value) tuples.
+    """
+    if not isinstance(path, str) or not path:
+        raise PatchError("Patch path must be a non-empty string")
+    segments = []
+    for part in path.split('.'):
+        if _PLAIN_SEGMENT.match(part):
+            segments.append(part)
+            continue
+        match = _FILTER_SEGMENT.match(part)
+        if not match:
+            raise PatchError(f"Invalid path segment '{part}' in '{path}'")
+        field, key, raw_value = match.groups()
+        segments.append((field, key, _parse_filter_value(raw_value)))
+    root = segments[0] if isinstance(segments[0], str) else segments[0][0]
+    if root not in PATCHABLE_FIELDS:
+        raise PatchError(f"Field '{root}' cannot be patched")
+    return tuple(segments)
+
+
+def path_key(segments: Tuple) -> str:
+    """Canonical string form of a parsed path (used for conflict checks)"""
+    parts = []
+    for segment in segments:
+        if isinstance(segment, str):
+            parts.append(segment)
+        else:
+            field, key, value = segment
+            parts.append(f"{field}.$[{key}={value!r}]")
+    return '.'.join(parts)
+
+
+def paths_overlap(a: str, b: str) -> bool:
+    """True if two canonical paths are equal or one contains the other"""
+    return a == b or a.startswith(b + '.') or b.startswith(a + '.')
+
+
+def _check_goals(segments: Tuple, op: str, value):
+    """
+    Goal-list writes must leave a complete set of exactly REQUIRED_GOALS (or no
+    goals): any other count is hidden behind mock goals by the effective view
+    """
+    if segments != ('goals',):
+        return
+    if op in ('push', 'pull'):
+        raise PatchError(f"{op} on 'goals' would change the goal count; set the complete list instead")
+    if op != 'set':
+        return
+    if not isinstance(value, list):
+        raise PatchError("Goals must be a list")
+    if value and len(value) != REQUIRED_GOALS:
+        raise PatchError(f"Goals must be a complete set of {REQUIRED_GOALS} (got {len(value)})")
+
+
+def merge_patch_to_ops(patch: Dict) -> List[Dict]:
+    """
+    Convert a JSON Merge Patch into path operations
+
+    Objects recurse into nested $set paths, null removes the member and any
+    other value (including arrays) replaces it. An empty object is a no-op.
+    """
+    if not isinstance(patch, dict):
+        raise PatchError("Merge patch must be a JSON object")
+
+    ops = []
+
+    def walk(prefix: str, node: Dict):
+        for key, value in node.items():
+            if not isinstance(key, str) or not _PLAIN_SEGMENT.match(key):
+                raise PatchError(f"Invalid field name '{key}'")
+            path = f"{prefix}.{key}" if prefix else key
+            if value is None:
+                ops.append({"op": "unset", "path": path})
+            elif isinstance(value, dict) and value:
+                walk(path, value)
+            elif not isinstance(value, dict):
+                ops.append({"op": "set", "path": path, "value": value})
+
+    walk('', patch)
+    return ops
+
+
+def normalize_ops(ops: List[Dict]) -> List[Tuple]:
+    """
+    Validate path operations and return them as (op, segments, value) tuples
+
+    Args:
+        ops: List of {"op": set|unset|inc|push|pull, "path": str, "value": any}
+
+    Returns:
+        Normalized operations in request order
+    """
+    if not isinstance(ops, list):
+        raise PatchError("Operations must be a list")
+    if not ops:
+        raise PatchError("Patch contains no operations")
+    if len(ops) > MAX_PATCH_OPS:
+        raise PatchError(f"Too many operations (max {MAX_PATCH_OPS})")
+
+    normalized = []
+    for entry in ops:
+        if not isinstance(entry, dict):
+            raise PatchError("Each operation must be an object")
+        op = entry.get('op')
+        if op not in PATCH_OPS:
+            raise PatchError(f"Unsupported operation '{op}' (expected one of {', '.join(PATCH_OPS)})")
+        segments = parse_path(entry.get('path'))
+        value = entry.get('value')
+        if op != 'unset' and 'value' not in entry:
+            raise PatchError(f"Operation '{op}' on '{entry.get('path')}' requires a value")
+        if op == 'inc' and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise PatchError(f"inc on '{entry.get('path')}' requires a numeric value")
+        if op in ('push', 'pull') and not isinstance(segments[-1], str):
+            raise PatchError(f"{op} path must end at an array field, not an element filter")
+        _check_goals(segments, op, value)
+        normalized.append((op, segments, value))
+    return normalized
+
+
+def compile_update(ops: List[Tuple]) -> Tuple[Dict, List[Dict], List[str]]:
+    """
+    Compile normalized operations into a MongoDB update
+
+    Pushes to the same array are combined with $each. Any other repeated or
+    overlapping path (e.g. budget and budget.categories) is rejected, as
+    MongoDB refuses conflicting paths within one update.
+
+    Returns:
+        (update, array_filters, nested_roots) - nested_roots lists the
+        top-level fields that are edited below their root, which callers may
+        need to materialize first (see FinanceModel.apply_patch)
+    """
+    update: Dict[str, Dict] = {}
+    filter_ids: Dict[Tuple, str] = {}
+    array_filters: List[Dict] = []
+    seen: Dict[str, str] = {}
+    nested_roots: List[str] = []
+
+    for op, segments, value in ops:
+        parts = []
+        for segment in segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                continue
+            field, key, filter_value = segment
+            filter_key = (key, type(filter_value).__name__, filter_value)
+            identifier = filter_ids.get(filter_key)
+            if identifier is None:
+                identifier = filter_ids[filter_key] = f"f{len(filter_ids)}"
+                array_filters.append({f"{identifier}.{key}": filter_value})
+            parts.append(f"{field}.$[{identifier}]")
+        mongo_path = '.'.join(parts)
+        key = path_key(segments)
+
+        if op == 'push' and seen.get(key) == 'push':
+            update['$push'][mongo_path]['$each'].append(value)
+            continue
+        for other in seen:
+            if paths_overlap(other, key):
+                raise PatchError(f"Conflicting operations on '{other}' and '{key}'")
+        seen[key] = op
+
+        root = parts[0].split('.')[0]
+        if (len(segments) > 1 or not isinstance(segments[0], str)) and root not in nested_roots:
+            nested_roots.append(root)
+
+        if op == 'set':
+            update.setdefault('$set', {})[mongo_path] = value
+        elif op == 'unset':
+            update.setdefault('$unset', {})[mongo_path] = ""
+        elif op == 'inc':
+            update.setdefault('$inc', {})[mongo_path] = value
+        elif op == 'push':
+            update.setdefault('$push', {})[mongo_path] = {"$each": [value]}
+        elif op == 'pull':
+            update.setdefault('$pull', {})[mongo_path] = value
+
+    return update, array_filters, nested_roots
+
+
+def parse_patch(merge_patch: Optional[Dict] = None, ops: Optional[List[Dict]] = None) -> List[Tuple]:
+    """Validate a merge patch and/or path operations into normalized operations"""
+    raw_ops = []
+    if merge_patch is not None:
+        raw_ops.extend(merge_patch_to_ops(merge_patch))
+    if ops is not None:
+        if not isinstance(ops, list):
+            raise PatchError("Operations must be a list")
+        raw_ops.extend(ops)
+    return normalize_ops(raw_ops)
+
+
+def build_update(merge_patch: Optional[Dict] = None, ops: Optional[List[Dict]] = None):
+    """
+    Build a MongoDB update from a merge patch and/or a list of path operations
+
+    Returns:
+        (update, array_filters, nested_roots) as returned by compile_update
+    """
+    return compile_update(parse_patch(merge_patch, ops))
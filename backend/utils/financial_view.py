@@ -0,0 +1,232 @@
+"""
+Effective Financial View
+Builds the merged (stored data + mock_data.json defaults) view served by
+/api/finance/get_data, and caches it per user until the stored document changes.
+Budget spent figures and the monthly trend series are derived from the
+user's transactions (see models/budget_rollup_model.py and models/trend_model.py).
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from models.budget_rollup_model import apply_budget_totals, current_month
+from models.trend_model import MIN_TREND_MONTHS, build_trend_series
+from utils.cache import TTLCache
+from utils.metrics import register_cache
+
+MOCK_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mock_data.json')
+
+# A complete goal set; smaller (partial) sets are ignored and mock goals are served
+REQUIRED_GOALS = 5
+
+# Fields merged as "stored value, else mock value"
+FIELDS_TO_MERGE = ['budget', 'transactions', 'investments', 'loans', 'analytics', 'insights']
+LIST_FIELDS = ('transactions', 'loans', 'insights')
+
+_mock_lock = threading.Lock()
+_mock_state = {"mtime": None, "data": None}
+
+# user_id -> (version key, source, view)
+_view_cache = TTLCache(ttl_seconds=300, max_size=5000)
+register_cache('financial_view', _view_cache)
+
+
+def get_mock_financial_data() -> Dict:
+    """
+    Return financial_data from mock_data.json, re-reading the file only when it
+    changes. The returned dict is shared - callers must not mutate it.
+    """
+    try:
+        mtime = os.path.getmtime(MOCK_DATA_PATH)
+    except OSError as e:
+        print(f"Error loading mock data: {e}")
+        return {}
+    if _mock_state["mtime"] != mtime:
+        with _mock_lock:
+            if _mock_state["mtime"] != mtime:
+                try:
+                    with open(MOCK_DATA_PATH, 'r', encoding='utf-8') as f:
+                        _mock_state["data"] = json.load(f).get('financial_data', {}) or {}
+                except Exception as e:
+                    print(f"Error loading mock data: {e}")
+                    _mock_state["data"] = {}
+                _mock_state["mtime"] = mtime
+                _view_cache.clear()
+    return _mock_state["data"]
+
+
+def has_partial_goals(data: Optional[Dict]) -> bool:
+    """True if the stored document holds an incomplete (1-4) goal list"""
+    goals = data.get('goals') if data else None
+    return isinstance(goals, list) and 0 < len(goals) < REQUIRED_GOALS
+
+
+def build_effective_view(data: Optional[Dict], mock_data: Dict) -> Tuple[str, Dict]:
+    """
+    Merge a stored financial_data document with mock defaults (pure, no writes)
+
+    Args:
+        data: Stored document (as returned by FinanceModel.get_data) or None
+        mock_data: financial_data section of mock_data.json
+
+    Returns:
+        (source, view) where source is 'user' (merged view), 'mock' (no usable
+        stored data, mock served) or 'empty' (nothing stored and no mock data)
+    """
+    # If user has NO data in database, return mock data only
+    # Also check if data exists but only has empty/invalid goals - treat as no data
+    has_valid_data = data and (
+        data.get('assets') or
+        data.get('liabilities') or
+        (isinstance(data.get('goals'), list) and len(data['goals']) == REQUIRED_GOALS)
+    )
+
+    # Clients echo data_version back to /patch for optimistic concurrency
+    data_version = data.get('data_version', 0) if data else 0
+
+    if not has_valid_data:
+        if mock_data:
+            return 'mock', {**mock_data, 'is_mock': True, 'data_version': data_version}
+        return 'empty', {}
+
+    # Partial goal sets are never shown (a migration removes them from storage)
+    user_goals = data.get('goals') if not has_partial_goals(data) else None
+
+    merged_data = {}
+
+    # Merge assets and liabilities (user data overrides mock)
+    for field in ('assets', 'liabilities'):
+        if data.get(field):
+            merged_data[field] = {**mock_data.get(field, {}), **data[field]}
+        else:
+            merged_data[field] = mock_data.get(field, {})
+
+    # Goals - ALWAYS use mock_data goals unless user has the complete set
+    mock_goals = mock_data.get('goals', [])
+    user_goals_count = len(user_goals) if isinstance(user_goals, list) else 0
+    if user_goals_count == len(mock_goals) and user_goals_count == REQUIRED_GOALS:
+        merged_data['goals'] = user_goals
+    else:
+        merged_data['goals'] = mock_goals
+        merged_data['is_mock'] = True  # Flag that goals are from mock
+
+    # Merge other fields (budget, transactions, investments, loans, analytics, insights)
+    for field in FIELDS_TO_MERGE:
+        merged_data[field] = data.get(field) or mock_data.get(field, [] if field in LIST_FIELDS else {})
+
+    # Handle financial_health_metrics - check if it exists directly, or derive from analytics
+    if data.get('financial_health_metrics'):
+        merged_data['financial_health_metrics'] = data['financial_health_metrics']
+    elif mock_data.get('financial_health_metrics'):
+        merged_data['financial_health_metrics'] = mock_data['financial_health_metrics']
+    elif merged_data.get('analytics'):
+        # Map analytics to financial_health_metrics format for compatibility
+        analytics = merged_data['analytics']
+        merged_data['financial_health_metrics'] = {
+            'monthly_trends': analytics.get('monthly_trends', []),
+            'expense_categories': analytics.get('expense_categories', [])
+        }
+
+    # Preserve user_id and _id from database
+    if data.get('_id'):
+        merged_data['_id'] = data['_id']
+    if data.get('user_id'):
+        merged_data['user_id'] = data['user_id']
+    merged_data['data_version'] = data_version
+
+    return 'user', merged_data
+
+
+def with_budget_rollup(finance_model, user_id: str, data: Optional[Dict], month: Optional[str] = None) -> Optional[Dict]:
+    """
+    Return data with budget.categories[].spent read from the month's transaction
+    rollup (one indexed find_one). Only categories with transactions that month
+    are overlaid, so manually entered spent values remain visible (and
+    editable) for the others.
+    """
+    if not data or not isinstance(data.get('budget'), dict):
+        return data
+    month = month or current_month()
+    totals, error = finance_model.transactions.rollups.month_totals(user_id, month)
+    if error or totals is None:
+        return data
+    return {**data, 'budget': apply_budget_totals(data['budget'], totals, month)}
+
+
+def with_trends(finance_model, user_id: str, data: Optional[Dict]) -> Optional[Dict]:
+    """
+    Return data with analytics/financial_health_metrics monthly_trends and
+    expense_categories built from the materialized month buckets (kept current
+    by transaction writes, so this only reads). Data is returned unchanged when
+    the user has fewer than MIN_TREND_MONTHS months of transactions.
+    """
+    if not data:
+        return data
+    buckets, error = finance_model.transactions.trends.get_buckets(user_id)
+    if error:
+        return data
+    trends, categories = build_trend_series(buckets, data.get('assets'), data.get('liabilities'))
+    if len(trends) < MIN_TREND_MONTHS:
+        return data
+    live = {'monthly_trends': trends, 'expense_categories': categories, 'trend_source': 'transactions'}
+    return {
+        **data,
+        'analytics': {**(data.get('analytics') or {}), **live},
+        'financial_health_metrics': {**(data.get('financial_health_metrics') or {}), **live}
+    }
+
+
+def with_transaction_aggregates(finance_model, user_id: str, data: Optional[Dict],
+                                month: Optional[str] = None) -> Optional[Dict]:
+    """Apply both with_budget_rollup and with_trends (chat context, insights)"""
+    return with_trends(finance_model, user_id, with_budget_rollup(finance_model, user_id, data, month))
+
+
+def _version_key(version: Optional[Dict], month: str):
+    if not version:
+        return None
+    key = (version.get('data_version'), version.get('last_updated'))
+    # The month is part of the key so budget spent rolls over on the 1st
+    return key + (month,) if key != (None, None) else None
+
+
+def get_effective_view(finance_model, user_id: str) -> Tuple[Optional[str], Optional[Dict], Optional[str]]:
+    """
+    Return (source, view, error) for a user, reusing the cached view when the
+    stored document's data_version/last_updated are unchanged.
+
+    A cache hit costs one small projected find_one; a miss fetches the full
+    document and rebuilds the view. The returned view is shared and must not
+    be mutated.
+    """
+    mock_data = get_mock_financial_data()
+    month = current_month()
+
+    cached = _view_cache.get(user_id)
+    if cached is not None:
+        version, error = finance_model.get_data_version(user_id)
+        if error:
+            return None, None, error
+        if _version_key(version, month) == cached[0]:
+            return cached[1], cached[2], None
+
+    data, error = finance_model.get_data(user_id)
+    if error:
+        return None, None, error
+
+    source, view = build_effective_view(data, mock_data)
+    if source == 'user':
+        view = with_transaction_aggregates(finance_model, user_id, view, month)
+    else:
+        view = with_budget_rollup(finance_model, user_id, view, month)
+    key = _version_key(data, month)
+    if key is not None:
+        _view_cache.set(user_id, (key, source, view))
+    return source, view, None
+
+
+def invalidate_view(user_id: str):
+    """Drop a user's cached view (call after writes that bypass data_version)"""
+    _view_cache.pop(user_id)
@@ -1,10 +1,64 @@
 import os
+import threading
+import time
 import warnings
 from config import Config
+from utils.metrics import llm_call_duration, llm_tokens
+from utils.tracing import tracer, traced
+
+# SDK modules are imported on first use so worker boot doesn't pay for them
+_sdk_lock = threading.Lock()
+_genai = None
+_genai_api_key = None
+_vertex_generative_model = None
+_vertex_init_args = None
+
+
+def _load_genai(api_key):
+    """Import google-generativeai and configure it for api_key (once per key)"""
+    global _genai, _genai_api_key
+    with _sdk_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            _genai = genai
+        if _genai_api_key != api_key:
+            _genai.configure(api_key=api_key)
+            _genai_api_key = api_key
+    return _genai
+
+
+def _load_vertex_model_class(project_id, location):
+    """Import and initialise Vertex AI (once per project/location), returning GenerativeModel"""
+    global _vertex_generative_model, _vertex_init_args
+    with _sdk_lock:
+        if _vertex_generative_model is None:
+            # Suppress warnings from google-cloud-aiplatform
+            warnings.filterwarnings('ignore', category=UserWarning, module='google.cloud.aiplatform')
+            warnings.filterwarnings('ignore', category=FutureWarning, module='google.api_core')
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                import vertexai
+                from vertexai.generative_models import GenerativeModel
+            _vertex_generative_model = (vertexai, GenerativeModel)
+        vertexai, GenerativeModel = _vertex_generative_model
+        if _vertex_init_args != (project_id, location):
+            vertexai.init(project=project_id, location=location)
+            _vertex_init_args = (project_id, location)
+    return GenerativeModel
+
+
+def _record_llm_call(backend, model_name, started, response=None, outcome='ok'):
+    """Record call latency and (when the SDK reports it) token usage"""
+    llm_call_duration.observe(time.perf_counter() - started, backend, model_name, outcome)
+    usage = getattr(response, 'usage_metadata', None) if response is not None else None
+    if usage is not None:
+        prompt_tokens = getattr(usage, 'prompt_token_count', 0) or 0
+        completion_tokens = getattr(usage, 'candidates_token_count', 0) or 0
+        if prompt_tokens:
+            llm_tokens.inc(backend, model_name, 'prompt', amount=prompt_tokens)
+        if completion_tokens:
+            llm_tokens.inc(backend, model_name, 'completion', amount=completion_tokens)
 
-# Suppress warnings from google-cloud-aiplatform
-warnings.filterwarnings('ignore', category=UserWarning, module='google.cloud.aiplatform')
-warnings.filterwarnings('ignore', category=FutureWarning, module='google.api_core')
 
 class GeminiClient:
     """Client for interacting with Gemini API (supports both Direct API and Vertex AI)"""
@@ -26,6 +80,7 @@ class GeminiClient:
             self.use_method = 'mock'
             self.use_mock = True
     
+    @traced('GeminiClient.build_financial_context')
     def _build_financial_context(self, user_financial_data):
         """Build comprehensive financial context string from user data"""
         if not user_financial_data:
@@ -136,6 +191,17 @@ class GeminiClient:
                 goal_priority = goal.get('priority', 'medium')
                 progress = (goal_current / goal_target * 100) if goal_target > 0 else 0
                 context_parts.append(f"  - {goal_name}: ₹{goal_current:,.0f} / ₹{goal_target:,.0f} ({progress:.1f}%) - Target: {goal_year}, Priority: {goal_priority}")
+            # Exact SIP figures, so "how much should I invest" answers aren't model arithmetic
+            with tracer.start_as_current_span('sip_planner.import_numpy'):
+                from utils.sip_planner import plan_goals
+            plan = plan_goals(goals[:5])
+            returns = plan['annual_returns']
+            planned = [goal for goal in plan['goals'] if goal['status'] == 'planned']
+            if planned:
+                context_parts.append("  - Monthly SIP needed per goal (to reach each target by its year, current savings invested):")
+                for goal in planned:
+                    needs = ", ".join(f"₹{sip:,.0f} at {rate:g}%" for sip, rate in zip(goal['required_sip'], returns) if sip is not None)
+                    context_parts.append(f"    * {goal['name']}: {needs}")
         
         # Budget
         if budget:
@@ -191,11 +257,29 @@ class GeminiClient:
                         sign = "+" if gain_loss >= 0 else ""
                         context_parts.append(f"  - {name}: ₹{value:,.0f} ({sign}₹{gain_loss:,.0f}, {sign}{gain_pct:.1f}%)")
             elif isinstance(investments, list):
-                for inv in investments[:5]:
+                # Annualized (XIRR) returns account for how long the money was invested
+                with tracer.start_as_current_span('investment_performance.import_numpy'):
+                    from utils.investment_performance import cached_investment_performance, investment_performance
+                # Stored documents carry user_id and data_version, so repeat chat
+                # messages reuse the result /investment_performance cached for this version
+                user_id = user_financial_data.get('user_id')
+                if user_id and not user_financial_data.get('is_mock'):
+                    performance = cached_investment_performance(
+                        str(user_id), ('user', user_financial_data.get('data_version')), investments
+                    )
+                else:
+                    performance = investment_performance(investments)
+                holdings = [inv for inv in investments if isinstance(inv, dict)]
+                for inv, perf in list(zip(holdings, performance['holdings']))[:5]:
                     name = inv.get('name', 'Unknown')
                     value = inv.get('current_value', inv.get('amount', 0))
                     returns = inv.get('returns', 0)
-                    context_parts.append(f"  - {name}: ₹{value:,.0f} (Returns: {returns:.2f}%)")
+                    xirr = f", XIRR: {perf['xirr']:.2f}% p.a." if perf['xirr'] is not None else ""
+                    context_parts.append(f"  - {name}: ₹{value:,.0f} (Returns: {returns:.2f}%{xirr})")
+                portfolio = performance['portfolio']
+                if portfolio['xirr'] is not None:
+                    cagr = f" (CAGR {portfolio['cagr']:.2f}%)" if portfolio['cagr'] is not None else ""
+                    context_parts.append(f"  - Portfolio XIRR: {portfolio['xirr']:.2f}% p.a.{cagr}")
         
         # Loans Array (detailed loan information)
         loans_array = user_financial_data.get('loans', [])
@@ -216,6 +300,14 @@ class GeminiClient:
                 context_parts.append(f"    * EMI: ₹{emi:,.0f}, Interest Rate: {interest_rate}%")
                 if next_payment != 'N/A':
                     context_parts.append(f"    * Next Payment: {next_payment}")
+            # Exact what-if figures, so rate-rise / prepayment answers aren't model arithmetic
+            with tracer.start_as_current_span('loan_sensitivity.import_numpy'):
+                from utils.loan_sensitivity import sensitivity_lines
+            what_if = sensitivity_lines(loans_array)
+            if what_if:
+                context_parts.append("")
+                context_parts.append("LOAN WHAT-IF (exact, computed):")
+                context_parts.extend(what_if)
         
         # Financial Health Metrics
         if financial_health:
@@ -256,6 +348,7 @@ class GeminiClient:
         
         return "\n".join(context_parts)
     
+    @traced('GeminiClient.generate_response')
     def generate_response(self, user_message, user_financial_data=None):
         """
         Generate AI response using Gemini API
@@ -268,7 +361,10 @@ class GeminiClient:
             str: AI response
         """
         if self.use_mock:
-            return self._mock_response(user_message, user_financial_data)
+            started = time.perf_counter()
+            response = self._mock_response(user_message, user_financial_data)
+            _record_llm_call('mock', 'mock', started)
+            return response
         
         try:
             if self.use_method == 'direct_api':
@@ -286,10 +382,8 @@ class GeminiClient:
     def _call_gemini_direct_api(self, user_message, user_financial_data=None):
         """Call Gemini API directly using API key (google-generativeai package)"""
         try:
-            import google.generativeai as genai
-            
-            # Configure the API key
-            genai.configure(api_key=self.api_key)
+            # Import and configure the SDK on first use
+            genai = _load_genai(self.api_key)
             
             # Prepare comprehensive context from financial data (all amounts are in Indian Rupees)
             context = self._build_financial_context(user_financial_data)
@@ -326,13 +420,17 @@ class GeminiClient:
             last_error = None
             
             for model_name in model_names:
+                started = time.perf_counter()
                 try:
-                    model = genai.GenerativeModel(model_name)
-                    # Test with a simple call to see if model works
-                    response = model.generate_content(prompt)
+                    with tracer.start_as_current_span('gemini.generate_content', {'gemini.backend': 'direct_api', 'gemini.model': model_name}):
+                        model = genai.GenerativeModel(model_name)
+                        # Test with a simple call to see if model works
+                        response = model.generate_content(prompt)
+                    _record_llm_call('direct_api', model_name, started, response)
                     print(f"✓ Successfully using model: {model_name}")
                     return response.text
                 except Exception as e:
+                    _record_llm_call('direct_api', model_name, started, outcome='error')
                     last_error = e
                     # Only print if it's not a 404 (model not found) to avoid spam
                     if '404' not in str(e) and 'not found' not in str(e).lower():
@@ -353,8 +451,7 @@ class GeminiClient:
             print(f"Error calling Gemini Direct API: {e}")
             # Try to list available models for debugging
             try:
-                import google.generativeai as genai
-                genai.configure(api_key=self.api_key)
+                genai = _load_genai(self.api_key)
                 models = genai.list_models()
                 print("Available models:")
                 for m in models:
@@ -367,15 +464,8 @@ class GeminiClient:
     def _call_gemini_vertex_ai(self, user_message, user_financial_data=None):
         """Call Gemini API via Vertex AI (requires GCP project)"""
         try:
-            # Suppress warnings during import
-            import warnings
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                import vertexai
-                from vertexai.generative_models import GenerativeModel
-            
-            # Initialize Vertex AI
-            vertexai.init(project=self.project_id, location=self.location)
+            # Import and initialize Vertex AI on first use
+            GenerativeModel = _load_vertex_model_class(self.project_id, self.location)
             
             # Prepare comprehensive context from financial data (all amounts are in Indian Rupees)
             context = self._build_financial_context(user_financial_data)
@@ -416,14 +506,18 @@ class GeminiClient:
             model_names = ["gemini-2.5-flash", "gemini-2.5-pro", "gemini-pro"]
             
             for model_name in model_names:
+                started = time.perf_counter()
                 try:
-                    # Initialize model
-                    model = GenerativeModel(model_name)
-                    # Generate response
-                    response = model.generate_content(prompt)
+                    with tracer.start_as_current_span('gemini.generate_content', {'gemini.backend': 'vertex_ai', 'gemini.model': model_name}):
+                        # Initialize model
+                        model = GenerativeModel(model_name)
+                        # Generate response
+                        response = model.generate_content(prompt)
+                    _record_llm_call('vertex_ai', model_name, started, response)
                     print(f"✓ Successfully using Vertex AI model: {model_name}")
                     return response.text
                 except Exception as e:
+                    _record_llm_call('vertex_ai', model_name, started, outcome='error')
                     if model_name == model_names[-1]:  # Last model, raise the error
                         raise e
                     continue
@@ -435,6 +529,7 @@ class GeminiClient:
             print(f"Error in Gemini Vertex AI call: {e}")
             return self._mock_response(user_message, user_financial_data)
     
+    @traced('GeminiClient.mock_response')
     def _mock_response(self, user_message, user_financial_data=None):
         """Generate mock response for demo purposes"""
         # Extract financial data if available
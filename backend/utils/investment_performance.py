@@ -0,0 +1,281 @@
+"""
+Investment Performance (XIRR / CAGR)
+Computes money-weighted (XIRR) and compound annual (CAGR) returns for every
+holding in financial_data.investments and for the whole portfolio from dated
+cashflows.
+
+A holding's cashflows are its optional cashflows list ({date, amount}, money
+invested negative and withdrawals/dividends positive) or, without one,
+-amount on purchase_date; its current_value is the terminal flow on the
+valuation date. All flows of all holdings (plus the portfolio as one more
+series) are kept in flat arrays with a series index; totals and every
+Newton iteration are computed for all series at once (per-series sums via
+bincount).
+Series that Newton does not settle are finished by vectorized bisection over a
+bracketing interval; a series without a root strictly inside the searched
+range reports XIRR as None rather than a rate pinned at its edge.
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.cache import TTLCache
+from utils.metrics import register_cache
+from utils.numeric import number
+
+DAYS_PER_YEAR = 365.0
+
+NEWTON_ITERATIONS = 50
+BISECTION_ITERATIONS = 200
+TOLERANCE = 1e-10
+# Largest net present value (as a share of the series' total flows) accepted as a root
+VALUE_TOLERANCE = 1e-9
+
+# Rates are searched within this range (-99.99% to +10000% per year)
+MIN_RATE = -0.9999
+MAX_RATE = 100.0
+
+# Holdings younger than this report CAGR/XIRR as None (annualizing a few days is noise)
+MIN_YEARS = 1 / 52
+
+# user_id -> (data_version, valuation date, result)
+_performance_cache = TTLCache(ttl_seconds=3600, max_size=5000)
+register_cache('investment_performance', _performance_cache)
+
+
+@lru_cache(maxsize=8192)
+def _parse_day_text(text: str) -> Optional[int]:
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00')).date().toordinal()
+    except ValueError:
+        return None
+
+
+def _parse_day(value) -> Optional[int]:
+    """Ordinal day (date.toordinal) of a date, datetime or ISO string"""
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    if not value:
+        return None
+    # SIP cashflows repeat the same dates across holdings; parsing dominates otherwise
+    return _parse_day_text(str(value))
+
+
+def holding_cashflows(holding: Dict, valuation_day: int) -> List[Tuple[int, float]]:
+    """
+    Dated cashflows (ordinal day, amount) of one holding, ending with its
+    current value on the valuation day
+
+    Flows dated after the valuation day are ignored; a holding without dated
+    flows yields an empty list.
+    """
+    flows = []
+    for flow in holding.get('cashflows') or []:
+        if not isinstance(flow, dict):
+            continue
+        day = _parse_day(flow.get('date'))
+        amount = number(flow.get('amount'))
+        if day and amount and day <= valuation_day:
+            flows.append((day, amount))
+    if not flows:
+        day = _parse_day(holding.get('purchase_date'))
+        invested = number(holding.get('amount', holding.get('amount_invested')))
+        if day and invested and day <= valuation_day:
+            flows.append((day, -abs(invested)))
+    if not flows:
+        return []
+    current = number(holding.get('current_value'))
+    if current:
+        flows.append((valuation_day, current))
+    return flows
+
+
+def xirr_batch(amounts: np.ndarray, years: np.ndarray, series: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Solve sum(amount * (1 + r) ** years) = 0 for every series at once
+
+    Args:
+        amounts: Flow amounts (flat, all series)
+        years: Years from each flow to the valuation date (>= 0)
+        series: Series index of each flow (0 .. count - 1)
+        count: Number of series
+
+    Returns:
+        (rates, solved) - rates is NaN where no root exists inside
+        (MIN_RATE, MAX_RATE) (e.g. all flows have the same sign)
+    """
+    # Scale each series to unit size so one tolerance fits small and large holdings
+    scale = np.bincount(series, weights=np.abs(amounts), minlength=count)
+    scale[scale == 0] = 1.0
+    amounts = amounts / scale[series]
+
+    has_root = (np.bincount(series, weights=(amounts > 0).astype(float), minlength=count) > 0) & \
+        (np.bincount(series, weights=(amounts < 0).astype(float), minlength=count) > 0)
+
+    def value(rates, flow_series=series, flow_amounts=amounts, flow_years=years):
+        return np.bincount(flow_series, weights=flow_amounts * np.power(1 + rates[flow_series], flow_years),
+                           minlength=count)
+
+    rates = np.full(count, 0.1)
+    solved = np.zeros(count, dtype=bool)
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        for _ in range(NEWTON_ITERATIONS):
+            growth = np.power(1 + rates[series], years - 1)
+            f = np.bincount(series, weights=amounts * growth * (1 + rates[series]), minlength=count)
+            df = np.bincount(series, weights=amounts * years * growth, minlength=count)
+            step = np.where(df != 0, f / df, 0.0)
+            step[~np.isfinite(step)] = 0.0
+            new_rates = np.clip(rates - step, MIN_RATE, MAX_RATE)
+            # A rate clipped to a bound stops moving without being a root
+            solved |= has_root & (np.abs(new_rates - rates) < TOLERANCE) & (np.abs(f) < VALUE_TOLERANCE) & \
+                (rates > MIN_RATE) & (rates < MAX_RATE)
+            rates = np.where(solved, rates, new_rates)
+            if solved[has_root].all():
+                break
+
+        pending = has_root & ~solved
+        if pending.any():
+            # Bisection on [MIN_RATE, MAX_RATE] for the series Newton left unsolved
+            low = np.full(count, MIN_RATE)
+            high = np.full(count, MAX_RATE)
+            f_low = value(low)
+            f_high = value(high)
+            bracketed = pending & np.isfinite(f_low) & np.isfinite(f_high) & (np.sign(f_low) * np.sign(f_high) < 0)
+            for _ in range(BISECTION_ITERATIONS):
+                middle = (low + high) / 2
+                f_middle = value(middle)
+                same_side = np.sign(f_middle) == np.sign(f_low)
+                low = np.where(bracketed & same_side, middle, low)
+                f_low = np.where(bracketed & same_side, f_middle, f_low)
+                high = np.where(bracketed & ~same_side, middle, high)
+                if np.all((high - low)[bracketed] < TOLERANCE):
+                    break
+            middle = (low + high) / 2
+            # The sign change guarantees a root; one that closed in on a bound is out of range
+            bracketed &= (middle - MIN_RATE > TOLERANCE) & (MAX_RATE - middle > TOLERANCE)
+            rates = np.where(bracketed, middle, rates)
+            solved |= bracketed
+
+    rates = np.where(solved, rates, np.nan)
+    return rates, solved
+
+
+def _summary(fields: Dict, invested: float, withdrawn: float, current_value: float,
+             years: float, flows: int) -> Dict:
+    gain = current_value + withdrawn - invested
+    cagr = None
+    if invested > 0 and years >= MIN_YEARS and current_value + withdrawn > 0:
+        cagr = round((((current_value + withdrawn) / invested) ** (1 / years) - 1) * 100, 2)
+    return {
+        **fields,
+        'invested': round(invested, 2),
+        'withdrawn': round(withdrawn, 2),
+        'current_value': round(current_value, 2),
+        'gain': round(gain, 2),
+        'absolute_return': round(gain / invested * 100, 2) if invested > 0 else None,
+        'cagr': cagr,
+        'xirr': None,
+        'years': round(years, 2),
+        'cashflows': flows
+    }
+
+
+def investment_performance(investments: List[Dict], valuation_date: Optional[date] = None) -> Dict:
+    """
+    XIRR and CAGR for every holding and for the whole portfolio
+
+    CAGR treats total money invested as the starting value and current value
+    plus withdrawals as the ending value over the years since the first
+    flow; XIRR weights every flow by its date. Holdings without a dated
+    investment are reported without rates and left out of the portfolio.
+
+    Returns:
+        {"holdings": [...], "portfolio": {...}, "valuation_date": ISO date}
+    """
+    valuation_date = valuation_date or date.today()
+    valuation_day = valuation_date.toordinal()
+    holdings = [item for item in investments or [] if isinstance(item, dict)]
+    count = len(holdings)
+
+    days, amounts, owners, terminal = [], [], [], []
+    for index, holding in enumerate(holdings):
+        flows = holding_cashflows(holding, valuation_day)
+        if not flows:
+            continue
+        days.extend(day for day, _ in flows)
+        amounts.extend(amount for _, amount in flows)
+        owners.extend([index] * len(flows))
+        has_terminal = bool(number(holding.get('current_value')))
+        terminal.extend([False] * (len(flows) - 1) + [has_terminal])
+
+    current_values = np.array([number(holding.get('current_value')) for holding in holdings])
+    days = np.array(days, dtype=np.int64)
+    amounts = np.array(amounts, dtype=float)
+    owners = np.array(owners, dtype=np.int64)
+    history = ~np.array(terminal, dtype=bool)
+
+    # Per-holding totals in single passes over all flows
+    flow_counts = np.bincount(owners, minlength=count)
+    invested = np.bincount(owners, weights=np.where(history & (amounts < 0), -amounts, 0.0), minlength=count)
+    withdrawn = np.bincount(owners, weights=np.where(history & (amounts > 0), amounts, 0.0), minlength=count)
+    first_day = np.full(count, valuation_day, dtype=np.int64)
+    np.minimum.at(first_day, owners, days)
+    years_held = (valuation_day - first_day) / DAYS_PER_YEAR
+    dated = flow_counts > 0
+
+    summaries = [
+        _summary({'id': holding.get('id'), 'name': holding.get('name'), 'type': holding.get('type')},
+                 float(invested[index]), float(withdrawn[index]), float(current_values[index]),
+                 float(years_held[index]), int(flow_counts[index]))
+        for index, holding in enumerate(holdings)
+    ]
+
+    total_value = float(current_values[dated].sum())
+    portfolio_years = float(years_held[dated].max()) if dated.any() else 0.0
+    history_flows = int(history.sum())
+    portfolio = _summary({'name': 'Portfolio'}, float(invested.sum()), float(withdrawn.sum()), total_value,
+                         portfolio_years, history_flows + (1 if total_value else 0))
+
+    # Holdings are series 0 .. count - 1 and the portfolio (every dated flow
+    # plus the total current value) is series count, all solved together
+    solve = years_held[owners] >= MIN_YEARS
+    series = [owners[solve]]
+    flow_years = [(valuation_day - days[solve]) / DAYS_PER_YEAR]
+    flow_amounts = [amounts[solve]]
+    if portfolio_years >= MIN_YEARS:
+        series += [np.full(history_flows, count), np.array([count])]
+        flow_years += [(valuation_day - days[history]) / DAYS_PER_YEAR, np.zeros(1)]
+        flow_amounts += [amounts[history], np.array([total_value])]
+    series = np.concatenate(series)
+    if len(series):
+        rates, _ = xirr_batch(np.concatenate(flow_amounts), np.concatenate(flow_years), series, count + 1)
+        for index, summary in enumerate(summaries):
+            if np.isfinite(rates[index]):
+                summary['xirr'] = round(float(rates[index]) * 100, 2)
+        if np.isfinite(rates[count]):
+            portfolio['xirr'] = round(float(rates[count]) * 100, 2)
+
+    return {
+        'holdings': summaries,
+        'portfolio': portfolio,
+        'valuation_date': valuation_date.isoformat()
+    }
+
+
+def cached_investment_performance(user_id: str, data_version, investments: List[Dict]) -> Dict:
+    """
+    investment_performance reused until the user's data_version (or the
+    valuation date) changes
+    """
+    today = date.today()
+    cached = _performance_cache.get(user_id)
+    if cached is not None and cached[0] == data_version and cached[1] == today:
+        return cached[2]
+    result = investment_performance(investments, today)
+    _performance_cache.set(user_id, (data_version, today, result))
+    return result
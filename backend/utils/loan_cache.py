@@ -0,0 +1,153 @@
+"""
+Loan Calculation Cache
+Memoizes the fixed-rate loan engine (EMI with schedule, prepayment savings and
+loan comparison) in a bounded LRU cache keyed by canonicalized inputs, so the
+loan page's repeated (principal, annual_rate, tenure_months) requests, e.g.
+while toggling between presets, are answered without recomputing.
+
+Inputs are rounded before keying (principal to the paisa, rate to 4 decimals,
+tenure to whole months), so 2500000, "2500000.0" and 2500000.001 share an
+entry. Schedules are stored as one array('d') per column (about 17 KB for 360
+months instead of 360 dicts) and expanded into rows only when a response needs
+them. The cache is bounded by entry count and by the bytes of its packed
+schedules; schedules longer than MAX_CACHED_TENURE_MONTHS are computed on each
+request instead of evicting dozens of typical loans. warm_presets fills the
+cache for the loan presets at startup.
+"""
+
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from utils.cache import LRUCache
+from utils.loan_calculator import calculate_emi, calculate_prepayment_savings, compare_loans
+from utils.metrics import register_cache
+
+LOAN_CACHE_SIZE = 4096
+
+# Packed schedule bytes kept per worker (about 1800 30-year schedules)
+LOAN_CACHE_BYTES = 32 * 1024 * 1024
+
+# Longest loan (60 years) whose EMI and schedule are cached
+MAX_CACHED_TENURE_MONTHS = 720
+
+# Rough size of an entry's result dict and key, on top of its schedule
+ENTRY_OVERHEAD_BYTES = 1024
+
+# Schedule row fields stored as columns (month is the row number)
+SCHEDULE_COLUMNS = ("emi", "principal_payment", "interest_payment", "remaining_principal",
+                    "total_paid", "total_interest_paid")
+
+
+def _entry_bytes(value) -> int:
+    if isinstance(value, tuple) and value[1] is not None:
+        return ENTRY_OVERHEAD_BYTES + sum(column.itemsize * len(column) for column in value[1].values())
+    return ENTRY_OVERHEAD_BYTES
+
+
+_loan_cache = LRUCache(max_size=LOAN_CACHE_SIZE, max_bytes=LOAN_CACHE_BYTES, sizeof=_entry_bytes)
+register_cache('loan_calculations', _loan_cache)
+
+
+def canonical_loan(principal, annual_rate, tenure_months) -> Tuple[float, float, int]:
+    """(principal, annual_rate, tenure_months) rounded to the precision results depend on"""
+    return round(float(principal), 2) + 0.0, round(float(annual_rate), 4) + 0.0, int(tenure_months)
+
+
+def pack_schedule(rows: List[Dict]) -> Dict[str, array]:
+    """Amortization rows as one array('d') per column"""
+    return {column: array('d', [row[column] for row in rows]) for column in SCHEDULE_COLUMNS}
+
+
+def unpack_schedule(columns: Dict[str, array], start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+    """Amortization rows (months start + 1 .. stop) from packed columns"""
+    values = [columns[column][start:stop] for column in SCHEDULE_COLUMNS]
+    return [
+        {"month": month, "emi": emi, "principal_payment": principal, "interest_payment": interest,
+         "remaining_principal": remaining, "total_paid": paid, "total_interest_paid": interest_paid}
+        for month, emi, principal, interest, remaining, paid, interest_paid in zip(
+            range(start + 1, start + 1 + len(values[0])), *values
+        )
+    ]
+
+
+def emi_summary(principal, annual_rate, tenure_months) -> Tuple[Dict, Optional[Dict[str, array]]]:
+    """
+    calculate_emi's result without the schedule, plus the packed schedule
+    (None with an error result), from the cache when possible
+    """
+    key = ('emi',) + canonical_loan(principal, annual_rate, tenure_months)
+    if key[3] > MAX_CACHED_TENURE_MONTHS:
+        return _emi_entry(key)
+    cached = _loan_cache.get(key)
+    if cached is None:
+        cached = _emi_entry(key)
+        _loan_cache.set(key, cached)
+    return cached
+
+
+def _emi_entry(key: Tuple) -> Tuple[Dict, Optional[Dict[str, array]]]:
+    result = calculate_emi(*key[1:])
+    schedule = result.pop("schedule", None)
+    return result, pack_schedule(schedule) if schedule is not None else None
+
+
+def cached_calculate_emi(principal, annual_rate, tenure_months) -> Dict:
+    """calculate_emi through the cache (same result shape, schedule included)"""
+    summary, columns = emi_summary(principal, annual_rate, tenure_months)
+    if columns is None:
+        return dict(summary)
+    return {**summary, "schedule": unpack_schedule(columns)}
+
+
+def cached_prepayment_savings(principal, annual_rate, tenure_months,
+                              prepayment_amount, prepayment_month) -> Dict:
+    """calculate_prepayment_savings through the cache"""
+    key = ('prepayment',) + canonical_loan(principal, annual_rate, tenure_months) + \
+        (round(float(prepayment_amount), 2) + 0.0, int(prepayment_month))
+    cached = _loan_cache.get(key)
+    if cached is None:
+        cached = calculate_prepayment_savings(*key[1:])
+        _loan_cache.set(key, cached)
+    return dict(cached)
+
+
+def _summary_only(principal, annual_rate, tenure_months) -> Dict:
+    return emi_summary(principal, annual_rate, tenure_months)[0]
+
+
+def cached_compare_loans(loans: List[Dict]) -> Dict:
+    """compare_loans with each option's EMI looked up in the cache (no schedules built)"""
+    return compare_loans(loans, calculate=_summary_only)
+
+
+def warm_presets(presets: List[Dict]) -> int:
+    """
+    Precompute EMIs for the loan presets: each preset's minimum and maximum
+    amount at its default rate, for every whole-year tenure in its range
+    (what the loan page requests when a preset is picked and the tenure
+    slider moves)
+
+    Returns:
+        Number of calculations cached
+    """
+    count = 0
+    for preset in presets or []:
+        try:
+            rate = float(preset['default_rate'])
+            amounts = {float(preset['min_amount']), float(preset['max_amount'])}
+            years = range(int(preset['min_tenure']), int(preset['max_tenure']) + 1)
+        except (KeyError, TypeError, ValueError):
+            continue
+        for amount in amounts:
+            for year in years:
+                # Filled directly so warm-up does not count as cache misses
+                key = ('emi',) + canonical_loan(amount, rate, year * 12)
+                if key not in _loan_cache:
+                    _loan_cache.set(key, _emi_entry(key))
+                    count += 1
+    return count
+
+
+def loan_cache_stats() -> Dict:
+    """Size and hit statistics of the loan calculation cache"""
+    return _loan_cache.stats()
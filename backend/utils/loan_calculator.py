@@ -7,7 +7,8 @@ import math
 from typing import Dict, List, Optional
 
 
-def calculate_emi(principal: float, annual_rate: float, tenure_months: int) -> Dict:
+def calculate_emi(principal: float, annual_rate: float, tenure_months: int,
+                  include_schedule: bool = True) -> Dict:
     """
     Calculate EMI (Equated Monthly Installment) using the formula:
     EMI = [P × R × (1+R)^N] / [(1+R)^N - 1]
@@ -21,6 +22,7 @@ def calculate_emi(principal: float, annual_rate: float, tenure_months: int) -> D
         principal: Loan principal amount
         annual_rate: Annual interest rate in percentage
         tenure_months: Loan tenure in months
+        include_schedule: Add the monthly amortization schedule
     
     Returns:
         Dictionary with EMI, total amount, total interest, and breakdown
@@ -43,10 +45,7 @@ def calculate_emi(principal: float, annual_rate: float, tenure_months: int) -> D
     total_amount = emi * tenure_months
     total_interest = total_amount - principal
     
-    # Generate amortization schedule
-    schedule = generate_amortization_schedule(principal, annual_rate, tenure_months, emi)
-    
-    return {
+    result = {
         "emi": round(emi, 2),
         "principal": round(principal, 2),
         "annual_rate": annual_rate,
@@ -55,9 +54,12 @@ def calculate_emi(principal: float, annual_rate: float, tenure_months: int) -> D
         "tenure_years": round(tenure_months / 12, 2),
         "total_amount": round(total_amount, 2),
         "total_interest": round(total_interest, 2),
-        "interest_percentage": round((total_interest / principal) * 100, 2),
-        "schedule": schedule
+        "interest_percentage": round((total_interest / principal) * 100, 2)
     }
+    if include_schedule:
+        # Generate amortization schedule
+        result["schedule"] = generate_amortization_schedule(principal, annual_rate, tenure_months, emi)
+    return result
 
 
 def generate_amortization_schedule(principal: float, annual_rate: float, 
@@ -102,6 +104,396 @@ def generate_amortization_schedule(principal: float, annual_rate: float,
     return schedule
 
 
+# Response views of a fixed-rate schedule (see amortization_view)
+SCHEDULE_VIEWS = ("full", "yearly", "window", "milestones")
+
+# Most months returned by one window
+MAX_WINDOW_MONTHS = 120
+
+
+def _fixed_emi(principal: float, monthly_rate: float, tenure_months: int) -> float:
+    if monthly_rate == 0:
+        return principal / tenure_months
+    growth = (1 + monthly_rate) ** tenure_months
+    return principal * monthly_rate * growth / (growth - 1)
+
+
+def amortization_window(principal: float, annual_rate: float, tenure_months: int,
+                        start_month: int = 1, count: int = 12) -> List[Dict]:
+    """
+    Rows start_month .. start_month + count - 1 of generate_amortization_schedule,
+    each computed from the closed-form balance instead of walking every
+    earlier month
+    """
+    monthly_rate = annual_rate / 12 / 100
+    emi = _fixed_emi(principal, monthly_rate, tenure_months)
+    rows = []
+    last_month = min(tenure_months, start_month + count - 1)
+    for month in range(max(1, start_month), last_month + 1):
+        before = max(0.0, _balance_after(principal, monthly_rate, emi, month - 1))
+        interest_payment = before * monthly_rate
+        payment = emi
+        if month == tenure_months:
+            # The last payment clears whatever rounding left
+            principal_payment = before
+            payment = principal_payment + interest_payment
+        else:
+            principal_payment = emi - interest_payment
+        remaining = max(0.0, before - principal_payment)
+        rows.append({
+            "month": month,
+            "emi": round(payment, 2),
+            "principal_payment": round(principal_payment, 2),
+            "interest_payment": round(interest_payment, 2),
+            "remaining_principal": round(remaining, 2),
+            "total_paid": round(payment * month, 2),
+            "total_interest_paid": round(payment * month - (principal - remaining), 2)
+        })
+    return rows
+
+
+def amortization_yearly(principal: float, annual_rate: float, tenure_months: int) -> List[Dict]:
+    """
+    Principal and interest paid per loan year, from the closed-form balances
+    at each year boundary (one step per year, not per month)
+    """
+    monthly_rate = annual_rate / 12 / 100
+    emi = _fixed_emi(principal, monthly_rate, tenure_months)
+    years = []
+    opening = principal
+    for start in range(1, tenure_months + 1, 12):
+        end = min(tenure_months, start + 11)
+        closing = 0.0 if end == tenure_months else max(0.0, _balance_after(principal, monthly_rate, emi, end))
+        paid = emi * (end - start + 1)
+        principal_paid = opening - closing
+        years.append({
+            "year": (start - 1) // 12 + 1,
+            "start_month": start,
+            "end_month": end,
+            "total_payment": round(paid, 2),
+            "principal_paid": round(principal_paid, 2),
+            "interest_paid": round(paid - principal_paid, 2),
+            "closing_balance": round(closing, 2),
+            "total_interest_paid": round(emi * end - (principal - closing), 2)
+        })
+        opening = closing
+    return years
+
+
+def _first_month(predicate, last_month: int) -> Optional[int]:
+    """Smallest month in 1..last_month where a predicate that stays true once true holds"""
+    if not predicate(last_month):
+        return None
+    low, high = 1, last_month
+    while low < high:
+        middle = (low + high) // 2
+        if predicate(middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+def amortization_milestones(principal: float, annual_rate: float, tenure_months: int) -> List[Dict]:
+    """
+    Months at which the loan passes notable points: principal overtaking
+    interest in the EMI, 25/50/75% of principal repaid, half of all interest
+    paid, and the last EMI (binary search over closed-form balances)
+    """
+    monthly_rate = annual_rate / 12 / 100
+    emi = _fixed_emi(principal, monthly_rate, tenure_months)
+    total_interest = emi * tenure_months - principal
+
+    def balance(month):
+        return max(0.0, _balance_after(principal, monthly_rate, emi, month))
+
+    def interest_paid(month):
+        return emi * month - (principal - balance(month))
+
+    checks = [
+        ("principal_exceeds_interest", lambda m: emi - balance(m - 1) * monthly_rate > balance(m - 1) * monthly_rate),
+        ("25_percent_repaid", lambda m: balance(m) <= principal * 0.75),
+        ("50_percent_repaid", lambda m: balance(m) <= principal * 0.5),
+        ("75_percent_repaid", lambda m: balance(m) <= principal * 0.25),
+    ]
+    if total_interest > 0:
+        checks.append(("half_interest_paid", lambda m: interest_paid(m) >= total_interest / 2))
+
+    milestones = []
+    for name, predicate in checks:
+        month = _first_month(predicate, tenure_months)
+        if month is not None:
+            milestones.append((name, month))
+    milestones.append(("loan_closed", tenure_months))
+    milestones.sort(key=lambda item: item[1])
+    return [
+        {
+            "milestone": name,
+            "month": month,
+            "year": (month - 1) // 12 + 1,
+            "remaining_principal": round(0.0 if month == tenure_months else balance(month), 2),
+            "total_interest_paid": round(interest_paid(month), 2)
+        }
+        for name, month in milestones
+    ]
+
+
+def amortization_view(principal: float, annual_rate: float, tenure_months: int, view: str,
+                      start_month: int = 1, count: int = 12) -> Dict:
+    """
+    calculate_emi's summary with one view of the schedule instead of every
+    month: "yearly" (per-year totals), "window" (months start_month ..
+    start_month + count - 1) or "milestones"; "full" is calculate_emi itself
+
+    Every view except "full" costs about the same for any tenure.
+    """
+    if view not in SCHEDULE_VIEWS:
+        return {"error": f"view must be one of: {', '.join(SCHEDULE_VIEWS)}"}
+    if view == "full":
+        return calculate_emi(principal, annual_rate, tenure_months)
+    result = calculate_emi(principal, annual_rate, tenure_months, include_schedule=False)
+    if "error" in result:
+        return result
+    result["view"] = view
+    if view == "yearly":
+        result["yearly"] = amortization_yearly(principal, annual_rate, tenure_months)
+    elif view == "milestones":
+        result["milestones"] = amortization_milestones(principal, annual_rate, tenure_months)
+    else:
+        if start_month < 1 or start_month > tenure_months or count < 1:
+            return {"error": "Window must start within the tenure and contain at least one month"}
+        count = min(count, MAX_WINDOW_MONTHS)
+        result["schedule"] = amortization_window(principal, annual_rate, tenure_months, start_month, count)
+        next_month = start_month + count
+        result["window"] = {
+            "from": start_month,
+            "count": len(result["schedule"]),
+            "total_months": tenure_months,
+            "next_from": next_month if next_month <= tenure_months else None
+        }
+    return result
+
+
+# Longest schedule simulated when rate resets extend the tenure
+MAX_TENURE_MONTHS = 720
+
+RESET_POLICIES = ("keep_emi", "keep_tenure")
+
+
+def _balance_after(balance: float, monthly_rate: float, emi: float, months: float) -> float:
+    """Balance left after paying emi for months at a fixed rate (closed form)"""
+    if monthly_rate == 0:
+        return balance - emi * months
+    growth = (1 + monthly_rate) ** months
+    return balance * growth - emi * (growth - 1) / monthly_rate
+
+
+def _months_to_repay(balance: float, monthly_rate: float, emi: float) -> Optional[float]:
+    """Exact (fractional) months for emi to repay balance, or None if it never does"""
+    if emi <= balance * monthly_rate:
+        return None
+    if monthly_rate == 0:
+        return balance / emi
+    return math.log(emi / (emi - balance * monthly_rate)) / math.log(1 + monthly_rate)
+
+
+def _annuity_factor(monthly_rate: float, months: int) -> float:
+    """Present value of 1 paid at the end of each of months months"""
+    if monthly_rate == 0:
+        return float(months)
+    return (1 - (1 + monthly_rate) ** -months) / monthly_rate
+
+
+def _step_level(month: int, step_percent: float, step_months: int, tenure_months: int) -> float:
+    """EMI multiple in force in a month of a step-up (or step-down) plan (no steps after the tenure)"""
+    if not step_percent:
+        return 1.0
+    return (1 + step_percent / 100) ** ((min(month, tenure_months) - 1) // step_months)
+
+
+def _path_value(monthly_rate: float, first_month: int, last_month: int,
+                step_percent: float, step_months: int, tenure_months: int) -> float:
+    """
+    Present value (at first_month - 1) of paying the step plan's EMI multiples
+    from first_month to last_month, one closed form per step
+    """
+    value = 0.0
+    start = first_month
+    while start <= last_month:
+        end = last_month
+        if step_percent and start <= tenure_months:
+            end = min(last_month, ((start - 1) // step_months + 1) * step_months)
+        level = _step_level(start, step_percent, step_months, tenure_months)
+        value += level * _annuity_factor(monthly_rate, end - start + 1) * (1 + monthly_rate) ** -(start - first_month)
+        start = end + 1
+    return value
+
+
+def calculate_floating_emi(principal: float, annual_rate: float, tenure_months: int,
+                           rate_resets: Optional[List[Dict]] = None, reset_policy: str = "keep_emi",
+                           emi_step_percent: float = 0.0, emi_step_months: int = 12,
+                           include_schedule: bool = True) -> Dict:
+    """
+    EMI and amortization for a floating-rate and/or step-up (step-down) loan
+
+    The loan starts at annual_rate; each rate reset {"month", "annual_rate"}
+    applies from that payment month. With a step plan the EMI changes by
+    emi_step_percent every emi_step_months and the first EMI is set so the
+    stepped EMIs repay the loan over tenure_months at the starting rate.
+
+    On a reset, reset_policy "keep_emi" keeps the EMI (plan) and lets the
+    tenure move; "keep_tenure" rescales the remaining EMIs so the loan still
+    ends in tenure_months. If a kept EMI would no longer cover the interest,
+    the EMI is recomputed for the remaining tenure (noted in warnings).
+
+    The schedule is walked segment by segment (a segment runs until the next
+    reset or step): balances and interest come from closed forms, so the
+    totals cost one step per segment rather than one per month.
+
+    Args:
+        principal: Loan principal amount
+        annual_rate: Starting annual interest rate in percentage
+        tenure_months: Loan tenure in months
+        rate_resets: [{"month": payment month, "annual_rate": percentage}]
+        reset_policy: "keep_emi" or "keep_tenure"
+        emi_step_percent: EMI change per step in percentage (negative steps down)
+        emi_step_months: Months between EMI steps
+        include_schedule: Add the monthly schedule
+
+    Returns:
+        Dictionary with the first EMI, totals, the actual tenure, one entry
+        per segment and (optionally) the monthly schedule
+    """
+    if principal <= 0 or annual_rate < 0 or tenure_months <= 0:
+        return {
+            "error": "Invalid input: principal, rate, and tenure must be positive"
+        }
+    if reset_policy not in RESET_POLICIES:
+        return {"error": f"reset_policy must be one of: {', '.join(RESET_POLICIES)}"}
+    if emi_step_months <= 0 or emi_step_percent <= -100:
+        return {"error": "Invalid EMI step plan"}
+
+    resets = {}
+    for reset in rate_resets or []:
+        try:
+            month = int(reset["month"])
+            rate = float(reset["annual_rate"])
+        except (KeyError, TypeError, ValueError):
+            return {"error": "Each rate reset needs a month and an annual_rate"}
+        if month < 1 or month > MAX_TENURE_MONTHS or rate < 0:
+            return {"error": "Rate reset months must be within the tenure and rates non-negative"}
+        resets[month] = rate
+
+    def level(month):
+        return _step_level(month, emi_step_percent, emi_step_months, tenure_months)
+
+    def path_value(rate, first_month, last_month):
+        return _path_value(rate, first_month, last_month, emi_step_percent, emi_step_months, tenure_months)
+
+    current_rate = resets.pop(1, annual_rate)
+    monthly_rate = current_rate / 12 / 100
+    # EMI in a month = scale x that month's step multiple
+    scale = principal / path_value(monthly_rate, 1, tenure_months)
+    first_emi = scale * level(1)
+
+    balance = principal
+    month = 1
+    total_paid = 0.0
+    total_interest = 0.0
+    segments = []
+    schedule = []
+    warnings = []
+    boundaries = sorted(set(resets) | {
+        step for step in range(emi_step_months + 1, tenure_months + 1, emi_step_months) if emi_step_percent
+    })
+
+    while balance > 0.005 and month <= MAX_TENURE_MONTHS:
+        if month in resets:
+            current_rate = resets[month]
+            monthly_rate = current_rate / 12 / 100
+            if reset_policy == "keep_tenure" or scale * level(month) <= balance * monthly_rate:
+                if reset_policy == "keep_emi":
+                    warnings.append(f"EMI raised at month {month}: the previous EMI no longer covered the interest")
+                # Repay by the original tenure (or within a year of a reset past it)
+                last_month = max(tenure_months, month + 11)
+                scale = balance / path_value(monthly_rate, month, last_month)
+        emi = scale * level(month)
+
+        next_boundary = next((b for b in boundaries if b > month), MAX_TENURE_MONTHS + 1)
+        months = next_boundary - month
+        to_repay = _months_to_repay(balance, monthly_rate, emi)
+        final = to_repay is not None and math.ceil(to_repay - 1e-9) <= months
+        full_months = math.ceil(to_repay - 1e-9) - 1 if final else months
+
+        opening = balance
+        segment_start = month
+        segment_paid = emi * full_months
+        closing = _balance_after(balance, monthly_rate, emi, full_months)
+        if include_schedule:
+            for offset in range(1, full_months + 1):
+                before = _balance_after(opening, monthly_rate, emi, offset - 1)
+                interest = before * monthly_rate
+                schedule.append((month + offset - 1, emi, interest, max(0.0, before + interest - emi)))
+        balance = closing
+        month += full_months
+        if final:
+            interest = balance * monthly_rate
+            if include_schedule:
+                schedule.append((month, balance + interest, interest, 0.0))
+            segment_paid += balance + interest
+            balance = 0.0
+            month += 1
+
+        segment_interest = segment_paid - (opening - balance)
+        total_paid += segment_paid
+        total_interest += segment_interest
+        segments.append({
+            "start_month": segment_start,
+            "end_month": month - 1,
+            "annual_rate": current_rate,
+            "emi": round(emi, 2),
+            "opening_balance": round(opening, 2),
+            "closing_balance": round(max(0.0, balance), 2),
+            "interest_paid": round(segment_interest, 2)
+        })
+
+    if balance > 0.005:
+        warnings.append(f"Loan not repaid within {MAX_TENURE_MONTHS} months")
+
+    result = {
+        "emi": round(first_emi, 2),
+        "principal": round(principal, 2),
+        "annual_rate": annual_rate,
+        "tenure_months": tenure_months,
+        "actual_tenure_months": month - 1,
+        "reset_policy": reset_policy,
+        "emi_step_percent": emi_step_percent,
+        "emi_step_months": emi_step_months,
+        "total_amount": round(total_paid, 2),
+        "total_interest": round(total_interest, 2),
+        "interest_percentage": round((total_interest / principal) * 100, 2),
+        "segments": segments,
+        "warnings": warnings
+    }
+    if include_schedule:
+        paid = interest_paid = 0.0
+        rows = []
+        for row_month, payment, interest, remaining in schedule:
+            paid += payment
+            interest_paid += interest
+            rows.append({
+                "month": row_month,
+                "emi": round(payment, 2),
+                "principal_payment": round(payment - interest, 2),
+                "interest_payment": round(interest, 2),
+                "remaining_principal": round(remaining, 2),
+                "total_paid": round(paid, 2),
+                "total_interest_paid": round(interest_paid, 2)
+            })
+        result["schedule"] = rows
+    return result
+
+
 def calculate_interest_only(principal: float, annual_rate: float, 
                            tenure_months: int) -> Dict:
     """
@@ -200,16 +592,19 @@ def calculate_prepayment_savings(principal: float, annual_rate: float,
     }
 
 
-def compare_loans(loans: List[Dict]) -> Dict:
+def compare_loans(loans: List[Dict], calculate=None) -> Dict:
     """
     Compare multiple loan options
     
     Args:
         loans: List of loan dictionaries with principal, rate, tenure
+        calculate: EMI function with calculate_emi's signature and summary
+            keys (defaults to calculate_emi; see utils/loan_cache.py)
     
     Returns:
         Comparison results
     """
+    calculate = calculate or calculate_emi
     results = []
     
     for loan in loans:
@@ -217,7 +612,7 @@ def compare_loans(loans: List[Dict]) -> Dict:
         rate = loan.get("annual_rate", 0)
         tenure_months = loan.get("tenure_months", 0)
         
-        calculation = calculate_emi(principal, rate, tenure_months)
+        calculation = calculate(principal, rate, tenure_months)
         if "error" not in calculation:
             results.append({
                 "loan_name": loan.get("name", f"Loan {len(results) + 1}"),
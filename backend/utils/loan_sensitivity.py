@@ -0,0 +1,180 @@
+"""
+Loan Sensitivity
+What-if grid for a user's loans: how the EMI, total interest and remaining
+tenure move under rate shocks (percentage points added to each loan's rate)
+combined with one-off prepayments made now.
+
+Every change is reported both ways a lender can absorb it: keep the EMI and
+move the tenure (the usual default for floating-rate home loans), or keep
+the tenure and move the EMI. All loans x shocks x prepayments are evaluated
+together as one broadcast array expression with the closed forms from
+utils/loan_solvers.py, so the chat assistant can quote exact figures instead
+of asking the model to do the arithmetic.
+"""
+
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from utils.debt_payoff import normalize_loans
+from utils.loan_solvers import annuity_factor, repay_with_emi
+from utils.numeric import rounded
+
+# Rate shocks (percentage points) and prepayments (rupees) when none are given
+DEFAULT_RATE_SHOCKS = (-1.0, -0.5, 0.5, 1.0, 2.0)
+DEFAULT_PREPAYMENTS = (0.0, 50000.0, 100000.0, 250000.0)
+
+# Largest grid (loans x rate shocks x prepayments) evaluated per request
+MAX_GRID_CELLS = 10000
+
+
+def remaining_months(balances, emis, annual_rates) -> np.ndarray:
+    """
+    Months (fractional) each EMI takes to clear each balance; NaN where the
+    EMI does not cover the interest
+    """
+    balances = np.asarray(balances, dtype=float)
+    emis = np.asarray(emis, dtype=float)
+    monthly_rates = np.asarray(annual_rates, dtype=float) / 12 / 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        months = np.where(
+            monthly_rates == 0,
+            balances / emis,
+            -np.log1p(-balances * monthly_rates / emis) / np.log1p(monthly_rates)
+        )
+    return np.where(emis > balances * monthly_rates, months, np.nan)
+
+
+def sensitivity_grid(balances, annual_rates, emis, rate_shocks, prepayments) -> Dict[str, np.ndarray]:
+    """
+    (loans, shocks, prepayments) arrays of the outcome of each loan after
+    each rate shock and prepayment
+
+    Returns:
+        {"keep_emi_months", "keep_emi_interest", "keep_tenure_emi",
+        "keep_tenure_interest"}; a prepayment that clears the balance gives
+        zeros, and keep_emi cells whose EMI no longer covers the interest NaN
+    """
+    balances = np.asarray(balances, dtype=float)[:, None, None]
+    annual_rates = np.asarray(annual_rates, dtype=float)[:, None, None]
+    emis = np.asarray(emis, dtype=float)[:, None, None]
+    shocks = np.asarray(rate_shocks, dtype=float)[None, :, None]
+    prepayments = np.asarray(prepayments, dtype=float)[None, None, :]
+
+    months = remaining_months(balances, emis, annual_rates)
+    rates = np.maximum(annual_rates + shocks, 0.0)
+    left = np.maximum(balances - prepayments, 0.0)
+    cleared = left <= 0
+
+    keep_emi_months, keep_emi_interest = repay_with_emi(left, emis, rates)
+    # Re-amortized over the same (fractional) months, so an unchanged loan keeps its EMI
+    with np.errstate(divide='ignore', invalid='ignore'):
+        keep_tenure_emi = left / annuity_factor(rates / 12 / 100, months)
+    keep_tenure_interest = keep_tenure_emi * months - left
+    return {
+        'keep_emi_months': np.where(cleared, 0.0, keep_emi_months),
+        'keep_emi_interest': np.where(cleared, 0.0, keep_emi_interest),
+        'keep_tenure_emi': np.where(cleared, 0.0, keep_tenure_emi),
+        'keep_tenure_interest': np.where(cleared, 0.0, keep_tenure_interest)
+    }
+
+
+def loan_sensitivity(loans: Sequence[Dict], rate_shocks: Sequence[float] = DEFAULT_RATE_SHOCKS,
+                     prepayments: Sequence[float] = DEFAULT_PREPAYMENTS) -> Dict:
+    """
+    Rate shock x prepayment grids for each open loan, against its current
+    path (no shock, no prepayment)
+
+    Grids are lists of rows, one per rate shock, with one column per
+    prepayment. "totals" sums the EMI and interest changes over all loans
+    for each rate shock alone (no prepayments).
+
+    Args:
+        loans: Loan dicts as stored (see debt_payoff.normalize_loans)
+        rate_shocks: Percentage points added to every loan's rate
+        prepayments: One-off amounts paid towards each loan now
+    """
+    started = time.perf_counter()
+    normalized = normalize_loans(loans)
+    rate_shocks = [float(shock) for shock in rate_shocks]
+    prepayments = [float(amount) for amount in prepayments]
+    result = {
+        'rate_shocks': rate_shocks,
+        'prepayments': prepayments,
+        'loans': [],
+        'totals': None
+    }
+    if not normalized:
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    # The current path rides along as shock 0 / prepayment 0 of the same grid
+    grid = sensitivity_grid(
+        [loan['balance'] for loan in normalized],
+        [loan['annual_rate'] for loan in normalized],
+        [loan['emi'] for loan in normalized],
+        [0.0] + rate_shocks,
+        [0.0] + prepayments
+    )
+    base = {key: values[:, :1, :1] for key, values in grid.items()}
+    cells = {key: values[:, 1:, 1:] for key, values in grid.items()}
+    # Converted to nested lists once, then split per loan
+    current_months = rounded(base['keep_emi_months'][:, 0, 0], 0)
+    current_interest = rounded(base['keep_emi_interest'][:, 0, 0])
+    keep_emi = zip(
+        rounded(cells['keep_emi_months'], 0),
+        rounded(cells['keep_emi_months'] - base['keep_emi_months'], 0),
+        rounded(cells['keep_emi_interest']),
+        rounded(cells['keep_emi_interest'] - base['keep_emi_interest'])
+    )
+    keep_tenure = zip(
+        rounded(cells['keep_tenure_emi']),
+        rounded(cells['keep_tenure_emi'] - base['keep_tenure_emi']),
+        rounded(cells['keep_tenure_interest']),
+        rounded(cells['keep_tenure_interest'] - base['keep_tenure_interest'])
+    )
+
+    for loan, months, interest, tenure_moves, emi_moves in zip(normalized, current_months, current_interest,
+                                                         keep_emi, keep_tenure):
+        result['loans'].append({
+            **loan,
+            'balance': round(loan['balance'], 2),
+            'emi': round(loan['emi'], 2),
+            'remaining_months': months,
+            'total_interest': interest,
+            'keep_emi': dict(zip(('tenure_months', 'tenure_delta', 'total_interest', 'interest_delta'), tenure_moves)),
+            'keep_tenure': dict(zip(('emi', 'emi_delta', 'total_interest', 'interest_delta'), emi_moves))
+        })
+
+    # Each shock applied to every loan at once, without prepayments
+    shocked = {key: (values[:, 1:, 0] - values[:, :1, 0]).sum(axis=0) for key, values in grid.items()}
+    result['totals'] = {
+        'emi': round(sum(loan['emi'] for loan in normalized), 2),
+        'keep_tenure_emi_delta': rounded(shocked['keep_tenure_emi']),
+        'keep_tenure_interest_delta': rounded(shocked['keep_tenure_interest']),
+        'keep_emi_interest_delta': rounded(shocked['keep_emi_interest'])
+    }
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def sensitivity_lines(loans: Sequence[Dict], rate_shock: float = 1.0, prepayment: float = 100000.0,
+                      limit: int = 5) -> List[str]:
+    """Plain-text what-if lines per loan (a rate rise and a prepayment) for the chat context"""
+    result = loan_sensitivity(loans, rate_shocks=[rate_shock, 0.0], prepayments=[0.0, prepayment])
+    lines = []
+    for loan in result['loans'][:limit]:
+        keep_emi, keep_tenure = loan['keep_emi'], loan['keep_tenure']
+        if keep_emi['tenure_delta'][0][0] is None:
+            rise = "EMI would no longer cover the interest if kept"
+        else:
+            rise = f"+{keep_emi['tenure_delta'][0][0]:.0f} months and +₹{keep_emi['interest_delta'][0][0]:,.0f} interest if the EMI is kept"
+        if keep_tenure['emi_delta'][0][0] is not None:
+            rise += f", or EMI +₹{keep_tenure['emi_delta'][0][0]:,.0f} if the tenure is kept"
+        lines.append(f"  - {loan['name']}: rate +{rate_shock:g}% → {rise}")
+        saved_interest = keep_emi['interest_delta'][1][1]
+        saved_months = keep_emi['tenure_delta'][1][1]
+        if saved_interest is not None and saved_months is not None:
+            lines.append(f"    * Prepaying ₹{prepayment:,.0f} now saves ₹{-saved_interest:,.0f} interest and {-saved_months:.0f} months")
+    return lines
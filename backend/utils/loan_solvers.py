@@ -0,0 +1,213 @@
+"""
+Inverse Loan Solvers
+Answers the reverse EMI questions for whole batches at once: the largest
+principal an EMI can carry, the tenure an EMI needs, and the rate (APR,
+including processing fees) implied by a quoted EMI.
+
+Principal and tenure have closed forms and are evaluated over broadcast
+arrays, so an affordability table of every candidate rate x tenure is one
+array expression. The implied rate has no closed form; it is solved for all
+quotes together by vectorized Newton iterations on the monthly rate, with
+bisection for any quote Newton does not settle.
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from utils.numeric import rounded
+
+NEWTON_ITERATIONS = 50
+BISECTION_ITERATIONS = 200
+TOLERANCE = 1e-12
+
+# Monthly rates searched by implied_rate (0% to 100% per month)
+MAX_MONTHLY_RATE = 1.0
+
+# Largest affordability table (rates x tenures) built per request
+MAX_TABLE_CELLS = 10000
+
+# Rows and columns of the affordability table when none are given
+DEFAULT_TABLE_RATES = (7.0, 8.0, 8.5, 9.0, 10.0, 12.0)
+DEFAULT_TABLE_TENURES = (36, 60, 120, 180, 240, 300, 360)
+
+
+def annuity_factor(monthly_rates, months):
+    """Present value of 1 paid at the end of each month, for broadcast arrays"""
+    monthly_rates = np.asarray(monthly_rates, dtype=float)
+    months = np.asarray(months, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = (1 - np.power(1 + monthly_rates, -months)) / monthly_rates
+    return np.where(monthly_rates == 0, months, factor)
+
+
+def max_principal(emis, annual_rates, tenure_months) -> np.ndarray:
+    """Largest principal each EMI repays at each rate (%) and tenure (broadcast)"""
+    return np.asarray(emis, dtype=float) * annuity_factor(np.asarray(annual_rates, dtype=float) / 12 / 100,
+                                                          tenure_months)
+
+
+def required_tenure(principals, emis, annual_rates) -> np.ndarray:
+    """
+    Months each EMI needs to repay each principal (broadcast), rounded up;
+    NaN where the EMI does not cover the first month's interest
+    """
+    principals = np.asarray(principals, dtype=float)
+    emis = np.asarray(emis, dtype=float)
+    monthly_rates = np.asarray(annual_rates, dtype=float) / 12 / 100
+    interest = principals * monthly_rates
+    with np.errstate(divide='ignore', invalid='ignore'):
+        months = np.where(
+            monthly_rates == 0,
+            principals / emis,
+            np.log(emis / (emis - interest)) / np.log1p(monthly_rates)
+        )
+    months = np.where((emis > interest) & (emis > 0), months, np.nan)
+    # An EMI rounded to paise leaves a few paise after the last whole month;
+    # fold remainders under 0.01% of an EMI into that month
+    return np.ceil(months - 1e-4)
+
+
+def implied_rate(net_principals, emis, tenure_months) -> np.ndarray:
+    """
+    Monthly rate at which each EMI over its tenure repays its net principal
+
+    Solves emi * annuity_factor(r, n) = net principal for every quote at
+    once; NaN where the EMIs add up to less than the net principal (a rate
+    below zero) or the inputs are not positive.
+    """
+    net = np.asarray(net_principals, dtype=float)
+    emis = np.asarray(emis, dtype=float)
+    months = np.asarray(tenure_months, dtype=float)
+    net, emis, months = np.broadcast_arrays(net, emis, months)
+    valid = (net > 0) & (emis > 0) & (months > 0) & (emis * months >= net)
+
+    def gap(rates):
+        return emis * annuity_factor(rates, months) - net
+
+    # Flat-rate approximation of the monthly rate as the starting point
+    rates = np.where(valid, np.clip(2 * (emis * months - net) / (net * (months + 1)), 1e-6, 0.5), 0.0)
+    solved = valid & (emis * months == net)
+    rates[solved] = 0.0
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        for _ in range(NEWTON_ITERATIONS):
+            growth = np.power(1 + rates, -months)
+            factor = (1 - growth) / rates
+            # d/dr of the annuity factor
+            slope = (months * growth / (1 + rates) - factor) / rates
+            step = (emis * factor - net) / (emis * slope)
+            step[~np.isfinite(step)] = 0.0
+            new_rates = np.clip(rates - step, 0.0, MAX_MONTHLY_RATE)
+            solved |= valid & (np.abs(new_rates - rates) < TOLERANCE)
+            rates = np.where(solved, rates, new_rates)
+            if solved[valid].all():
+                break
+
+        pending = valid & ~solved
+        if pending.any():
+            low = np.zeros_like(rates)
+            high = np.full_like(rates, MAX_MONTHLY_RATE)
+            for _ in range(BISECTION_ITERATIONS):
+                middle = (low + high) / 2
+                # The gap falls as the rate rises
+                above = gap(middle) > 0
+                low = np.where(pending & above, middle, low)
+                high = np.where(pending & ~above, middle, high)
+                if np.all((high - low)[pending] < TOLERANCE):
+                    break
+            rates = np.where(pending, (low + high) / 2, rates)
+            solved |= pending
+
+    return np.where(solved, rates, np.nan)
+
+
+def affordability_table(emi: float, annual_rates: Sequence[float], tenure_months: Sequence[int]) -> Dict:
+    """
+    Maximum principal (and its total interest) for one EMI at every candidate
+    rate (rows) and tenure (columns)
+    """
+    rates = np.asarray(annual_rates, dtype=float)[:, None]
+    tenures = np.asarray(tenure_months, dtype=float)[None, :]
+    principal = max_principal(emi, rates, tenures)
+    return {
+        'emi': round(float(emi), 2),
+        'annual_rates': [float(rate) for rate in annual_rates],
+        'tenure_months': [int(months) for months in tenure_months],
+        'max_principal': rounded(principal),
+        'total_interest': rounded(emi * tenures - principal)
+    }
+
+
+def repay_with_emi(principals, emis, annual_rates):
+    """
+    (months, total_interest) to repay each principal with each EMI
+    (broadcast), the last EMI being only what is left; NaN where the EMI
+    does not cover the first month's interest
+    """
+    principals = np.asarray(principals, dtype=float)
+    emis = np.asarray(emis, dtype=float)
+    months = required_tenure(principals, emis, annual_rates)
+    # The last EMI is smaller: pay off the balance left after months - 1 full EMIs
+    monthly_rates = np.asarray(annual_rates, dtype=float) / 12 / 100
+    with np.errstate(invalid='ignore'):
+        growth = np.power(1 + monthly_rates, months - 1)
+        left = np.where(monthly_rates == 0, principals - emis * (months - 1),
+                        principals * growth - emis * (growth - 1) / np.where(monthly_rates == 0, 1, monthly_rates))
+        total_paid = emis * (months - 1) + left * (1 + monthly_rates)
+    return months, total_paid - principals
+
+
+def tenure_table(principals: Sequence[float], emis: Sequence[float], annual_rates: Sequence[float]) -> List[Dict]:
+    """Required tenure (and total interest) for each (principal, emi, annual_rate) row"""
+    principals = np.asarray(principals, dtype=float)
+    emis = np.asarray(emis, dtype=float)
+    rates = np.asarray(annual_rates, dtype=float)
+    months, total_interest = repay_with_emi(principals, emis, rates)
+    return [
+        {
+            'principal': float(principal),
+            'emi': float(emi),
+            'annual_rate': float(rate),
+            'tenure_months': None if np.isnan(month) else int(month),
+            'total_interest': interest
+        }
+        for principal, emi, rate, month, interest in zip(
+            principals, emis, rates, months, rounded(total_interest)
+        )
+    ]
+
+
+def implied_apr_table(quotes: Sequence[Dict]) -> List[Dict]:
+    """
+    Implied rates of loan quotes {principal, emi, tenure_months,
+    processing_fee (amount) and/or processing_fee_percent}
+
+    The borrower receives principal minus fees but repays EMIs on the full
+    principal, so the APR (nominal, monthly compounding, like annual_rate)
+    is solved against the net amount; the quoted rate ignores the fees.
+    """
+    principals = np.array([float(quote.get('principal') or 0) for quote in quotes])
+    emis = np.array([float(quote.get('emi') or 0) for quote in quotes])
+    tenures = np.array([float(quote.get('tenure_months') or 0) for quote in quotes])
+    fees = np.array([
+        float(quote.get('processing_fee') or 0) + principals[i] * float(quote.get('processing_fee_percent') or 0) / 100
+        for i, quote in enumerate(quotes)
+    ])
+    # Net and gross principal solved as one batch
+    rates = implied_rate(np.concatenate([principals - fees, principals]), np.concatenate([emis, emis]),
+                         np.concatenate([tenures, tenures]))
+    apr, quoted = rates[:len(quotes)], rates[len(quotes):]
+    effective = np.power(1 + apr, 12) - 1
+    return [
+        {
+            **{key: quote.get(key) for key in ('name', 'principal', 'emi', 'tenure_months')},
+            'fees': round(float(fee), 2),
+            'rate_without_fees': rate,
+            'apr': annual,
+            'effective_annual_rate': eff
+        }
+        for quote, fee, rate, annual, eff in zip(
+            quotes, fees, rounded(quoted * 12 * 100, 3), rounded(apr * 12 * 100, 3), rounded(effective * 100, 3)
+        )
+    ]
+
@@ -0,0 +1,322 @@
+"""
+Metrics Utilities
+Lightweight in-process metrics registry with Prometheus text exposition.
+
+Counters and histograms are plain dicts keyed by label tuples guarded by a
+single lock, so recording a sample costs a dict lookup, a bisect and a few
+additions (~1-2 µs). Values are per worker process; scrape each worker (or
+aggregate upstream) when running several gunicorn workers.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from pymongo import monitoring
+
+# Latency buckets in seconds (1 ms .. 30 s) - covers Mongo ops up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), lock=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = lock or threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, lock=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = lock or threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        """Context manager observing the wall-clock duration of the block (seconds)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def summary(self, *labels) -> Dict:
+        state = self._values.get(labels)
+        if not state:
+            return {"count": 0, "sum": 0.0}
+        return {"count": state[2], "sum": state[1]}
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(labels, (list(state[0]), state[1], state[2])) for labels, state in self._values.items()]
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            label_str = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {_format_value(total)}"
+            yield f"{self.name}_count{label_str} {count}"
+
+
+class MetricsRegistry:
+    """Holds metrics plus collector callbacks evaluated at scrape time"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        # name -> (type, help, labelnames, callback returning [(label_values, value)])
+        self._collectors: Dict[str, Tuple[str, str, Tuple, Callable]] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, documentation, labelnames)
+            return self._metrics[name]
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+            return self._metrics[name]
+
+    def register_collector(self, name: str, kind: str, documentation: str,
+                           labelnames: Sequence[str], callback: Callable[[], List[Tuple[Sequence, float]]]):
+        """Register a gauge/counter whose samples are computed when /metrics is scraped"""
+        with self._lock:
+            self._collectors[name] = (kind, documentation, tuple(labelnames), callback)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for name, (kind, documentation, labelnames, callback) in collectors:
+            try:
+                samples = callback()
+            except Exception as e:
+                print(f"Metrics collector {name} failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for label_values, value in samples:
+                lines.append(f"{name}{_format_labels(labelnames, label_values)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry and the metrics the app records
+metrics = MetricsRegistry()
+
+
+def _reset_uptime_after_fork():
+    metrics.started_at = time.time()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_uptime_after_fork)
+
+
+http_requests_total = metrics.counter(
+    'fingenie_http_requests_total', 'HTTP requests by endpoint, method and status',
+    ('endpoint', 'method', 'status'))
+http_request_duration = metrics.histogram(
+    'fingenie_http_request_duration_seconds', 'HTTP request latency by endpoint',
+    ('endpoint', 'method'))
+mongo_command_duration = metrics.histogram(
+    'fingenie_mongo_command_duration_seconds', 'MongoDB command latency by command and collection',
+    ('command', 'collection'))
+mongo_command_failures = metrics.counter(
+    'fingenie_mongo_command_failures_total', 'Failed MongoDB commands', ('command',))
+llm_call_duration = metrics.histogram(
+    'fingenie_llm_call_duration_seconds', 'LLM call latency by backend, model and outcome',
+    ('backend', 'model', 'outcome'))
+llm_tokens = metrics.counter(
+    'fingenie_llm_tokens_total', 'LLM tokens by backend, model and kind (prompt/completion)',
+    ('backend', 'model', 'kind'))
+bcrypt_duration = metrics.histogram(
+    'fingenie_bcrypt_duration_seconds', 'bcrypt hash/verify latency', ('operation',))
+pdf_render_duration = metrics.histogram(
+    'fingenie_pdf_render_duration_seconds', 'PDF report render latency')
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo CommandListener feeding command latencies into the registry"""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        # The collection name is only available on the started event
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ''
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), '')
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name, collection)
+
+    def failed(self, event):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), '')
+        mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name, collection)
+        mongo_command_failures.inc(event.command_name)
+
+
+mongo_command_listener = MongoCommandMetrics()
+
+
+_caches: Dict[str, object] = {}
+
+
+def register_cache(name: str, cache):
+    """
+    Expose hit/miss/size statistics for a cache with hits, misses and __len__
+    (e.g. utils.cache.TTLCache) under the given cache label
+    """
+    _caches[name] = cache
+
+
+def _cache_samples(attr):
+    def collect():
+        return [((name,), getattr(cache, attr)) for name, cache in list(_caches.items())]
+    return collect
+
+
+metrics.register_collector('fingenie_cache_hits_total', 'counter', 'Cache hits', ('cache',),
+                           _cache_samples('hits'))
+metrics.register_collector('fingenie_cache_misses_total', 'counter', 'Cache misses', ('cache',),
+                           _cache_samples('misses'))
+metrics.register_collector('fingenie_cache_entries', 'gauge', 'Entries currently cached', ('cache',),
+                           lambda: [((name,), len(cache)) for name, cache in list(_caches.items())])
+metrics.register_collector('fingenie_process_uptime_seconds', 'gauge', 'Seconds since the worker started', (),
+                           lambda: [((), round(time.time() - metrics.started_at, 3))])
+
+
+def cache_stats() -> Dict:
+    """Hit ratio summary for every registered cache (used by /health)"""
+    stats = {}
+    for name, cache in list(_caches.items()):
+        total = cache.hits + cache.misses
+        stats[name] = {
+            "size": len(cache),
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "hit_ratio": round(cache.hits / total, 4) if total else 0.0
+        }
+    return stats
+
+
+def init_request_metrics(app):
+    """Record a counter and latency histogram sample for every request"""
+    from flask import request
+
+    perf_counter = time.perf_counter
+
+    @app.before_request
+    def _start_request_timer():
+        request.environ['fingenie.request_start'] = perf_counter()
+
+    @app.after_request
+    def _record_request_metrics(response):
+        started = request.environ.get('fingenie.request_start')
+        if started is not None:
+            rule = request.url_rule
+            endpoint = rule.endpoint if rule is not None else 'unmatched'
+            http_request_duration.observe(perf_counter() - started, endpoint, request.method)
+            http_requests_total.inc(endpoint, request.method, str(response.status_code))
+        return response
+
+
+def endpoint_summary() -> Dict:
+    """Request count and mean latency per endpoint (used by /health)"""
+    summary = {}
+    for labels in list(http_request_duration._values):
+        endpoint, method = labels
+        stats = http_request_duration.summary(*labels)
+        if stats["count"]:
+            summary[f"{method} {endpoint}"] = {
+                "count": stats["count"],
+                "avg_ms": round(stats["sum"] / stats["count"] * 1000, 2)
+            }
+    return summary
+
+
+def process_info() -> Dict:
+    return {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - metrics.started_at, 1)
+    }
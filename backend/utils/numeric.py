@@ -0,0 +1,34 @@
+"""
+Numeric Helpers
+Input coercion and result rounding shared by the NumPy engines: debt_payoff,
+loan_solvers, loan_sensitivity, investment_performance, goal_projection,
+sip_planner and cashflow_forecast.
+
+Importing numpy costs more than the rest of the app's startup, so none of
+these modules (this one included) may be imported at worker boot: routes
+import them inside the handler that needs them, under an
+"<module>.import_numpy" tracing span, and benchmarks/bench_import_time.py
+fails if importing the app loads numpy.
+"""
+
+import math
+from typing import List
+
+import numpy as np
+
+
+def number(value) -> float:
+    """value as a finite float; 0.0 for booleans, non-numbers, NaN and infinities"""
+    if isinstance(value, bool):
+        return 0.0
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return result if math.isfinite(result) else 0.0
+
+
+def rounded(values, digits: int = 2) -> List:
+    """Array values rounded to digits as a (nested) list, with NaN as None"""
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), None, np.round(values, digits)).tolist()
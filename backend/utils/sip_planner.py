@@ -0,0 +1,216 @@
+"""
+SIP Planner
+Deterministic SIP / lumpsum arithmetic for the user's goals: what a monthly
+SIP (optionally stepped up every year) and a lumpsum grow to, and the SIP or
+lumpsum each goal needs to reach its target, for every goal under several
+return assumptions at once. Goal targets are the amounts needed in the goal
+year, as in utils/goal_projection.py (GOAL_INFLATION_RATE); a retirement
+plan's monthly expense is today's and is inflated.
+
+Returns are annual and compounded monthly ((1 + R) ** (1 / 12) - 1 per
+month, as in utils/goal_projection.py); SIPs are paid at the start of each
+month, as SIP calculators assume. A step-up SIP is a geometric series of
+yearly blocks, so every value is a closed form evaluated over a (returns x
+goals) array. For probabilities of reaching a goal under market volatility,
+see utils/goal_projection.py.
+"""
+
+import time
+from datetime import date
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from utils.goal_projection import GOAL_INFLATION_RATE, goal_horizon_months
+from utils.numeric import number, rounded
+
+# Annual returns (%) planned for when none are given
+DEFAULT_RETURNS = (8.0, 10.0, 12.0)
+
+# Annual inflation (%) applied to today's monthly expense in retirement plans
+RETIREMENT_INFLATION_RATE = 6.0
+
+# Return assumptions accepted per request
+MAX_RETURN_ASSUMPTIONS = 20
+
+# Longest SIP / retirement period planned, in years
+MAX_YEARS = 60
+
+
+def monthly_rate(annual_returns):
+    """Monthly rate compounding to each annual return (%)"""
+    return np.power(1 + np.asarray(annual_returns, dtype=float) / 100, 1 / 12) - 1
+
+
+def _annuity_due(monthly_rates, months):
+    """Value after `months` of 1 paid at the start of each month"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = (np.power(1 + monthly_rates, months) - 1) / monthly_rates * (1 + monthly_rates)
+    return np.where(monthly_rates == 0, months, factor)
+
+
+def sip_factor(annual_returns, months, step_up_percent=0.0) -> np.ndarray:
+    """
+    Value after `months` of a SIP of 1 per month that rises by
+    step_up_percent every 12 months (broadcast)
+
+    Each full year's twelve payments are worth the same one-year annuity,
+    scaled by the step-up and discounted by a year's growth per year, so the
+    years form a geometric series; a final partial year is added on its own.
+    """
+    rates = monthly_rate(annual_returns)
+    months = np.asarray(months, dtype=float)
+    step = 1 + np.asarray(step_up_percent, dtype=float) / 100
+    years, remainder = np.floor(months / 12), np.mod(months, 12)
+    year_growth = np.power(1 + rates, 12)
+    ratio = step / year_growth
+    with np.errstate(divide='ignore', invalid='ignore'):
+        series = np.where(np.isclose(ratio, 1.0), years, (1 - np.power(ratio, years)) / (1 - ratio))
+    full_years = _annuity_due(rates, 12) * np.power(1 + rates, months - 12) * series
+    return np.where(years > 0, full_years, 0.0) + np.power(step, years) * _annuity_due(rates, remainder)
+
+
+def future_value(monthly_sip, months, annual_returns, lumpsum=0.0, step_up_percent=0.0) -> np.ndarray:
+    """Corpus after `months` of a (step-up) SIP plus a lumpsum invested today (broadcast)"""
+    growth = np.power(1 + monthly_rate(annual_returns), np.asarray(months, dtype=float))
+    return np.asarray(monthly_sip, dtype=float) * sip_factor(annual_returns, months, step_up_percent) + \
+        np.asarray(lumpsum, dtype=float) * growth
+
+
+def required_sip(targets, months, annual_returns, lumpsum=0.0, step_up_percent=0.0) -> np.ndarray:
+    """
+    Starting monthly SIP that, with the lumpsum invested today, reaches each
+    target after `months` (broadcast); 0 where the lumpsum alone gets there,
+    NaN where there are no months left
+    """
+    months = np.asarray(months, dtype=float)
+    growth = np.power(1 + monthly_rate(annual_returns), months)
+    gap = np.maximum(np.asarray(targets, dtype=float) - np.asarray(lumpsum, dtype=float) * growth, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sip = gap / sip_factor(annual_returns, months, step_up_percent)
+    return np.where(months > 0, sip, np.nan)
+
+
+def required_lumpsum(targets, months, annual_returns) -> np.ndarray:
+    """Amount to invest today, with no SIP, to reach each target after `months` (broadcast)"""
+    growth = np.power(1 + monthly_rate(annual_returns), np.asarray(months, dtype=float))
+    return np.asarray(targets, dtype=float) / growth
+
+
+def plan_goals(goals: Sequence[Dict], annual_returns: Sequence[float] = DEFAULT_RETURNS,
+               inflation_rate: float = GOAL_INFLATION_RATE, step_up_percent: float = 0.0,
+               today: Optional[date] = None) -> Dict:
+    """
+    Monthly SIP (and alternatively the lumpsum) each goal needs under each
+    return assumption, with the goal's current amount invested as a lumpsum
+
+    Targets are the amounts needed in the goal year; pass inflation_rate to
+    treat them as today's money and inflate them to the goal year instead.
+
+    Args:
+        goals: financial_data.goals entries (target, current, year, priority)
+        annual_returns: Return assumptions (%), one column per goal result list
+        inflation_rate: Annual inflation (%) applied to targets (default none)
+        step_up_percent: Yearly SIP increase (%); required_sip is the first year's SIP
+        today: Planning date (defaults to today)
+
+    Returns:
+        Per-goal lists aligned with annual_returns, plus the total SIP per return
+    """
+    started = time.perf_counter()
+    returns = [float(value) for value in annual_returns]
+    inflation = number(inflation_rate) / 100
+    parsed = [goal for goal in goals or [] if isinstance(goal, dict) and number(goal.get('target')) > 0]
+
+    months = np.array([goal_horizon_months(goal.get('year'), today) for goal in parsed], dtype=float)
+    targets = np.array([number(goal.get('target')) for goal in parsed]) * np.power(1 + inflation, months / 12)
+    current = np.array([max(0.0, number(goal.get('current') or goal.get('current_amount'))) for goal in parsed])
+    # (returns x goals)
+    rates = np.asarray(returns, dtype=float)[:, None]
+    sips = required_sip(targets, months, rates, current, step_up_percent)
+    lumpsums = np.maximum(required_lumpsum(targets, months, rates) - current, 0.0)
+    grown = future_value(0.0, months, rates, current)
+
+    results = []
+    for index, goal in enumerate(parsed):
+        achieved = current[index] >= targets[index]
+        results.append({
+            'id': goal.get('id'),
+            'name': goal.get('name'),
+            'year': goal.get('year'),
+            'priority': goal.get('priority'),
+            'target': round(number(goal.get('target')), 2),
+            'target_at_horizon': round(float(targets[index]), 2),
+            'current': round(float(current[index]), 2),
+            'horizon_months': int(months[index]),
+            'status': 'achieved' if achieved else ('overdue' if months[index] == 0 else 'planned'),
+            'required_sip': rounded(sips[:, index]),
+            'required_lumpsum': rounded(np.where(months[index] > 0, lumpsums[:, index], np.nan)),
+            'current_grows_to': rounded(grown[:, index])
+        })
+
+    return {
+        'goals': results,
+        'annual_returns': returns,
+        'inflation_rate': round(inflation * 100, 2),
+        'step_up_percent': round(number(step_up_percent), 2),
+        'total_required_sip': rounded(np.nansum(sips, axis=1)) if parsed else [0.0] * len(returns),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+    }
+
+
+def sip_projection(monthly_sip: float, years: float, annual_returns: Sequence[float] = DEFAULT_RETURNS,
+                   lumpsum: float = 0.0, step_up_percent: float = 0.0) -> Dict:
+    """Corpus of a (step-up) SIP plus lumpsum after each whole year, per return assumption"""
+    months = np.arange(1, int(round(number(years))) + 1) * 12.0
+    rates = np.asarray(annual_returns, dtype=float)[:, None]
+    values = future_value(monthly_sip, months[None, :], rates, lumpsum, step_up_percent)
+    step = 1 + number(step_up_percent) / 100
+    invested = number(lumpsum) + number(monthly_sip) * 12 * np.cumsum(np.power(step, np.arange(len(months))))
+    return {
+        'monthly_sip': round(number(monthly_sip), 2),
+        'lumpsum': round(number(lumpsum), 2),
+        'step_up_percent': round(number(step_up_percent), 2),
+        'annual_returns': [float(value) for value in annual_returns],
+        'years': [int(month // 12) for month in months],
+        'invested': rounded(invested),
+        'corpus': rounded(values)
+    }
+
+
+def retirement_plan(monthly_expense: float, years_to_retirement: float, years_in_retirement: float,
+                    annual_returns: Sequence[float] = DEFAULT_RETURNS,
+                    inflation_rate: float = RETIREMENT_INFLATION_RATE, post_retirement_return: float = 7.0,
+                    current_savings: float = 0.0, step_up_percent: float = 0.0) -> Dict:
+    """
+    Corpus needed at retirement to pay today's monthly_expense (rising with
+    inflation) for years_in_retirement, and the SIP that builds it
+
+    Withdrawals are made at the start of each month and discounted at the
+    post-retirement return net of inflation.
+    """
+    inflation = number(inflation_rate) / 100
+    months_to = round(number(years_to_retirement) * 12)
+    months_in = round(number(years_in_retirement) * 12)
+    first_withdrawal = number(monthly_expense) * (1 + inflation) ** (months_to / 12)
+    real_rate = ((1 + number(post_retirement_return) / 100) / (1 + inflation)) ** (1 / 12) - 1
+    if abs(real_rate) < 1e-12:
+        corpus = first_withdrawal * months_in
+    else:
+        corpus = first_withdrawal * (1 - (1 + real_rate) ** -months_in) / real_rate * (1 + real_rate)
+    rates = np.asarray(annual_returns, dtype=float)
+    return {
+        'monthly_expense': round(number(monthly_expense), 2),
+        'monthly_expense_at_retirement': round(first_withdrawal, 2),
+        'years_to_retirement': months_to / 12,
+        'years_in_retirement': months_in / 12,
+        'inflation_rate': round(inflation * 100, 2),
+        'post_retirement_return': round(number(post_retirement_return), 2),
+        'corpus_required': round(corpus, 2),
+        'current_savings': round(number(current_savings), 2),
+        'annual_returns': [float(value) for value in annual_returns],
+        'required_sip': rounded(required_sip(corpus, months_to, rates, number(current_savings), step_up_percent)),
+        'required_lumpsum': rounded(np.maximum(required_lumpsum(corpus, months_to, rates) -
+                                                number(current_savings), 0.0) if months_to > 0
+                                     else np.full(len(rates), np.nan))
+    }
@@ -0,0 +1,415 @@
+"""
+Bank Statement Import
+Streaming CSV/OFX parsers that normalize statement rows into the transaction
+shape (type, amount, category, description, date) and write them to the
+transactions collection in unordered batches.
+
+Files are read incrementally (row by row for CSV, in fixed-size chunks for
+OFX), so memory stays bounded by the batch size plus the in-file duplicate
+numbering of the most recent statement dates (one 8-byte digest per distinct
+row on those dates).
+"""
+
+import codecs
+import csv
+import hashlib
+import io
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+OFX_CHUNK_SIZE = 64 * 1024
+
+# Statement dates whose rows are kept for in-file duplicate numbering.
+# Statements are date-ordered (either way), so identical rows share a date
+# that is still in the window.
+DUPLICATE_WINDOW_DATES = 31
+
+# Day-first formats come first: Indian bank statements use DD/MM/YYYY
+DATE_FORMATS = (
+    '%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y',
+    '%d %b %Y', '%d-%b-%Y', '%d-%b-%y', '%d %B %Y', '%Y/%m/%d', '%Y%m%d'
+)
+
+# Normalized header name -> role. Headers are lowercased with non-letters removed.
+CSV_COLUMNS = {
+    'date': ('date', 'transactiondate', 'txndate', 'valuedate', 'postingdate', 'posteddate', 'trandate'),
+    'description': ('description', 'narration', 'details', 'particulars', 'remarks', 'memo', 'name', 'payee',
+                    'transactiondetails', 'transactionremarks'),
+    'amount': ('amount', 'transactionamount', 'amt', 'amountinr'),
+    'debit': ('debit', 'withdrawal', 'withdrawalamt', 'withdrawalamount', 'debitamount', 'dr', 'withdrawals'),
+    'credit': ('credit', 'deposit', 'depositamt', 'depositamount', 'creditamount', 'cr', 'deposits'),
+    'type': ('type', 'crdr', 'drcr', 'transactiontype', 'debitcredit'),
+    'category': ('category',),
+    'reference': ('reference', 'refno', 'chqrefno', 'referencenumber', 'transactionid', 'utr'),
+}
+
+# Description keywords -> category (matches the categories used by mock_data.json)
+CATEGORY_KEYWORDS = (
+    ('salary', ('salary', 'payroll', 'sal cr')),
+    ('freelance', ('freelance', 'consulting', 'upwork', 'fiverr')),
+    ('investment', ('mutual fund', 'sip', 'zerodha', 'groww', 'dividend', 'interest cr', 'int.pd', 'nse', 'bse')),
+    ('food', ('swiggy', 'zomato', 'restaurant', 'cafe', 'food', 'grocery', 'bigbasket', 'blinkit', 'dmart')),
+    ('transport', ('uber', 'ola', 'rapido', 'petrol', 'fuel', 'metro', 'irctc', 'fastag', 'parking')),
+    ('bills', ('electricity', 'water bill', 'gas', 'broadband', 'recharge', 'airtel', 'jio', 'bill', 'rent')),
+    ('shopping', ('amazon', 'flipkart', 'myntra', 'ajio', 'shopping', 'store', 'mall')),
+    ('entertainment', ('netflix', 'prime video', 'hotstar', 'spotify', 'bookmyshow', 'movie', 'pvr')),
+    ('healthcare', ('pharmacy', 'hospital', 'clinic', 'apollo', 'medical', 'health', '1mg')),
+    ('education', ('school', 'college', 'tuition', 'course', 'udemy', 'coursera', 'fees')),
+    ('emi', ('emi', 'loan', 'nach', 'ach d')),
+)
+
+_CATEGORY_PATTERNS = tuple(
+    (category, re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + r')\b'))
+    for category, keywords in CATEGORY_KEYWORDS
+)
+_AMOUNT_CLEAN = re.compile(r'[^0-9.\-]')
+_HEADER_CLEAN = re.compile(r'[^a-z]')
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+class StatementImportError(ValueError):
+    """Raised when a statement can't be parsed at all (bad format/header)"""
+
+
+def parse_amount(value) -> Optional[float]:
+    """Parse '₹1,23,456.70', '(500)', '500 Dr' etc. Returns a signed float or None"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    negative = text.startswith('(') and text.endswith(')')
+    lowered = text.lower()
+    if lowered.endswith('dr'):
+        negative = True
+    cleaned = _AMOUNT_CLEAN.sub('', text)
+    if cleaned in ('', '-', '.', '-.'):
+        return None
+    try:
+        amount = float(cleaned)
+    except ValueError:
+        return None
+    return -abs(amount) if negative else amount
+
+
+def parse_date(value, date_format: Optional[str] = None) -> Optional[str]:
+    """Parse a statement date into YYYY-MM-DD (tries date_format first, then DATE_FORMATS)"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    return _parse_date_text(text, date_format)
+
+
+# Statements repeat the same few dates for many rows; strptime dominates parse time
+@lru_cache(maxsize=4096)
+def _parse_date_text(text: str, date_format: Optional[str]) -> Optional[str]:
+    formats = (date_format,) + DATE_FORMATS if date_format else DATE_FORMATS
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    # ISO datetimes and OFX timestamps (YYYYMMDDHHMMSS[.XXX][TZ])
+    digits = text[:8]
+    if len(text) > 8 and digits.isdigit():
+        try:
+            return datetime.strptime(digits, '%Y%m%d').strftime('%Y-%m-%d')
+        except ValueError:
+            return None
+    if len(text) > 10:
+        try:
+            return datetime.strptime(text[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            return None
+    return None
+
+
+def infer_category(description: str, txn_type: str) -> str:
+    """Best-effort category from description keywords"""
+    text = (description or '').lower()
+    for category, pattern in _CATEGORY_PATTERNS:
+        if pattern.search(text):
+            return category
+    return 'other_income' if txn_type == 'income' else 'other'
+
+
+def _normalize_header(name: str) -> str:
+    return _HEADER_CLEAN.sub('', (name or '').lower())
+
+
+def map_csv_columns(fieldnames: List[str]) -> Dict[str, str]:
+    """Map statement headers to roles (date, description, amount/debit/credit, ...)"""
+    mapping = {}
+    for field in fieldnames or []:
+        normalized = _normalize_header(field)
+        for role, aliases in CSV_COLUMNS.items():
+            if role not in mapping and normalized in aliases:
+                mapping[role] = field
+                break
+    if 'date' not in mapping:
+        raise StatementImportError("CSV has no date column")
+    if 'amount' not in mapping and not ('debit' in mapping or 'credit' in mapping):
+        raise StatementImportError("CSV needs an amount column or debit/credit columns")
+    return mapping
+
+
+def normalize_row(date_value, amount: Optional[float], description: str, txn_type: Optional[str] = None,
+                  category: Optional[str] = None, date_format: Optional[str] = None) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Build a transaction from parsed statement fields
+
+    Returns:
+        (transaction, error)
+    """
+    date = parse_date(date_value, date_format)
+    if date is None:
+        return None, f"Unrecognized date '{date_value}'"
+    if amount is None:
+        return None, "Missing amount"
+    if txn_type is None:
+        txn_type = 'expense' if amount < 0 else 'income'
+    description = ' '.join((description or '').split())
+    txn = {
+        'type': txn_type,
+        'amount': round(abs(amount), 2),
+        'category': (category or '').strip().lower() or infer_category(description, txn_type),
+        'description': description,
+        'date': date
+    }
+    if float(txn['amount']).is_integer():
+        txn['amount'] = int(txn['amount'])
+    return txn, None
+
+
+def _csv_type(raw) -> Optional[str]:
+    text = str(raw or '').strip().lower()
+    if text in ('dr', 'debit', 'd', 'withdrawal', 'expense'):
+        return 'expense'
+    if text in ('cr', 'credit', 'c', 'deposit', 'income'):
+        return 'income'
+    return None
+
+
+def iter_csv(stream, date_format: Optional[str] = None, encoding: str = 'utf-8-sig') -> Iterator[Tuple[Optional[Dict], Optional[str], Optional[str]]]:
+    """
+    Stream (transaction, error, external_id) tuples from a CSV statement
+
+    Args:
+        stream: Binary file-like object (read incrementally)
+    """
+    text = io.TextIOWrapper(stream, encoding=encoding, errors='replace', newline='')
+    reader = csv.DictReader(text)
+    columns = map_csv_columns(reader.fieldnames)
+    for row in reader:
+        def get(role):
+            return row.get(columns[role]) if role in columns else None
+        txn_type = _csv_type(get('type')) if 'type' in columns else None
+        amount = parse_amount(get('amount')) if 'amount' in columns else None
+        if amount is None and ('debit' in columns or 'credit' in columns):
+            debit = parse_amount(get('debit'))
+            credit = parse_amount(get('credit'))
+            if debit:
+                amount, txn_type = -abs(debit), 'expense'
+            elif credit:
+                amount, txn_type = abs(credit), 'income'
+        elif amount is not None and txn_type == 'expense':
+            amount = -abs(amount)
+        if amount is None and not any((value or '').strip() for value in row.values() if isinstance(value, str)):
+            continue  # blank line
+        txn, error = normalize_row(get('date'), amount, get('description') or '', txn_type,
+                                   get('category'), date_format)
+        yield txn, error, (get('reference') or '').strip() or None
+
+
+def _iter_ofx_tags(stream) -> Iterator[Tuple[bool, str, str]]:
+    """Yield (closing, TAG, text) from an OFX (SGML or XML) stream in fixed-size chunks"""
+    decoder = codecs.getincrementaldecoder('latin-1')()
+    buffer = ''
+    while True:
+        chunk = stream.read(OFX_CHUNK_SIZE)
+        final = not chunk
+        buffer += decoder.decode(chunk or b'', final=final)
+        # Keep the possibly incomplete tail (from the last '<') for the next round
+        cut = len(buffer) if final else buffer.rfind('<')
+        if cut <= 0 and not final:
+            continue
+        for match in _OFX_TAG.finditer(buffer, 0, cut):
+            yield match.group(1) == '/', match.group(2).upper(), match.group(3).strip()
+        buffer = buffer[cut:]
+        if final:
+            return
+
+
+def iter_ofx(stream, date_format: Optional[str] = None) -> Iterator[Tuple[Optional[Dict], Optional[str], Optional[str]]]:
+    """Stream (transaction, error, external_id) tuples from the <STMTTRN> blocks of an OFX file"""
+    current = None
+    for closing, tag, text in _iter_ofx_tags(stream):
+        if tag == 'STMTTRN':
+            if not closing:
+                current = {}
+                continue
+            if current is not None:
+                amount = parse_amount(current.get('TRNAMT'))
+                trntype = current.get('TRNTYPE', '').upper()
+                txn_type = None
+                if trntype in ('CREDIT', 'DEP', 'INT', 'DIV', 'DIRECTDEP'):
+                    txn_type = 'income'
+                elif trntype in ('DEBIT', 'PAYMENT', 'POS', 'ATM', 'FEE', 'SRVCHG', 'CHECK', 'DIRECTDEBIT', 'CASH'):
+                    txn_type = 'expense'
+                description = ' '.join(part for part in (current.get('NAME'), current.get('MEMO')) if part)
+                txn, error = normalize_row(current.get('DTPOSTED'), amount, description,
+                                           txn_type, None, date_format)
+                yield txn, error, current.get('FITID')
+            current = None
+        elif current is not None and not closing and text:
+            current[tag] = text
+
+
+class _RawStream(io.RawIOBase):
+    """Adapts any object with read(n) (upload streams, sockets) to the raw IO interface"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        return size
+
+
+def open_statement_stream(stream) -> io.BufferedReader:
+    """Wrap an upload stream in a buffered reader (supports peek for format detection)"""
+    return io.BufferedReader(_RawStream(stream), buffer_size=OFX_CHUNK_SIZE)
+
+
+def detect_format(filename: Optional[str], head: bytes) -> str:
+    """Guess 'csv' or 'ofx' from the file name or the first bytes"""
+    name = (filename or '').lower()
+    if name.endswith(('.ofx', '.qfx')):
+        return 'ofx'
+    if name.endswith('.csv'):
+        return 'csv'
+    sample = head[:2048].upper()
+    if b'OFXHEADER' in sample or b'<OFX>' in sample:
+        return 'ofx'
+    return 'csv'
+
+
+def import_hash(user_id: str, txn: Dict, external_id: Optional[str], occurrence: int) -> str:
+    """
+    Content hash used by the (user_id, import_hash) unique index
+
+    Bank-provided ids (OFX FITID, CSV reference) are used when present.
+    Otherwise the hash covers the normalized fields plus the row's occurrence
+    number among identical rows in the file, so two genuine identical
+    purchases on one day both import while re-importing the statement adds
+    nothing.
+    """
+    if external_id:
+        basis = f"{user_id}|id|{external_id}"
+    else:
+        basis = (f"{user_id}|{txn['date']}|{txn['type']}|{txn['amount']}|"
+                 f"{txn['description'].lower()}|{occurrence}")
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()
+
+
+def import_statement(transaction_model, user_id: str, stream, file_format: str = 'csv',
+                     date_format: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                     dry_run: bool = False) -> Dict:
+    """
+    Parse a statement stream and insert its transactions
+
+    Args:
+        transaction_model: TransactionModel used for batched inserts
+        user_id: Owner of the imported transactions
+        stream: Binary file-like object
+        file_format: 'csv' or 'ofx'
+        date_format: Optional strptime format tried before the built-in list
+        batch_size: Rows per insert_many call
+        dry_run: Parse and normalize only
+
+    Returns:
+        Report with rows, inserted, duplicates, invalid counts, sample errors,
+        elapsed seconds and rows per second
+    """
+    if file_format not in ('csv', 'ofx'):
+        raise StatementImportError("Format must be 'csv' or 'ofx'")
+    rows_iter = iter_ofx(stream, date_format) if file_format == 'ofx' else iter_csv(stream, date_format)
+
+    report = {"rows": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "errors": []}
+    # date -> {row digest: occurrences so far}, oldest date first
+    occurrences: 'OrderedDict[str, Dict[bytes, int]]' = OrderedDict()
+    batch: List[Dict] = []
+    started = time.perf_counter()
+
+    def flush():
+        if not batch:
+            return
+        if not dry_run:
+            inserted, duplicates = _insert_batch(transaction_model, user_id, batch)
+            report["inserted"] += inserted
+            report["duplicates"] += duplicates
+        batch.clear()
+
+    for txn, error, external_id in rows_iter:
+        report["rows"] += 1
+        if error:
+            report["invalid"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"row": report["rows"], "error": error})
+            continue
+        occurrence = 0
+        if not external_id:
+            digest = hashlib.blake2b(
+                f"{txn['date']}|{txn['type']}|{txn['amount']}|{txn['description'].lower()}".encode('utf-8'),
+                digest_size=8
+            ).digest()
+            day = occurrences.get(txn['date'])
+            if day is None:
+                day = occurrences[txn['date']] = {}
+                if len(occurrences) > DUPLICATE_WINDOW_DATES:
+                    occurrences.popitem(last=False)
+            occurrence = day.get(digest, 0)
+            day[digest] = occurrence + 1
+        txn['import_hash'] = import_hash(user_id, txn, external_id, occurrence)
+        batch.append(txn)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    if report["inserted"] and not dry_run:
+        transaction_model.touch_financial_data(user_id)
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows"] / elapsed, 1) if elapsed > 0 else None
+    report["dry_run"] = dry_run
+    return report
+
+
+def _insert_batch(transaction_model, user_id: str, batch: Iterable[Dict]) -> Tuple[int, int]:
+    """Unordered insert; duplicate-key errors (already imported rows) are counted, not raised"""
+    try:
+        inserted, _ = transaction_model.insert_many(user_id, list(batch), source='import', touch=False)
+        return inserted, 0
+    except BulkWriteError as e:
+        details = e.details or {}
+        write_errors = details.get('writeErrors', [])
+        duplicates = sum(1 for err in write_errors if err.get('code') == 11000)
+        if duplicates != len(write_errors):
+            raise
+        return details.get('nInserted', 0), duplicates
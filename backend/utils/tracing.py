@@ -0,0 +1,282 @@
+"""
+Tracing Utilities
+Span-based tracing for Mongo, Gemini and PDF hot paths.
+
+The API mirrors the OpenTelemetry tracer (start_as_current_span, set_attribute,
+record_exception) so call sites don't change if spans are later shipped to a
+collector. Exporters:
+    none - default; spans are only recorded for ?profile=1 requests
+    json - finished traces are appended as JSON lines (OTLP-like field names)
+    otel - spans are mirrored to the opentelemetry-api tracer, if installed
+When nothing is exporting and no profile is active, start_as_current_span
+returns a shared no-op span, so instrumented code pays one ContextVar lookup.
+"""
+
+import contextvars
+import functools
+import json
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from config import Config
+
+_current_span = contextvars.ContextVar('fingenie_current_span', default=None)
+
+
+class _NoOpSpan:
+    """Span stand-in used when tracing is inactive"""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def record_exception(self, exception):
+        pass
+
+
+NOOP_SPAN = _NoOpSpan()
+
+
+class _Trace:
+    __slots__ = ('trace_id', 'spans', 'profile')
+
+    def __init__(self, profile: bool):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List["Span"] = []
+        self.profile = profile
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ('name', 'trace', 'span_id', 'parent_id', 'attributes', 'start_ns', 'end_ns',
+                 'status', 'error', '_perf_start', 'duration_ms', '_otel_cm')
+
+    def __init__(self, name: str, trace: _Trace, parent: Optional["Span"], attributes: Optional[Dict]):
+        self.name = name
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = 'OK'
+        self.error = None
+        self.duration_ms = None
+        self._otel_cm = None
+        self._perf_start = time.perf_counter()
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes):
+        self.attributes.update(attributes)
+
+    def record_exception(self, exception):
+        self.status = 'ERROR'
+        self.error = f"{type(exception).__name__}: {exception}"
+
+    def end(self):
+        self.duration_ms = (time.perf_counter() - self._perf_start) * 1000
+        self.end_ns = self.start_ns + int(self.duration_ms * 1e6)
+
+    def to_dict(self) -> Dict:
+        """OTLP-like flat representation used by the JSON file exporter"""
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round(self.duration_ms or 0, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.error}
+        }
+
+
+class JsonFileExporter:
+    """Appends each finished trace to a JSON-lines file (one span per line)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        lines = ''.join(json.dumps(span.to_dict(), default=str) + '\n' for span in spans)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+
+class Tracer:
+    """Creates spans and hands finished traces to the configured exporter"""
+
+    def __init__(self, exporter_name: str = 'none', file_path: str = 'traces.jsonl'):
+        self.exporter = None
+        self._otel_tracer = None
+        self.configure(exporter_name, file_path)
+
+    def configure(self, exporter_name: str, file_path: str = 'traces.jsonl'):
+        exporter_name = (exporter_name or 'none').lower()
+        self.exporter = None
+        self._otel_tracer = None
+        if exporter_name == 'json':
+            self.exporter = JsonFileExporter(file_path)
+        elif exporter_name == 'otel':
+            try:
+                from opentelemetry import trace as otel_trace
+                self._otel_tracer = otel_trace.get_tracer('fingenie')
+            except ImportError:
+                print("opentelemetry-api not installed. Tracing export disabled.")
+        self.exporting = self.exporter is not None or self._otel_tracer is not None
+
+    def start_span(self, name: str, attributes: Optional[Dict] = None, profile: bool = False):
+        """
+        Start a span and make it current. Returns (span, token) for end_span;
+        used where a with-block can't span the whole operation (request hooks).
+        """
+        parent = _current_span.get()
+        if parent is None:
+            if not (self.exporting or profile):
+                return NOOP_SPAN, None
+            trace = _Trace(profile)
+        else:
+            trace = parent.trace
+        span = Span(name, trace, parent, attributes)
+        if self._otel_tracer is not None:
+            span._otel_cm = self._otel_tracer.start_as_current_span(name, attributes=span.attributes)
+            span._otel_cm.__enter__()
+        return span, _current_span.set(span)
+
+    def end_span(self, span, token):
+        if token is None:
+            return
+        span.end()
+        _current_span.reset(token)
+        if span._otel_cm is not None:
+            span._otel_cm.__exit__(None, None, None)
+        trace = span.trace
+        trace.spans.append(span)
+        if span.parent_id is None and self.exporter is not None:
+            try:
+                self.exporter.export(trace.spans)
+            except Exception as e:
+                print(f"Error exporting trace: {e}")
+
+    @contextmanager
+    def start_as_current_span(self, name: str, attributes: Optional[Dict] = None):
+        """Context manager timing the block as a child of the current span"""
+        if _current_span.get() is None and not self.exporting:
+            yield NOOP_SPAN
+            return
+        span, token = self.start_span(name, attributes)
+        try:
+            yield span
+        except Exception as e:
+            span.record_exception(e)
+            raise
+        finally:
+            self.end_span(span, token)
+
+
+tracer = Tracer(Config.TRACING_EXPORTER, Config.TRACING_FILE)
+
+
+def current_span():
+    """Return the active span (or the no-op span)"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name: str = None):
+    """Decorator running the function inside a span (defaults to its qualified name)"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None and not tracer.exporting:
+                return func(*args, **kwargs)
+            with tracer.start_as_current_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_methods(cls):
+    """Class decorator wrapping every public method of a model in a span"""
+    for attr_name, attr in list(vars(cls).items()):
+        if attr_name.startswith('_') or not callable(attr) or isinstance(attr, (staticmethod, classmethod)):
+            continue
+        setattr(cls, attr_name, traced(f"{cls.__name__}.{attr_name}")(attr))
+    return cls
+
+
+def span_tree(spans: List[Span]) -> List[Dict]:
+    """Nest finished spans into a parent/children tree for profile responses"""
+    nodes = {}
+    for span in spans:
+        node = {
+            "name": span.name,
+            "duration_ms": round(span.duration_ms or 0, 3),
+            "children": []
+        }
+        if span.attributes:
+            node["attributes"] = span.attributes
+        if span.error:
+            node["error"] = span.error
+        nodes[span.span_id] = (span, node)
+    roots = []
+    # Spans finish child-first, so order siblings by start time
+    for span, node in sorted(nodes.values(), key=lambda item: item[0].start_ns):
+        parent = nodes.get(span.parent_id)
+        if parent is None:
+            roots.append(node)
+        else:
+            parent[1]["children"].append(node)
+    return roots
+
+
+def init_request_tracing(app):
+    """
+    Open a root span per request when exporting, or when the client asks for
+    ?profile=1 (allowed if TRACING_PROFILE_ENABLED); profiled JSON responses
+    get the span tree under '_profile'.
+    """
+    from flask import request, g
+
+    @app.before_request
+    def _start_request_span():
+        profile = Config.TRACING_PROFILE_ENABLED and request.args.get('profile') == '1'
+        if not (tracer.exporting or profile):
+            return
+        rule = request.url_rule
+        endpoint = rule.endpoint if rule is not None else 'unmatched'
+        span, token = tracer.start_span(f"{request.method} {endpoint}",
+                                        {"http.method": request.method, "http.route": str(rule)},
+                                        profile=profile)
+        g._trace_root = (span, token)
+
+    @app.after_request
+    def _end_request_span(response):
+        root = g.pop('_trace_root', None)
+        if root is None:
+            return response
+        span, token = root
+        span.set_attribute("http.status_code", response.status_code)
+        tracer.end_span(span, token)
+        if span.trace.profile and response.is_json:
+            payload = response.get_json(silent=True)
+            if isinstance(payload, dict):
+                payload['_profile'] = {
+                    "trace_id": span.trace.trace_id,
+                    "total_ms": round(span.duration_ms, 3),
+                    "spans": span_tree(span.trace.spans)
+                }
+                response.set_data(json.dumps(payload, default=str))
+        return response
@@ -0,0 +1,171 @@
+"""
+Two-Factor Authentication Utilities
+Pending TOTP setup cache and provisioning QR rendering (PNG, SVG or raw matrix)
+"""
+
+import base64
+import math
+import time
+from io import BytesIO
+from typing import Dict, List
+from urllib.parse import quote
+
+from config import Config
+from utils.cache import TTLCache
+from utils.metrics import register_cache
+
+QR_FORMATS = ('png', 'svg', 'matrix')
+TOTP_ISSUER = "FinGenie"
+
+# Characters left unescaped in SVG data URIs (all safe inside a double-quoted src attribute)
+_SVG_URI_SAFE = " =:/.-'<>"
+
+# user_id -> {"secret", "uri", "account_name", "created": monotonic time, "renders": {format: payload}}
+_pending_setups = TTLCache(ttl_seconds=Config.TOTP_SETUP_TTL_SECONDS)
+register_cache('totp_setup', _pending_setups)
+
+
+def _build_qr(totp_uri: str, border: int):
+    """Build (but do not rasterize) a QR code for the provisioning URI"""
+    import qrcode
+
+    qr = qrcode.QRCode(version=None, box_size=10, border=border)
+    qr.add_data(totp_uri)
+    qr.make(fit=True)
+    return qr
+
+
+def render_qr_png(totp_uri: str) -> str:
+    """Render the provisioning URI as a base64 PNG data URI (requires Pillow)"""
+    qr = _build_qr(totp_uri, border=5)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
+
+
+def _matrix_rows(totp_uri: str) -> List[str]:
+    """Return the QR modules as one '0'/'1' string per row (no quiet zone)"""
+    qr = _build_qr(totp_uri, border=0)
+    return ["".join("1" if cell else "0" for cell in row) for row in qr.get_matrix()]
+
+
+def render_qr_matrix(totp_uri: str) -> Dict:
+    """
+    Render the provisioning URI as a compact module matrix
+
+    Returns:
+        Dictionary with the matrix size, recommended quiet-zone border and one
+        hex string per row. Each row is the module bits (1 = dark, MSB first)
+        right-padded with zeros to a multiple of 4.
+    """
+    rows = _matrix_rows(totp_uri)
+    size = len(rows)
+    hex_width = (size + 3) // 4
+    packed = [format(int(row.ljust(hex_width * 4, "0"), 2), f"0{hex_width}x") for row in rows]
+    return {"size": size, "border": 4, "encoding": "hex", "rows": packed}
+
+
+def matrix_to_svg(rows: List[str], border: int = 4) -> str:
+    """
+    Convert a '0'/'1' row matrix into a minimal single-path SVG document
+
+    Each run of dark modules becomes one stroked horizontal segment using
+    relative moves, which keeps the markup close to the size of the matrix.
+    """
+    size = len(rows) + 2 * border
+    segments = []
+    for y, row in enumerate(rows):
+        x = 0
+        width = len(row)
+        pen = None  # x position where the previous segment on this row ended
+        while x < width:
+            if row[x] == "1":
+                start = x
+                while x < width and row[x] == "1":
+                    x += 1
+                if pen is None:
+                    segments.append(f"M{start + border} {y + border}.5h{x - start}")
+                else:
+                    segments.append(f"m{start - pen} 0h{x - start}")
+                pen = x
+            else:
+                x += 1
+    return (
+        f"<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 {size} {size}' "
+        f"shape-rendering='crispEdges'><rect width='{size}' height='{size}' fill='white'/>"
+        f"<path d='{''.join(segments)}' stroke='black'/></svg>"
+    )
+
+
+def render_qr_svg(totp_uri: str) -> str:
+    """Render the provisioning URI as a URL-encoded SVG data URI (no Pillow needed)"""
+    svg = matrix_to_svg(_matrix_rows(totp_uri))
+    # Only characters that are unsafe inside a double-quoted <img src="..."> are escaped
+    return f"data:image/svg+xml;utf8,{quote(svg, safe=_SVG_URI_SAFE)}"
+
+
+_RENDERERS = {
+    'png': render_qr_png,
+    'svg': render_qr_svg,
+    'matrix': render_qr_matrix,
+}
+
+
+def get_pending_setup(user_id: str, account_name: str, qr_format: str = 'png') -> Dict:
+    """
+    Get (or create) the pending 2FA setup for a user
+
+    Repeat calls within the setup window reuse the same secret and any QR
+    artifact that was already rendered in the requested format.
+
+    Args:
+        user_id: User ID the setup belongs to
+        account_name: Label shown in the authenticator app (usually the email)
+        qr_format: One of 'png', 'svg' or 'matrix'
+
+    Returns:
+        Dictionary with secret, provisioning URI and the rendered QR payload
+    """
+    if qr_format not in _RENDERERS:
+        raise ValueError(f"Unsupported QR format: {qr_format}")
+
+    pending = _pending_setups.get(user_id)
+    if not pending or pending["account_name"] != account_name:
+        import pyotp
+
+        secret = pyotp.random_base32()
+        uri = pyotp.TOTP(secret).provisioning_uri(name=account_name, issuer_name=TOTP_ISSUER)
+        pending = {
+            "secret": secret, "uri": uri, "account_name": account_name,
+            "created": time.monotonic(), "renders": {}
+        }
+        _pending_setups.set(user_id, pending)
+
+    renders = pending["renders"]
+    if qr_format not in renders:
+        renders[qr_format] = _RENDERERS[qr_format](pending["uri"])
+
+    return {
+        "secret": pending["secret"],
+        "uri": pending["uri"],
+        "qr": renders[qr_format],
+        # Seconds left in the setup window (reused setups do not restart it)
+        "expires_in": max(0, math.ceil(pending["created"] + Config.TOTP_SETUP_TTL_SECONDS - time.monotonic()))
+    }
+
+
+def get_pending_secret(user_id: str):
+    """Return the pending (not yet verified) TOTP secret for a user, if any"""
+    pending = _pending_setups.get(user_id)
+    return pending["secret"] if pending else None
+
+
+def clear_pending_setup(user_id: str):
+    """Forget a user's pending setup once 2FA has been enabled"""
+    _pending_setups.pop(user_id)
+
+
+def pending_setup_cache_stats() -> Dict:
+    """Return hit/miss statistics for the pending setup cache"""
+    return _pending_setups.stats()
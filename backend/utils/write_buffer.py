@@ -0,0 +1,341 @@
+"""
+Write-behind Coalescing Buffer
+Collects a user's financial-data patches for a short window and writes them as
+a single MongoDB update.
+
+Rapid UI edits (several budget tweaks within a fraction of a second) each
+become a patch; patches for the same user are merged in memory (last set wins,
+increments add up, pushes are appended) and flushed once the window after the
+first pending patch elapses. Reads and direct writes through FinanceModel flush
+the user's pending batch first, so a user reads their own writes - but only
+from the process that buffered them. The buffer lives in one worker's memory:
+a read served by another worker can miss up to a window of pending edits, so
+enable it only with a single worker or with requests sticky-routed per user.
+Pending batches are flushed at interpreter exit.
+
+Patches are acknowledged (202) before they are written, so a batch that fails
+to write is retried when it is safe to (only $set/$unset, which re-apply
+idempotently), then logged with its update for replay and kept as the user's
+write failure until a read reports it (pop_failure).
+"""
+
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from utils.financial_patch import (
+    MAX_PATCH_OPS, PatchError, compile_update, path_key, paths_overlap
+)
+from utils.metrics import metrics
+
+coalesced_patches = metrics.counter(
+    'fingenie_write_buffer_patches_total', 'Patches accepted into the write-behind buffer')
+coalesced_merged = metrics.counter(
+    'fingenie_write_buffer_merged_total', 'Patches merged into an already pending batch (writes saved)')
+coalesced_flushes = metrics.counter(
+    'fingenie_write_buffer_flushes_total', 'Batches written to MongoDB by trigger (timer, read, conflict, shutdown)',
+    ('trigger',))
+coalesced_failures = metrics.counter(
+    'fingenie_write_buffer_failures_total', 'Batches that failed to write')
+coalesced_retries = metrics.counter(
+    'fingenie_write_buffer_retries_total', 'Write attempts repeated after an error')
+
+# Pauses (seconds) before retrying a failed batch; increments and pushes are not
+# retried since the failed attempt may have been applied
+RETRY_DELAYS = (0.05, 0.25, 1.0)
+
+
+class _Batch:
+    __slots__ = ('ops', 'defaults', 'deadline', 'patches')
+
+    def __init__(self, defaults, deadline):
+        self.ops: List[Tuple] = []
+        self.defaults = defaults
+        self.deadline = deadline
+        self.patches = 0
+
+
+def _set_nested(value: Dict, relative: Tuple, new_value, unset: bool = False) -> bool:
+    """Apply a plain-segment set/unset inside a dict value; False if not possible"""
+    node = value
+    for segment in relative[:-1]:
+        child = node.get(segment) if isinstance(node, dict) else None
+        if child is None:
+            if unset:
+                return True
+            child = node[segment] = {}
+        if not isinstance(child, dict):
+            return False
+        node = child
+    if not isinstance(node, dict):
+        return False
+    if unset:
+        node.pop(relative[-1], None)
+    else:
+        node[relative[-1]] = new_value
+    return True
+
+
+def merge_op(ops: List[Tuple], new_op: Tuple) -> bool:
+    """
+    Fold one normalized operation into a pending list in place
+
+    Returns False when the operation can't be combined with what is pending
+    (the caller then flushes the pending batch first).
+    """
+    op, segments, value = new_op
+    key = path_key(segments)
+    overlapping = [i for i, (_, other_segments, _) in enumerate(ops) if paths_overlap(path_key(other_segments), key)]
+    if not overlapping:
+        ops.append(new_op)
+        return True
+
+    if op in ('set', 'unset'):
+        # Ancestor set with an object value: write into that value
+        if len(overlapping) == 1:
+            other_op, other_segments, other_value = ops[overlapping[0]]
+            other_key = path_key(other_segments)
+            if (other_op == 'set' and other_key != key and key.startswith(other_key + '.')
+                    and isinstance(other_value, dict)
+                    and all(isinstance(s, str) for s in segments[len(other_segments):])):
+                merged_value = copy.deepcopy(other_value)
+                if not _set_nested(merged_value, segments[len(other_segments):], value, unset=(op == 'unset')):
+                    return False
+                ops[overlapping[0]] = ('set', other_segments, merged_value)
+                return True
+        # The same path or anything below it is overwritten by this set/unset
+        if all(path_key(ops[i][1]) == key or path_key(ops[i][1]).startswith(key + '.') for i in overlapping):
+            for i in reversed(overlapping):
+                del ops[i]
+            ops.append(new_op)
+            return True
+        return False
+
+    if len(overlapping) != 1 or path_key(ops[overlapping[0]][1]) != key:
+        return False
+    index = overlapping[0]
+    other_op, other_segments, other_value = ops[index]
+
+    if op == 'inc':
+        if other_op == 'inc':
+            ops[index] = ('inc', segments, other_value + value)
+            return True
+        if other_op == 'set' and isinstance(other_value, (int, float)) and not isinstance(other_value, bool):
+            ops[index] = ('set', segments, other_value + value)
+            return True
+    elif op == 'push':
+        if other_op == 'push':
+            ops.append(new_op)  # compile_update combines pushes with $each
+            return True
+        if other_op == 'set' and isinstance(other_value, list):
+            ops[index] = ('set', segments, other_value + [value])
+            return True
+    return False
+
+
+class WriteCoalescer:
+    """Per-process write-behind buffer for FinanceModel patches"""
+
+    def __init__(self, finance_model, window_ms: int = 250, max_ops: int = MAX_PATCH_OPS):
+        self.finance_model = finance_model
+        self.window = window_ms / 1000.0
+        self.max_ops = max_ops
+        self._batches: Dict[str, _Batch] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._failures: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._closed = False
+
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # Pending batches belong to the parent; the flusher thread did not survive the fork
+        self._batches = {}
+        self._inflight = {}
+        self._failures = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid() or self._thread is None:
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='fingenie-write-buffer', daemon=True)
+            self._thread.start()
+
+    def submit(self, user_id: str, ops: List[Tuple], defaults: Optional[Dict] = None):
+        """
+        Queue normalized operations for a user (validated by the caller)
+
+        Operations that can't be merged into the pending batch flush it first,
+        in the calling thread, so per-user write order is preserved.
+        """
+        if self._closed:
+            self._write(user_id, list(ops), defaults, 'shutdown')
+            return
+        compile_update(ops)  # reject conflicts within the patch itself
+
+        while True:
+            conflict = None
+            with self._lock:
+                self._ensure_thread()
+                batch = self._batches.get(user_id)
+                if batch is None:
+                    batch = self._batches[user_id] = _Batch(defaults, time.monotonic() + self.window)
+                    self._wakeup.notify()
+                merged = list(batch.ops)
+                mergeable = all(merge_op(merged, op) for op in ops) and len(merged) <= self.max_ops
+                if mergeable:
+                    try:
+                        compile_update(merged)
+                    except PatchError:
+                        mergeable = False
+                if mergeable or not batch.ops:
+                    if not mergeable:
+                        merged = list(ops)
+                    if batch.patches:
+                        coalesced_merged.inc()
+                    batch.ops = merged
+                    batch.patches += 1
+                    batch.defaults = defaults or batch.defaults
+                    coalesced_patches.inc()
+                    return
+                conflict = self._take(user_id)
+            self._flush_taken(user_id, conflict, 'conflict')
+
+    def _take(self, user_id: str):
+        """Pop a user's batch and mark it in flight (caller holds the lock)"""
+        batch = self._batches.pop(user_id, None)
+        previous = self._inflight.get(user_id)
+        done = threading.Event()
+        self._inflight[user_id] = done
+        return batch, previous, done
+
+    def _flush_taken(self, user_id: str, taken, trigger: str):
+        batch, previous, done = taken
+        try:
+            # Writes for one user are applied in the order their batches were taken
+            if previous is not None:
+                previous.wait()
+            if batch is not None and batch.ops:
+                self._write(user_id, batch.ops, batch.defaults, trigger)
+        finally:
+            done.set()
+            with self._lock:
+                if self._inflight.get(user_id) is done:
+                    del self._inflight[user_id]
+
+    def _write(self, user_id: str, ops: List[Tuple], defaults, trigger: str):
+        update = None
+        try:
+            update, array_filters, nested_roots = compile_update(ops)
+            retryable = all(op in ('set', 'unset') for op, _, _ in ops)
+            for attempt in range(len(RETRY_DELAYS) + 1):
+                try:
+                    result, error = self.finance_model._apply_patch(
+                        user_id, update, array_filters, nested_roots, defaults=defaults)
+                    break
+                except Exception as e:
+                    if not retryable or attempt == len(RETRY_DELAYS):
+                        raise
+                    coalesced_retries.inc()
+                    print(f"⚠️ Buffered write for user {user_id} failed ({e}), retrying")
+                    time.sleep(RETRY_DELAYS[attempt])
+            coalesced_flushes.inc(trigger)
+        except Exception as e:
+            error = str(e)
+        if error:
+            self._record_failure(user_id, update, error)
+
+    def _record_failure(self, user_id: str, update: Optional[Dict], error: str):
+        """Count and log a batch that was not written, keeping it for the user's next read"""
+        coalesced_failures.inc()
+        print(f"⚠️ Buffered write for user {user_id} failed: {error}; "
+              f"update for replay: {json.dumps(update, default=str)}")
+        with self._lock:
+            failure = self._failures.setdefault(user_id, {"error": error, "lost_updates": 0})
+            failure["error"] = error
+            failure["lost_updates"] += 1
+            failure["failed_at"] = time.time()
+
+    def pop_failure(self, user_id: str) -> Optional[Dict]:
+        """
+        The user's unreported write failure, if any ({"error", "lost_updates",
+        "failed_at"}), cleared once returned
+        """
+        with self._lock:
+            return self._failures.pop(user_id, None)
+
+    def flush_user(self, user_id: str, trigger: str = 'read'):
+        """Write a user's pending batch now and wait for any in-flight write"""
+        with self._lock:
+            if user_id not in self._batches and user_id not in self._inflight:
+                return
+            taken = self._take(user_id)
+        self._flush_taken(user_id, taken, trigger)
+
+    def discard_user(self, user_id: str):
+        """Drop a user's pending batch without writing it (account deletion)"""
+        with self._lock:
+            self._batches.pop(user_id, None)
+            self._failures.pop(user_id, None)
+            previous = self._inflight.get(user_id)
+        if previous is not None:
+            previous.wait()
+
+    def flush_all(self, trigger: str = 'shutdown'):
+        """Write every pending batch now"""
+        with self._lock:
+            user_ids = list(self._batches)
+        for user_id in user_ids:
+            self.flush_user(user_id, trigger)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = [user_id for user_id, batch in self._batches.items() if batch.deadline <= now]
+                if not due:
+                    next_deadline = min((batch.deadline for batch in self._batches.values()), default=None)
+                    self._wakeup.wait(None if next_deadline is None else max(0.0, next_deadline - now))
+                    continue
+                taken = [(user_id, self._take(user_id)) for user_id in due]
+            for user_id, item in taken:
+                self._flush_taken(user_id, item, 'timer')
+
+    def close(self):
+        """Stop the flusher thread and write everything still pending"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify_all()
+        self.flush_all('shutdown')
+
+    def stats(self) -> Dict:
+        """Pending batch counts and merge counters (used by /health)"""
+        with self._lock:
+            pending_ops = sum(len(batch.ops) for batch in self._batches.values())
+            pending_users = len(self._batches)
+            failed_users = len(self._failures)
+        patches = coalesced_patches.value()
+        return {
+            "window_ms": int(self.window * 1000),
+            "pending_users": pending_users,
+            "pending_ops": pending_ops,
+            "patches": int(patches),
+            "merged": int(coalesced_merged.value()),
+            "failures": int(coalesced_failures.value()),
+            "retries": int(coalesced_retries.value()),
+            "failed_users": failed_users
+        }
@@ -429,6 +429,9 @@ window.loadFinancialData = async function() {
         console.log('🔄 Loading financial data...');
         const result = await apiRequest('/finance/get_data');
         console.log('📦 Finance API response:', result);
+        if (result.write_failure) {
+            showToast(result.message, 'error');
+        }
         
         // Extract data from response
         const data = result.data || {};
@@ -150,6 +150,9 @@ async function getFinancialData(forceRefresh = false) {
     
     try {
         const result = await apiRequest('/finance/get_data');
+        if (result.write_failure) {
+            showToast(result.message, 'error');
+        }
         financialDataCache = result.data || {};
         financialDataCacheTime = now;
         return financialDataCache;
@@ -548,6 +551,11 @@ function renderBudgetCategories(budgetCategories) {
         const remaining = Math.max(0, budgetAmt - spent);
         const categoryId = cat.id || Date.now();
         const escapedName = (cat.name || 'Category').replace(/'/g, "\\'").replace(/\"/g, '&quot;');
+        // Spent tracked from this month's transactions can't be overwritten by hand
+        const spentButton = cat.spent_source === 'transactions' ? '' : `
+                    <button onclick="updateBudgetSpent(${categoryId}, '${escapedName}')" class="btn btn-primary" style="font-size: 0.8rem;width: 60px;display: flex; justify-content:center; padding: 0.4rem;">
+                        <i class="fa-solid fa-indian-rupee-sign"></i>
+                    </button>`;
         
         html += `
             <div style="padding: 1.25rem; background: var(--bg-elevated); border-radius: var(--radius-md); border: 1px solid var(--border-primary); height: 100%; display: flex; flex-direction: column;">
@@ -577,7 +585,7 @@ function renderBudgetCategories(budgetCategories) {
                 
                 <div style="display: grid; grid-template-columns: repeat(2, 1fr); gap: 0.75rem; margin-bottom: 1rem; padding: 0.75rem; background: var(--bg-primary); border-radius: var(--radius-sm);">
                     <div>
-                        <div style="font-size: 0.7rem; color: var(--text-tertiary); margin-bottom: 0.25rem;">Spent</div>
+                        <div style="font-size: 0.7rem; color: var(--text-tertiary); margin-bottom: 0.25rem;">Spent${cat.spent_source === 'transactions' ? ' (from transactions)' : ''}</div>
                         <div style="font-weight: 600; color: var(--text-primary); font-size: 0.9rem;">${formatCurrency(spent)}</div>
                     </div>
                     <div>
@@ -589,10 +597,7 @@ function renderBudgetCategories(budgetCategories) {
                 <div style="display: flex; justify-content:end; gap: 0.5rem; margin-top: auto;">
                     <button onclick="editBudgetCategory(${categoryId})" class="btn btn-secondary" style="font-size: 0.8rem; width: 60px; height: 45px; display: flex; justify-content:center; padding: 0.4rem;">
                         <i class="fas fa-edit"></i>
-                    </button>
-                    <button onclick="updateBudgetSpent(${categoryId}, '${escapedName}')" class="btn btn-primary" style="font-size: 0.8rem;width: 60px;display: flex; justify-content:center; padding: 0.4rem;">
-                        <i class="fa-solid fa-indian-rupee-sign"></i>
-                    </button>
+                    </button>${spentButton}
                     <button onclick="deleteBudgetCategory(${categoryId})" class="btn btn-danger " style="font-size: 0.8rem; padding: 0.4rem 0.6rem;width: 55px;display: flex; justify-content:center;">
                         <i class="fas fa-trash"></i>
                     </button>
@@ -631,14 +636,24 @@ async function saveBudgetToBackend(budget) {
     }
 }
 
+// Send only the changed fields (see /api/finance/patch) instead of the whole subdocument
+async function patchFinancialData(ops) {
+    try {
+        await apiRequest('/finance/patch', 'POST', { ops });
+        return true;
+    } catch (error) {
+        console.error('Error saving changes:', error);
+        toast.error(error.message || 'Failed to save changes');
+        return false;
+    }
+}
+
 async function updateMonthlyIncome(income) {
     try {
-        const data = await getFinancialData();
-        const budget = data.budget || {};
-        budget.monthly_budget = income;
-        budget.monthly_income = income;
-        
-        const success = await saveBudgetToBackend(budget);
+        const success = await patchFinancialData([
+            { op: 'set', path: 'budget.monthly_budget', value: income },
+            { op: 'set', path: 'budget.monthly_income', value: income }
+        ]);
         if (success) {
             toast.success('Monthly income updated!');
             await loadBudgetData();
@@ -780,6 +795,10 @@ async function updateBudgetSpent(categoryId, categoryName) {
     const category = categories.find(c => c.id === categoryId);
     
     if (!category) return;
+    if (category.spent_source === 'transactions') {
+        toast.info('Spent for this category is tracked from your transactions');
+        return;
+    }
     
     const currentSpent = category.spent || 0;
     const newSpent = prompt(`Update spent amount for "${categoryName}":`, currentSpent);
@@ -793,18 +812,9 @@ async function updateBudgetSpent(categoryId, categoryName) {
     }
     
     try {
-        const data = await getFinancialData();
-        const budget = data.budget || {};
-        let categories = budget.categories || [];
-        
-        const index = categories.findIndex(c => c.id === categoryId);
-        if (index !== -1) {
-            categories[index].spent = spentAmount;
-        }
-        
-        budget.categories = categories;
-        
-        const success = await saveBudgetToBackend(budget);
+        const success = await patchFinancialData([
+            { op: 'set', path: `budget.categories[id=${categoryId}].spent`, value: spentAmount }
+        ]);
         if (success) {
             toast.success('Spent amount updated!');
             await loadBudgetData();
@@ -1396,24 +1406,38 @@ window.toggleInvestmentsDisplay = toggleInvestmentsDisplay;
 // ========== TRANSACTIONS PAGE ==========
 async function loadTransactionsData() {
     try {
-        console.log('🔄 Loading Transactions data from mock_data.json...');
-        // Try to load from backend first (includes mock data)
-        const data = await getFinancialData();
-        console.log('✅ Transactions data loaded:', data);
-        let transactions = data.transactions || [];
+        // Filters are applied server-side by /finance/transactions (indexed by user, category and date)
+        const typeFilter = document.getElementById('transactionTypeFilter')?.value || 'all';
+        const categoryFilter = document.getElementById('transactionCategoryFilter')?.value || 'all';
+        const dateFilter = document.getElementById('transactionDateFilter')?.value || 'all';
         
-        // If no transactions from backend, check localStorage
-        if (transactions.length === 0) {
-            transactions = JSON.parse(localStorage.getItem('transactions') || '[]');
-        } else {
-            // Sync backend transactions to localStorage for compatibility
-            localStorage.setItem('transactions', JSON.stringify(transactions));
+        const params = new URLSearchParams({ limit: '500', sort: '-date' });
+        if (typeFilter !== 'all') params.set('type', typeFilter);
+        if (categoryFilter !== 'all') params.set('category', categoryFilter);
+        if (dateFilter !== 'all') {
+            const now = new Date();
+            let from = null;
+            switch(dateFilter) {
+                case 'today':
+                    from = now;
+                    break;
+                case 'week':
+                    from = new Date(now.getTime() - 7 * 24 * 60 * 60 * 1000);
+                    break;
+                case 'month':
+                    from = new Date(now.getFullYear(), now.getMonth(), 1);
+                    break;
+                case 'year':
+                    from = new Date(now.getFullYear(), 0, 1);
+                    break;
+            }
+            if (from) params.set('from', from.toISOString().split('T')[0]);
         }
         
-        // If still no transactions from backend or localStorage, show empty state
-        // Don't use hardcoded fallback - all data should come from mock_data.json via backend
-        if (transactions.length === 0) {
-            // Show empty state message instead of hardcoded data
+        const result = await apiRequest(`/finance/transactions?${params.toString()}`, 'GET');
+        const filteredTransactions = result.data?.transactions || [];
+        
+        if (filteredTransactions.length === 0) {
             const container = document.getElementById('transactionsList');
             if (container) {
                 container.innerHTML = '<p style="color: var(--text-tertiary); text-align: center; padding: 2rem;">No transactions found. Add transactions or wait for data to load.</p>';
@@ -1422,42 +1446,10 @@ async function loadTransactionsData() {
             updateElement('totalExpenses', '₹0');
             updateElement('totalTransactions', 0);
             updateElement('netTransaction', '₹0');
-            return; // Exit early if no data
+            setupTransactionFilters();
+            return;
         }
     
-    // Apply filters
-    const typeFilter = document.getElementById('transactionTypeFilter')?.value || 'all';
-    const categoryFilter = document.getElementById('transactionCategoryFilter')?.value || 'all';
-    const dateFilter = document.getElementById('transactionDateFilter')?.value || 'all';
-    
-    let filteredTransactions = transactions;
-    
-    if (typeFilter !== 'all') {
-        filteredTransactions = filteredTransactions.filter(t => t.type === typeFilter);
-    }
-    if (categoryFilter !== 'all') {
-        filteredTransactions = filteredTransactions.filter(t => t.category === categoryFilter);
-    }
-    if (dateFilter !== 'all') {
-        const now = new Date();
-        filteredTransactions = filteredTransactions.filter(t => {
-            const tDate = new Date(t.date);
-            switch(dateFilter) {
-                case 'today':
-                    return tDate.toDateString() === now.toDateString();
-                case 'week':
-                    const weekAgo = new Date(now.getTime() - 7 * 24 * 60 * 60 * 1000);
-                    return tDate >= weekAgo;
-                case 'month':
-                    return tDate.getMonth() === now.getMonth() && tDate.getFullYear() === now.getFullYear();
-                case 'year':
-                    return tDate.getFullYear() === now.getFullYear();
-                default:
-                    return true;
-            }
-        });
-    }
-    
     const totalIncome = filteredTransactions.filter(t => t.type === 'income').reduce((sum, t) => sum + t.amount, 0);
     const totalExpenses = filteredTransactions.filter(t => t.type === 'expense').reduce((sum, t) => sum + t.amount, 0);
     const netAmount = totalIncome - totalExpenses;
@@ -1547,10 +1539,12 @@ function showAddTransactionModal() {
                 date: document.getElementById('transactionDateModal').value
             };
             
-            // Store in localStorage (mock)
-            let transactions = JSON.parse(localStorage.getItem('transactions') || '[]');
-            transactions.push({...transaction, id: Date.now()});
-            localStorage.setItem('transactions', JSON.stringify(transactions));
+            try {
+                await apiRequest('/finance/transactions', 'POST', transaction);
+            } catch (error) {
+                toast.error(error.message || 'Failed to add transaction');
+                return;
+            }
             
             toast.success('Transaction added successfully!');
             closeModal('addTransactionModal');
@@ -3157,8 +3151,8 @@ window.show2FASetupModal = async function() {
     try {
         toast.info('Generating 2FA setup...');
         
-        // Get TOTP secret and QR code
-        const setupResponse = await apiRequest('/auth/setup_2fa', 'POST');
+        // Get TOTP secret and QR code (SVG is much smaller than the PNG default)
+        const setupResponse = await apiRequest('/auth/setup_2fa', 'POST', { format: 'svg' });
         
         if (!setupResponse.success) {
             toast.error(setupResponse.error || 'Failed to generate 2FA setup');
@@ -3533,16 +3527,19 @@ window.exportData = async function() {
     try {
         toast.info('Preparing your data export...');
         
-        const response = await apiRequest('/auth/export-data', 'GET');
+        // Streamed ZIP (profile, settings, financial data, reports, transactions)
+        const token = getAuthToken();
+        const response = await fetch(`${API_BASE_URL}/auth/export-data?format=zip`, {
+            headers: token ? { 'Authorization': `Bearer ${token}` } : {},
+            credentials: 'include'
+        });
         
-        if (response.success && response.data) {
-            // Create a blob and download
-            const dataStr = JSON.stringify(response.data, null, 2);
-            const dataBlob = new Blob([dataStr], { type: 'application/json' });
+        if (response.ok) {
+            const dataBlob = await response.blob();
             const url = URL.createObjectURL(dataBlob);
             const link = document.createElement('a');
             link.href = url;
-            link.download = `fingenie-data-export-${new Date().toISOString().split('T')[0]}.json`;
+            link.download = `fingenie-data-export-${new Date().toISOString().split('T')[0]}.zip`;
             document.body.appendChild(link);
             link.click();
             document.body.removeChild(link);